@@ -0,0 +1,477 @@
+#!/usr/bin/env python
+#
+# contraction.py : Contraction hierarchies of the road graph of route.py, one per metric
+#
+# Prerequisites : Install the package 'numpy'
+#                 Execute the command `sudo pip install numpy`
+#
+# Usage         : python contraction.py [road-segments.txt] [city-gps.txt]
+#                 Builds the road graph cache and the hierarchies of all the metrics, and prints their sizes
+#
+# The cities are contracted one at a time, the least important first. Contracting a city removes it from the graph
+# and joins every pair of its neighbors by a shortcut, unless a witness search finds a road between them that is
+# no longer than the route through the city. The next city is the one with the smallest edge difference (the
+# shortcuts it needs minus the edges it removes) plus the number of its neighbors contracted before it plus its
+# level in the hierarchy, which keeps the contraction even over the map. The priorities are updated lazily: a
+# city is taken off the queue only if its priority is still the smallest once it is computed again.
+#
+# Every edge is kept by the city that was contracted first of its two ends, as an upward edge to the more
+# important city, so the hierarchy is a compressed sparse row (CSR) graph of upward edges. An edge is either a road
+# segment, kept as its arc in the road graph, or a shortcut, kept as its two halves: the upward edge from the
+# contracted middle city to the owner of the shortcut, and the one from the middle city to its target.
+#
+# The cheapest route climbs upward edges from both ends to its most important city. A search that only follows
+# upward edges reaches about 150 cities from any city, so the upward search space of every city, its label, is
+# computed once with the hierarchy: the cities reached with the cost of the upward route to them and the edge
+# they were reached by. A query then only intersects the labels of its two ends, takes the common city with the
+# smallest total cost, follows the edges back down and unpacks the shortcuts into road segments, which takes a
+# fraction of a millisecond without any search.
+#
+# The hierarchies are saved in the cache directory of the road graph, one directory of raw .npy files per
+# metric, and replaced along with the road graph cache when the text files change.
+#
+
+import array
+import heapq
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy
+
+from road_graph import cache_directory, default_gps_path, default_segments_path, load_road_graph
+
+hierarchy_version = 1       # Bumped whenever the layout of the saved arrays changes
+witness_settle_limit = 60   # Cities settled by a witness search before it gives up and the shortcut is added
+hierarchy_arrays = ('ranks', 'up_offsets', 'up_targets', 'up_weights', 'up_arcs', 'up_first', 'up_second',
+                    'label_offsets', 'label_hubs', 'label_costs', 'label_parents', 'label_edges')
+
+
+class ContractionHierarchy:
+    """ Upward edges and upward search spaces of a contraction hierarchy
+    """
+    def __init__(self, ranks, up_offsets, up_targets, up_weights, up_arcs, up_first, up_second, label_offsets,
+                 label_hubs, label_costs, label_parents, label_edges):
+        """ Constructor
+        :param ranks:         Array of the position of every city in the contraction order
+        :param up_offsets:    Offsets array of the upward edges of every city
+        :param up_targets:    Targets array of the upward edges, always more important than the owner of the edge
+        :param up_weights:    Array of the weights of the upward edges
+        :param up_arcs:       Array of the arc in the road graph of every road segment edge, -1 for the shortcuts
+        :param up_first:      Array of the half of every shortcut from its middle city to its owner, -1 for the roads
+        :param up_second:     Array of the half of every shortcut from its middle city to its target, -1 for the roads
+        :param label_offsets: Offsets array of the upward search space, the label, of every city
+        :param label_hubs:    Array of the cities of every label, sorted by city id within a label
+        :param label_costs:   Array of the cost of the upward route to every city of a label
+        :param label_parents: Array of the position of the previous city of the route in the same label, -1 for the
+                              city of the label itself
+        :param label_edges:   Array of the upward edge from the previous city, -1 for the city of the label itself
+        """
+        self.ranks = ranks
+        self.up_offsets = up_offsets
+        self.up_targets = up_targets
+        self.up_weights = up_weights
+        self.up_arcs = up_arcs
+        self.up_first = up_first
+        self.up_second = up_second
+        self.label_offsets = label_offsets
+        self.label_hubs = label_hubs
+        self.label_costs = label_costs
+        self.label_parents = label_parents
+        self.label_edges = label_edges
+        self.target_list = up_targets.tolist()
+        self.arc_list = up_arcs.tolist()
+        self.first_list = up_first.tolist()
+        self.second_list = up_second.tolist()
+        self.owner_list = numpy.repeat(numpy.arange(len(ranks)), numpy.diff(up_offsets)).tolist()
+
+    def __len__(self):
+        """ Returns the number of upward edges
+        :return: Number of upward edges, road segments and shortcuts
+        """
+        return len(self.target_list)
+
+    def shortcut_count(self):
+        """ Counts the shortcuts
+        :return: Number of upward edges that are shortcuts
+        """
+        return int((self.up_arcs < 0).sum())
+
+    def unpack(self, edge, from_city, arcs):
+        """ Replaces an upward edge by the arcs of its road segments, in the order they are driven
+        :param edge:      Index of the upward edge
+        :param from_city: City id of the end of the edge the route comes from
+        :param arcs:      List the arcs are appended to
+        """
+        stack = [(edge, from_city)]
+        while stack:
+            edge, from_city = stack.pop()
+            arc = self.arc_list[edge]
+            if arc >= 0:
+                arcs.append(arc)
+                continue
+            first, second = self.first_list[edge], self.second_list[edge]
+            middle_city = self.owner_list[first]
+            if from_city == self.owner_list[edge]:
+                stack.append((second, middle_city))
+                stack.append((first, from_city))
+            else:
+                stack.append((first, middle_city))
+                stack.append((second, from_city))
+
+    def label_route(self, city, position):
+        """ Follows the upward route to a city of a label back to the city of the label
+        :param city:     City id of the label
+        :param position: Position of the city in the label
+        :return:         List of the upward edges of the route, the last edge first
+        """
+        start = self.label_offsets[city]
+        parents = self.label_parents[start:self.label_offsets[city + 1]].tolist()
+        edges = self.label_edges[start:self.label_offsets[city + 1]].tolist()
+        route_edges = list()
+        while parents[position] >= 0:
+            route_edges.append(edges[position])
+            position = parents[position]
+        return route_edges
+
+    def route_arcs(self, start, goal):
+        """ Finds the cheapest route through the most important city of both labels and unpacks its shortcuts
+        :param start: City id of the start
+        :param goal:  City id of the goal
+        :return:      List of the arcs of the route from the start, number of label cities searched; None if the
+                      goal can not be reached
+        """
+        start_begin, start_end = self.label_offsets[start], self.label_offsets[start + 1]
+        goal_begin, goal_end = self.label_offsets[goal], self.label_offsets[goal + 1]
+        hubs, start_positions, goal_positions = numpy.intersect1d(self.label_hubs[start_begin:start_end],
+                                                                  self.label_hubs[goal_begin:goal_end],
+                                                                  assume_unique=True, return_indices=True)
+        if not len(hubs):
+            return None
+        best = (self.label_costs[start_begin + start_positions] +
+                self.label_costs[goal_begin + goal_positions]).argmin()
+        arcs = list()
+        for edge in reversed(self.label_route(start, start_positions[best])):
+            self.unpack(edge, self.owner_list[edge], arcs)
+        for edge in self.label_route(goal, goal_positions[best]):
+            self.unpack(edge, self.target_list[edge], arcs)
+        return arcs, (start_end - start_begin) + (goal_end - goal_begin)
+
+
+def upward_labels(up_offsets, up_targets, up_weights):
+    """ Searches the upward edges from every city, the label of the city
+        A city is stalled, and left out of the label, if a more important city of the label gives it a lower cost
+        through one of its upward edges, since the route through the stalled city can not be a cheapest one
+    :param up_offsets: Offsets array of the upward edges of every city
+    :param up_targets: Targets array of the upward edges
+    :param up_weights: Array of the weights of the upward edges
+    :return:           Label offsets array, Label hubs array, Label costs array, Label parents array,
+                       Label edges array, see ContractionHierarchy
+    """
+    offsets, targets, weights = up_offsets.tolist(), up_targets.tolist(), up_weights.tolist()
+    city_count = len(offsets) - 1
+    label_cities, hubs, costs, parents, edges = (array.array('l'), array.array('l'), array.array('d'),
+                                                 array.array('l'), array.array('l'))
+    for city in xrange(city_count):
+        hub_costs = {city: 0.0}
+        previous = {city: (-1, -1)}   # City id -> (position of the previous city in the label, upward edge)
+        positions = dict()            # City id -> position in the label, in search order
+        heap = [(0.0, city)]
+        while heap:
+            cost, hub = heapq.heappop(heap)
+            if cost > hub_costs[hub] or hub in positions:
+                continue
+            start_offset, end_offset = offsets[hub], offsets[hub + 1]
+            stalled = False
+            for edge in xrange(start_offset, end_offset):
+                target_cost = hub_costs.get(targets[edge])
+                if target_cost is not None and target_cost + weights[edge] < cost:
+                    stalled = True
+                    break
+            if stalled:
+                continue
+            positions[hub] = len(positions)
+            label_cities.append(city)
+            hubs.append(hub)
+            costs.append(cost)
+            parent_position, parent_edge = previous[hub]
+            parents.append(parent_position)
+            edges.append(parent_edge)
+            for edge in xrange(start_offset, end_offset):
+                target, new_cost = targets[edge], cost + weights[edge]
+                if new_cost < hub_costs.get(target, float('inf')):
+                    hub_costs[target] = new_cost
+                    previous[target] = (positions[hub], edge)
+                    heapq.heappush(heap, (new_cost, target))
+    label_cities, hubs, parents, edges = [numpy.frombuffer(values, dtype=values.typecode).astype(numpy.int64)
+                                          for values in (label_cities, hubs, parents, edges)]
+    costs = numpy.frombuffer(costs, dtype=numpy.float64).copy()
+    label_offsets = numpy.zeros(city_count + 1, dtype=numpy.int64)
+    label_offsets[1:] = numpy.cumsum(numpy.bincount(label_cities, minlength=city_count))
+    # Sort every label by city id, and move the parents along with their cities
+    order = numpy.lexsort((hubs, label_cities))
+    new_positions = numpy.empty(len(order), dtype=numpy.int64)
+    new_positions[order] = numpy.arange(len(order)) - label_offsets[label_cities[order]]
+    parents = parents[order]
+    has_parent = parents >= 0
+    parents[has_parent] = new_positions[parents[has_parent] + label_offsets[label_cities[order]][has_parent]]
+    return label_offsets, hubs[order].astype(numpy.int32), costs[order], parents.astype(numpy.int32), \
+           edges[order].astype(numpy.int32)
+
+
+def witness_costs(neighbors, edge_weights, source, excluded_city, max_cost, target_cities):
+    """ Searches the roads from a city that do not pass through the city being contracted
+    :param neighbors:     List of the dictionaries mapping every neighbor of a city to the edge between them
+    :param edge_weights:  List of the weights of the edges
+    :param source:        City id the search starts from
+    :param excluded_city: City id of the city being contracted
+    :param max_cost:      Cities that cost more than this are not searched
+    :param target_cities: Set of the city ids whose costs are needed, the search stops once they are all settled
+    :return:              Dictionary mapping city id to the cost of a road to it, not always the cheapest
+    """
+    costs = {source: 0.0}
+    heap = [(0.0, source)]
+    settled = 0
+    unsettled_targets = len(target_cities)
+    while heap and settled < witness_settle_limit:
+        cost, city = heapq.heappop(heap)
+        if cost > costs[city]:
+            continue
+        settled += 1
+        if city in target_cities:
+            unsettled_targets -= 1
+            if not unsettled_targets:
+                break
+        for neighbor, edge in neighbors[city].iteritems():
+            new_cost = cost + edge_weights[edge]
+            if neighbor != excluded_city and new_cost <= max_cost and new_cost < costs.get(neighbor, float('inf')):
+                costs[neighbor] = new_cost
+                heapq.heappush(heap, (new_cost, neighbor))
+    return costs
+
+
+def needed_shortcuts(neighbors, edge_weights, city):
+    """ Finds the shortcuts that contracting a city needs
+    :param neighbors:    List of the dictionaries mapping every neighbor of a city to the edge between them
+    :param edge_weights: List of the weights of the edges
+    :param city:         City id of the city to be contracted
+    :return:             List of tuples (first neighbor, second neighbor, weight, edge to the first neighbor,
+                         edge to the second neighbor)
+    """
+    neighbor_edges = neighbors[city].items()
+    shortcuts = list()
+    for index, (first_neighbor, first_edge) in enumerate(neighbor_edges[:-1]):
+        first_weight = edge_weights[first_edge]
+        other_edges = neighbor_edges[index + 1:]
+        costs = witness_costs(neighbors, edge_weights, first_neighbor, city,
+                              first_weight + max(edge_weights[edge] for neighbor, edge in other_edges),
+                              set(neighbor for neighbor, edge in other_edges))
+        for second_neighbor, second_edge in other_edges:
+            weight = first_weight + edge_weights[second_edge]
+            if costs.get(second_neighbor, float('inf')) > weight:
+                shortcuts.append((first_neighbor, second_neighbor, weight, first_edge, second_edge))
+    return shortcuts
+
+
+def build_hierarchy(road_graph, arc_weights):
+    """ Contracts all the cities of the road graph
+    :param road_graph:  RoadGraph object
+    :param arc_weights: Array of the weight of every arc in the metric of the hierarchy
+    :return:            ContractionHierarchy object
+    """
+    city_count = len(road_graph)
+    arc_weights = numpy.asarray(arc_weights, dtype=numpy.float64).tolist()
+    offsets, targets = road_graph.offsets.tolist(), road_graph.targets.tolist()
+    # Every edge joins its two ends, the cheapest arc between two cities stands for all of them
+    edge_ends, edge_weights, edge_arcs, edge_halves = list(), list(), list(), list()
+    neighbors = [dict() for city in xrange(city_count)]
+    for city in xrange(city_count):
+        for arc in xrange(offsets[city], offsets[city + 1]):
+            target = targets[arc]
+            edge = neighbors[city].get(target)
+            if edge is None:
+                edge = neighbors[city][target] = neighbors[target][city] = len(edge_weights)
+                edge_ends.append((city, target))
+                edge_weights.append(arc_weights[arc])
+                edge_arcs.append(arc)
+                edge_halves.append(None)
+            elif arc_weights[arc] < edge_weights[edge]:
+                edge_ends[edge], edge_weights[edge], edge_arcs[edge] = (city, target), arc_weights[arc], arc
+    contracted_neighbors = [0] * city_count
+    levels = [0] * city_count
+    ranks = [-1] * city_count
+    up_edges = list()   # (owner city, target city, edge) of every upward edge, in contraction order
+
+    def priority(city):
+        """ Calculates the contraction priority of a city, smaller first
+        :param city: City id
+        :return:     Priority of the city, List of the shortcuts its contraction needs, see needed_shortcuts
+        """
+        shortcuts = needed_shortcuts(neighbors, edge_weights, city)
+        return len(shortcuts) - len(neighbors[city]) + contracted_neighbors[city] + levels[city], shortcuts
+
+    priorities = [priority(city)[0] for city in xrange(city_count)]
+    heap = [(city_priority, city) for city, city_priority in enumerate(priorities)]
+    heapq.heapify(heap)
+    rank = 0
+    while heap:
+        city_priority, city = heapq.heappop(heap)
+        if ranks[city] >= 0 or city_priority != priorities[city]:
+            continue
+        priorities[city], shortcuts = priority(city)
+        if heap and priorities[city] > heap[0][0]:
+            heapq.heappush(heap, (priorities[city], city))
+            continue
+        for first_neighbor, second_neighbor, weight, first_edge, second_edge in shortcuts:
+            edge = neighbors[first_neighbor].get(second_neighbor)
+            if edge is not None and edge_weights[edge] <= weight:
+                continue
+            edge = neighbors[first_neighbor][second_neighbor] = neighbors[second_neighbor][first_neighbor] = \
+                len(edge_weights)
+            edge_ends.append((first_neighbor, second_neighbor))
+            edge_weights.append(weight)
+            edge_arcs.append(-1)
+            edge_halves.append((first_edge, second_edge))
+        ranks[city] = rank
+        rank += 1
+        for neighbor, edge in neighbors[city].iteritems():
+            up_edges.append((city, neighbor, edge))
+            del neighbors[neighbor][city]
+            contracted_neighbors[neighbor] += 1
+            levels[neighbor] = max(levels[neighbor], levels[city] + 1)
+        for neighbor in neighbors[city]:
+            priorities[neighbor] = priority(neighbor)[0]
+            heapq.heappush(heap, (priorities[neighbor], neighbor))
+        neighbors[city] = None
+    return hierarchy_from_edges(ranks, up_edges, edge_ends, edge_weights, edge_arcs, edge_halves)
+
+
+def hierarchy_from_edges(ranks, up_edges, edge_ends, edge_weights, edge_arcs, edge_halves):
+    """ Stores the upward edges in CSR form
+    :param ranks:        List of the position of every city in the contraction order
+    :param up_edges:     List of (owner city, target city, edge) of the upward edges
+    :param edge_ends:    List of the two cities of every edge
+    :param edge_weights: List of the weights of the edges
+    :param edge_arcs:    List of the arc of every road segment edge, -1 for the shortcuts
+    :param edge_halves:  List of the edges from the middle city to the two ends of every shortcut, None for the roads
+    :return:             ContractionHierarchy object
+    """
+    owners = numpy.array([owner for owner, target, edge in up_edges], dtype=numpy.int64)
+    order = numpy.argsort(owners, kind='mergesort').tolist()
+    positions = dict((up_edges[index][2], position) for position, index in enumerate(order))
+    up_offsets = numpy.zeros(len(ranks) + 1, dtype=numpy.int64)
+    up_offsets[1:] = numpy.cumsum(numpy.bincount(owners, minlength=len(ranks)))
+    up_targets, up_weights, up_arcs, up_first, up_second = list(), list(), list(), list(), list()
+    for index in order:
+        owner, target, edge = up_edges[index]
+        up_targets.append(target)
+        up_weights.append(edge_weights[edge])
+        up_arcs.append(edge_arcs[edge])
+        if edge_halves[edge] is None:
+            up_first.append(-1)
+            up_second.append(-1)
+        else:
+            owner_half, target_half = edge_halves[edge]
+            if owner != edge_ends[edge][0]:
+                owner_half, target_half = target_half, owner_half
+            up_first.append(positions[owner_half])
+            up_second.append(positions[target_half])
+    up_arrays = [numpy.array(values, dtype=dtype) for values, dtype in
+                 ((up_targets, numpy.int64), (up_weights, numpy.float64), (up_arcs, numpy.int64),
+                  (up_first, numpy.int64), (up_second, numpy.int64))]
+    return ContractionHierarchy(numpy.array(ranks, dtype=numpy.int64), up_offsets, *(up_arrays +
+                                list(upward_labels(up_offsets, up_arrays[0], up_arrays[1]))))
+
+
+def hierarchy_directory(segments_path, metric):
+    """ Returns the directory of the hierarchy of a metric
+    :param segments_path: Path of road-segments.txt
+    :param metric:        Name of the metric
+    :return:              Path of the directory, inside the cache directory of the road graph
+    """
+    return os.path.join(cache_directory(segments_path), 'hierarchy-' + metric)
+
+
+def load_saved_hierarchy(segments_path, metric):
+    """ Memory-maps the saved arrays of a hierarchy
+    :param segments_path: Path of road-segments.txt
+    :param metric:        Name of the metric
+    :return:              ContractionHierarchy object, None if it was not saved or was saved by another version
+    """
+    directory = hierarchy_directory(segments_path, metric)
+    try:
+        if numpy.load(os.path.join(directory, 'version.npy'))[0] != hierarchy_version:
+            return None
+        return ContractionHierarchy(*[numpy.load(os.path.join(directory, name + '.npy'), mmap_mode='r')
+                                      for name in hierarchy_arrays])
+    except (IOError, OSError, ValueError, IndexError):
+        return None
+
+
+def save_hierarchy(segments_path, metric, hierarchy):
+    """ Saves the arrays of a hierarchy in the cache directory of the road graph, the directory is replaced atomically
+        The hierarchy is not saved if the cache directory does not exist or can not be written
+    :param segments_path: Path of road-segments.txt
+    :param metric:        Name of the metric
+    :param hierarchy:     ContractionHierarchy object
+    """
+    directory = hierarchy_directory(segments_path, metric)
+    try:
+        temp_directory = tempfile.mkdtemp(dir=cache_directory(segments_path), prefix='.hierarchy-')
+    except (IOError, OSError):
+        return
+    try:
+        for name in hierarchy_arrays:
+            numpy.save(os.path.join(temp_directory, name + '.npy'), getattr(hierarchy, name))
+        numpy.save(os.path.join(temp_directory, 'version.npy'), numpy.array([hierarchy_version]))
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.rename(temp_directory, directory)
+    except (IOError, OSError):
+        shutil.rmtree(temp_directory, ignore_errors=True)
+
+
+def load_hierarchy(road_graph, metric, arc_weights, segments_path=None):
+    """ Loads the hierarchy of a metric, building and saving it if it was not saved
+    :param road_graph:    RoadGraph object
+    :param metric:        Name of the metric
+    :param arc_weights:   Array of the weight of every arc in the metric
+    :param segments_path: Path of road-segments.txt whose cache directory keeps the hierarchy, None to only build it
+    :return:              ContractionHierarchy object
+    """
+    if segments_path is not None:
+        hierarchy = load_saved_hierarchy(segments_path, metric)
+        if hierarchy is not None:
+            return hierarchy
+    # Building takes tens of seconds, which the first query would otherwise spend without a word
+    sys.stderr.write('Building the contraction hierarchy of %s, which takes up to a minute and a half; '
+                     '`python contraction.py` builds all of them ahead of the queries\n' % metric)
+    start_time = time.time()
+    hierarchy = build_hierarchy(road_graph, arc_weights)
+    if segments_path is not None:
+        save_hierarchy(segments_path, metric, hierarchy)
+    sys.stderr.write('Built the contraction hierarchy of %s in %.1f s\n' % (metric, time.time() - start_time))
+    return hierarchy
+
+
+def main():
+    """ Main function
+    """
+    from search import RouteFinder, metrics
+    segments_path = sys.argv[1] if len(sys.argv) > 1 else default_segments_path
+    gps_path = sys.argv[2] if len(sys.argv) > 2 else default_gps_path
+    road_graph = load_road_graph(segments_path, gps_path)
+    route_finder = RouteFinder(road_graph)
+    for metric in metrics:
+        start_time = time.time()
+        hierarchy = build_hierarchy(road_graph, route_finder.weights[metric])
+        save_hierarchy(segments_path, metric, hierarchy)
+        print '%s: %d upward edges, %d shortcuts, built in %.1f s' % (metric, len(hierarchy),
+                                                                      hierarchy.shortcut_count(),
+                                                                      time.time() - start_time)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,509 @@
+#!/usr/bin/env python
+#
+# road_graph.py : Compiled road graph of route.py, with a binary cache
+#
+# Prerequisites : Install the package 'numpy'
+#                 Execute the command `sudo pip install numpy`
+#
+# Usage         : python road_graph.py [road-segments.txt] [city-gps.txt]
+#                 Parses the files, writes the binary cache and prints what was cleaned
+#
+# City and highway names are interned to integer ids as soon as they are seen, the cities of city-gps.txt first
+# in file order, then the new cities of road-segments.txt. The roads are bidirectional, so every road segment
+# becomes two arcs of a compressed sparse row (CSR) adjacency, with the length, speed limit, travel time,
+# highway and segment id of every arc in parallel arrays.
+#
+# The files contain mistakes, which are cleaned as the rows are read:
+#   malformed rows   -> Rows without five fields or with numbers that can not be read are skipped
+#   loops            -> Segments from a city to itself are skipped
+#   missing length   -> A length of 0 is replaced by the great-circle distance between the two cities, the
+#                       segment is skipped if one of them has no GPS
+#   missing speed    -> An empty or 0 speed limit is replaced by the median speed limit of the other segments of
+#                       the same highway, or of all the segments if the highway has none
+#   repeated cities  -> A city with several GPS lines is at the last of them
+# Cities that only appear in road-segments.txt, like the 'Jct_' junctions, have NaN coordinates.
+#
+# The great-circle distance between two cities is a lower bound of their road distance only if the GPS is right,
+# and many cities of city-gps.txt are placed at a namesake hundreds of miles away. The GPS of a city is trusted
+# unless the roads to another trusted city are shorter than min_hop_ratio times the great-circle distance; the
+# city with the most such roads is distrusted first, until no trusted pair is left. The other cities are bounded
+# through their cluster, the connected group of untrusted cities around them: every untrusted city keeps the road
+# distances, inside its cluster, to the trusted cities with a road into the cluster, its anchors. A city is at
+# least as far from the goal as its nearest anchor is, minus the distance to that anchor.
+#
+# The arrays can be saved in a cache directory next to road-segments.txt, one raw .npy file per array. Later runs
+# on unchanged files memory-map the arrays in a few milliseconds instead of parsing the text, which takes about 0.6 s.
+# Most of the parse is one Dijkstra per trusted city through its clusters; after each pass of distrusting cities
+# only the searches that reached a newly distrusted city are run again.
+#
+
+import array
+import heapq
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy
+
+cache_version = 2            # Bumped whenever the layout of the cached arrays changes
+earth_radius = 3958.8        # Mean radius of the earth in miles
+length_imputed = 1           # Flag of the segments whose length is the great-circle distance
+speed_imputed = 2            # Flag of the segments whose speed limit is a median
+min_hop_ratio = 0.9          # Trusted cities are at least this fraction of their great-circle distance apart by road
+default_segments_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'road-segments.txt')
+default_gps_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'city-gps.txt')
+cached_arrays = ('city_names', 'highway_names', 'latitude', 'longitude', 'segment_sources', 'segment_targets',
+                 'segment_lengths', 'segment_speeds', 'segment_highways', 'segment_flags', 'offsets', 'targets',
+                 'lengths', 'speeds', 'times', 'highways', 'segments', 'trusted', 'bound_scale', 'anchor_offsets',
+                 'anchor_cities', 'anchor_distances')
+
+
+class InternTable(dict):
+    """ Dictionary that gives every new name the next integer id on first lookup
+    """
+    def __missing__(self, name):
+        """ Interns a new name
+        :param name: Name that is looked up for the first time
+        :return:     ID of the name
+        """
+        interned_id = self[name] = len(self)
+        return interned_id
+
+
+def great_circle_distance(latitude1, longitude1, latitude2, longitude2):
+    """ Calculates the haversine distance between points on the earth, works element-wise on arrays
+    :param latitude1:  Latitude of the first point in degrees
+    :param longitude1: Longitude of the first point in degrees
+    :param latitude2:  Latitude of the second point in degrees
+    :param longitude2: Longitude of the second point in degrees
+    :return:           Distance in miles, NaN if a coordinate is NaN
+    """
+    latitude1, longitude1, latitude2, longitude2 = [numpy.radians(value) for value in
+                                                    (latitude1, longitude1, latitude2, longitude2)]
+    haversine = numpy.sin((latitude2 - latitude1) / 2) ** 2 + \
+                numpy.cos(latitude1) * numpy.cos(latitude2) * numpy.sin((longitude2 - longitude1) / 2) ** 2
+    return 2 * earth_radius * numpy.arcsin(numpy.sqrt(numpy.minimum(1.0, haversine)))
+
+
+class RoadGraph:
+    """ Integer array representation of the road network
+    """
+    def __init__(self, city_names, highway_names, latitude, longitude, segment_sources, segment_targets,
+                 segment_lengths, segment_speeds, segment_highways, segment_flags, offsets, targets, lengths,
+                 speeds, times, highways, segments, trusted, bound_scale, anchor_offsets, anchor_cities,
+                 anchor_distances):
+        """ Constructor
+        :param city_names:       Array of the city names, indexed by city id
+        :param highway_names:    Array of the highway names, indexed by highway id
+        :param latitude:         Array of the latitudes in degrees, NaN for the cities without GPS
+        :param longitude:        Array of the longitudes in degrees, NaN for the cities without GPS
+        :param segment_sources:  Array of the first city of every cleaned road segment
+        :param segment_targets:  Array of the second city of every road segment
+        :param segment_lengths:  Array of the lengths of the road segments in miles
+        :param segment_speeds:   Array of the speed limits of the road segments in miles per hour
+        :param segment_highways: Array of the highway ids of the road segments
+        :param segment_flags:    Array of the length_imputed and speed_imputed flags of the road segments
+        :param offsets:          Offsets array of the arcs leaving every city
+        :param targets:          Targets array of the arcs
+        :param lengths:          Array of the lengths of the arcs in miles
+        :param speeds:           Array of the speed limits of the arcs in miles per hour
+        :param times:            Array of the travel times of the arcs in hours
+        :param highways:         Array of the highway ids of the arcs
+        :param segments:         Array of the road segment ids of the arcs
+        :param trusted:          Boolean array of the cities whose GPS is trusted
+        :param bound_scale:      Array of one factor, the great-circle distance between trusted cities times the
+                                 factor is at most their road distance
+        :param anchor_offsets:   Offsets array of the anchors of every city, empty for the trusted cities
+        :param anchor_cities:    Targets array of the anchors, the trusted cities next to the cluster of the city
+        :param anchor_distances: Array of the road distances in miles to the anchors, inside the cluster
+        """
+        self.city_names = city_names
+        self.highway_names = highway_names
+        self.latitude = latitude
+        self.longitude = longitude
+        self.segment_sources = segment_sources
+        self.segment_targets = segment_targets
+        self.segment_lengths = segment_lengths
+        self.segment_speeds = segment_speeds
+        self.segment_highways = segment_highways
+        self.segment_flags = segment_flags
+        self.offsets = offsets
+        self.targets = targets
+        self.lengths = lengths
+        self.speeds = speeds
+        self.times = times
+        self.highways = highways
+        self.segments = segments
+        self.trusted = trusted
+        self.bound_scale = bound_scale
+        self.anchor_offsets = anchor_offsets
+        self.anchor_cities = anchor_cities
+        self.anchor_distances = anchor_distances
+        self.city_ids = None   # City name -> city id, built on the first lookup
+
+    def __len__(self):
+        """ Returns the number of cities
+        :return: Number of cities
+        """
+        return len(self.city_names)
+
+    def city_id(self, city_name):
+        """ Looks up the id of a city
+        :param city_name: Name of the city as written in the files
+        :return:          City id, None if the city is unknown
+        """
+        if self.city_ids is None:
+            self.city_ids = dict((name, city_id) for city_id, name in enumerate(self.city_names.tolist()))
+        return self.city_ids.get(city_name)
+
+    def arcs_of(self, city_id):
+        """ Returns the range of the arcs leaving a city
+        :param city_id: ID of the city
+        :return:        Range of arc indices into targets, lengths, speeds, times, highways and segments
+        """
+        return xrange(self.offsets[city_id], self.offsets[city_id + 1])
+
+
+def build_adjacency(city_count, sources, targets):
+    """ Builds the CSR adjacency of bidirectional edges
+    :param city_count: Number of cities
+    :param sources:    Array of the first city of every edge
+    :param targets:    Array of the second city of every edge
+    :return:           Offsets array, Targets array, Array of the edge id of every arc
+    """
+    arc_sources = numpy.concatenate((sources, targets))
+    arc_targets = numpy.concatenate((targets, sources))
+    arc_edges = numpy.concatenate((numpy.arange(len(sources)), numpy.arange(len(sources))))
+    order = numpy.lexsort((arc_edges, arc_targets, arc_sources))
+    offsets = numpy.zeros(city_count + 1, dtype=numpy.int64)
+    offsets[1:] = numpy.cumsum(numpy.bincount(arc_sources, minlength=city_count))
+    return offsets, arc_targets[order], arc_edges[order]
+
+
+def impute_speeds(speeds, highways, highway_count):
+    """ Replaces the missing speed limits by the median speed limit of the same highway, or of all the segments
+    :param speeds:        Array of the speed limits, 0 where missing
+    :param highways:      Array of the highway ids
+    :param highway_count: Number of highways
+    :return:              Array of the speed limits, Boolean array of the imputed speed limits
+    """
+    missing = speeds <= 0
+    known_speeds = speeds[~missing]
+    overall_median = numpy.median(known_speeds) if len(known_speeds) else 1.0
+    medians = numpy.full(highway_count, overall_median)
+    known_highways = highways[~missing]
+    for highway_id in numpy.unique(highways[missing]):
+        highway_speeds = known_speeds[known_highways == highway_id]
+        if len(highway_speeds):
+            medians[highway_id] = numpy.median(highway_speeds)
+    return numpy.where(missing, medians[highways], speeds), missing
+
+
+def search_cluster(offsets, targets, lengths, trusted, anchor):
+    """ Runs Dijkstra from a trusted city through the untrusted cities of the clusters next to it
+    :param offsets: List of the offsets of the arcs leaving every city
+    :param targets: List of the targets of the arcs
+    :param lengths: List of the lengths of the arcs
+    :param trusted: List of the flags of the cities whose GPS is trusted
+    :param anchor:  ID of the trusted city
+    :return:        Arrays of the untrusted cities reached, nearest first, and of their road distances, and Arrays
+                    of the other trusted cities reached and of the road distances of these hops
+    """
+    distances = {anchor: 0.0}
+    heap = [(0.0, anchor)]
+    reached_cities, reached_distances = list(), list()
+    hops = dict()   # Trusted city -> road distance
+    while heap:
+        distance, city = heapq.heappop(heap)
+        if distance > distances[city]:
+            continue
+        if city != anchor:
+            reached_cities.append(city)
+            reached_distances.append(distance)
+        for arc in xrange(offsets[city], offsets[city + 1]):
+            target, new_distance = targets[arc], distance + lengths[arc]
+            if trusted[target]:
+                if target != anchor and new_distance < hops.get(target, float('inf')):
+                    hops[target] = new_distance
+            elif new_distance < distances.get(target, float('inf')):
+                distances[target] = new_distance
+                heapq.heappush(heap, (new_distance, target))
+    return numpy.array(reached_cities, dtype=numpy.int64), numpy.array(reached_distances, dtype=numpy.float64), \
+           numpy.array(hops.keys(), dtype=numpy.int64), numpy.array(hops.values(), dtype=numpy.float64)
+
+
+def cluster_distances(offsets, targets, lengths, trusted, searches):
+    """ Calculates the road distances from every trusted city through the clusters of untrusted cities next to it
+    :param offsets:  Offsets array of the arcs leaving every city
+    :param targets:  Targets array of the arcs
+    :param lengths:  Array of the lengths of the arcs
+    :param trusted:  Boolean array of the cities whose GPS is trusted
+    :param searches: Dictionary that maps a trusted city to its search_cluster result, the missing ones are run
+                     and added
+    :return:         Anchor offsets array, Anchor cities array, Anchor distances array, and Arrays of the first city,
+                     the second city and the road distance of the hops, the shortest roads between two trusted
+                     cities that only pass through untrusted cities
+    """
+    anchors = numpy.nonzero(trusted)[0].tolist()
+    if any(anchor not in searches for anchor in anchors):
+        offset_list, target_list, length_list, trusted_list = \
+            offsets.tolist(), targets.tolist(), lengths.tolist(), trusted.tolist()
+        for anchor in anchors:
+            if anchor not in searches:
+                searches[anchor] = search_cluster(offset_list, target_list, length_list, trusted_list, anchor)
+    empty = (numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.float64)) * 2
+    anchor_searches = [empty] + [searches[anchor] for anchor in anchors]
+    anchored_cities, anchor_distances, hop_seconds, hop_distances = \
+        [numpy.concatenate([search[i] for search in anchor_searches]) for i in range(4)]
+    anchor_cities = numpy.repeat([0] + anchors, [len(search[0]) for search in anchor_searches])
+    hop_firsts = numpy.repeat([0] + anchors, [len(search[2]) for search in anchor_searches])
+    order = numpy.argsort(anchored_cities, kind='mergesort')
+    anchor_offsets = numpy.zeros(len(trusted) + 1, dtype=numpy.int64)
+    anchor_offsets[1:] = numpy.cumsum(numpy.bincount(anchored_cities, minlength=len(trusted)))
+    return anchor_offsets, anchor_cities.astype(numpy.int64)[order], anchor_distances[order], \
+           hop_firsts.astype(numpy.int64), hop_seconds, hop_distances
+
+
+def trust_gps(latitude, longitude, offsets, targets, lengths):
+    """ Decides which GPS coordinates are trusted and calculates the anchors of the other cities
+        Only the searches that reached a newly distrusted city are run again in the next pass, the others can
+        not change since they never went past a trusted city
+    :param latitude:  Array of the latitudes, NaN for the cities without GPS
+    :param longitude: Array of the longitudes, NaN for the cities without GPS
+    :param offsets:   Offsets array of the arcs leaving every city
+    :param targets:   Targets array of the arcs
+    :param lengths:   Array of the lengths of the arcs
+    :return:          Boolean array of the trusted cities, Array of the bound scale, Anchor offsets array,
+                      Anchor cities array, Anchor distances array
+    """
+    trusted = ~numpy.isnan(latitude)
+    searches = dict()   # Trusted city -> search_cluster result
+    while True:
+        anchor_offsets, anchor_cities, anchor_distances, firsts, seconds, hop_distances = \
+            cluster_distances(offsets, targets, lengths, trusted, searches)
+        with numpy.errstate(divide='ignore'):
+            ratios = hop_distances / great_circle_distance(latitude[firsts], longitude[firsts],
+                                                           latitude[seconds], longitude[seconds])
+        bad = ratios < min_hop_ratio
+        if not bad.any():
+            break
+        firsts, seconds = firsts[bad], seconds[bad]
+        bad_counts = numpy.bincount(numpy.concatenate((firsts, seconds)), minlength=len(trusted))
+        # Every bad hop distrusts the city with more bad hops, the city with the larger id on ties
+        first_distrusted = (bad_counts[firsts] > bad_counts[seconds]) | \
+                           ((bad_counts[firsts] == bad_counts[seconds]) & (firsts > seconds))
+        distrusted = numpy.unique(numpy.where(first_distrusted, firsts, seconds)).tolist()
+        trusted[distrusted] = False
+        # The hops are symmetric, so the searches that reached a distrusted city are those of its hops
+        stale_cities = set(distrusted)
+        for city in distrusted:
+            stale_cities.update(searches[city][2].tolist())
+        for city in stale_cities:
+            searches.pop(city, None)
+    # Shrunk a little, so rounding errors never make the bound larger than a road distance
+    bound_scale = min(1.0, ratios.min() if len(ratios) else 1.0) * (1 - 1e-9)
+    return trusted, numpy.array([bound_scale]), anchor_offsets, anchor_cities, anchor_distances
+
+
+def report_rows(message, rows):
+    """ Reports the cleaned rows of road-segments.txt on stderr
+    :param message: Description of what was done to the rows
+    :param rows:    List of the line numbers of the rows
+    """
+    if rows:
+        shown_rows = ', '.join(str(row) for row in rows[:10]) + (', ...' if len(rows) > 10 else '')
+        sys.stderr.write('%s %d road segments: lines %s\n' % (message, len(rows), shown_rows))
+
+
+def parse_road_graph(segments_path=default_segments_path, gps_path=default_gps_path):
+    """ Parses the road segments and the GPS coordinates in one streaming pass over each file
+    :param segments_path: Path of road-segments.txt
+    :param gps_path:      Path of city-gps.txt
+    :return:              RoadGraph object
+    """
+    city_ids = InternTable()       # City name -> city id, in order of first appearance
+    highway_ids = InternTable()    # Highway name -> highway id
+    gps_ids, latitude, longitude = array.array('l'), array.array('d'), array.array('d')
+    with open(gps_path, 'r') as fh:
+        for line in fh:
+            fields = line.split()
+            try:
+                city_latitude, city_longitude = float(fields[1]), float(fields[2])
+            except (IndexError, ValueError):
+                continue
+            gps_ids.append(city_ids[fields[0]])
+            latitude.append(city_latitude)
+            longitude.append(city_longitude)
+    sources, targets, highways = array.array('l'), array.array('l'), array.array('l')
+    lengths, speeds = array.array('d'), array.array('d')
+    line_numbers = array.array('l')
+    malformed_rows, loop_rows = list(), list()
+    with open(segments_path, 'r') as fh:
+        for line_number, line in enumerate(fh, 1):
+            fields = line.rstrip('\r\n').split(' ')
+            try:
+                if len(fields) != 5:
+                    raise ValueError
+                length = float(fields[2])
+                speed = float(fields[3]) if fields[3] else 0.0
+            except ValueError:
+                malformed_rows.append(line_number)
+                continue
+            if fields[0] == fields[1]:
+                loop_rows.append(line_number)
+                continue
+            sources.append(city_ids[fields[0]])
+            targets.append(city_ids[fields[1]])
+            highways.append(highway_ids[fields[4]])
+            lengths.append(length)
+            speeds.append(speed)
+            line_numbers.append(line_number)
+    report_rows('Skipping malformed', malformed_rows)
+    report_rows('Skipping looping', loop_rows)
+    city_latitude = numpy.full(len(city_ids), numpy.nan)
+    city_longitude = numpy.full(len(city_ids), numpy.nan)
+    # A city with several GPS lines is at the last of them
+    city_latitude[numpy.frombuffer(gps_ids, dtype=gps_ids.typecode)] = numpy.frombuffer(latitude, dtype=numpy.float64)
+    city_longitude[numpy.frombuffer(gps_ids, dtype=gps_ids.typecode)] = numpy.frombuffer(longitude,
+                                                                                         dtype=numpy.float64)
+    sources, targets, highways, line_numbers = [numpy.frombuffer(values, dtype=values.typecode).astype(numpy.int64)
+                                                for values in (sources, targets, highways, line_numbers)]
+    lengths, speeds = [numpy.frombuffer(values, dtype=numpy.float64).copy() for values in (lengths, speeds)]
+    flags = numpy.zeros(len(sources), dtype=numpy.int8)
+    missing_lengths = lengths <= 0
+    distances = great_circle_distance(city_latitude[sources], city_longitude[sources],
+                                      city_latitude[targets], city_longitude[targets])
+    kept = ~(missing_lengths & numpy.isnan(distances))
+    report_rows('Imputing the length of', line_numbers[missing_lengths & kept].tolist())
+    report_rows('Skipping zero length', line_numbers[~kept].tolist())
+    lengths = numpy.where(missing_lengths, distances, lengths)
+    flags[missing_lengths] |= length_imputed
+    speeds, missing_speeds = impute_speeds(speeds, highways, len(highway_ids))
+    report_rows('Imputing the speed limit of', line_numbers[missing_speeds & kept].tolist())
+    flags[missing_speeds] |= speed_imputed
+    sources, targets, lengths, speeds, highways, flags = [values[kept] for values in
+                                                          (sources, targets, lengths, speeds, highways, flags)]
+    offsets, arc_targets, arc_segments = build_adjacency(len(city_ids), sources, targets)
+    arc_lengths = lengths[arc_segments]
+    gps_bounds = trust_gps(city_latitude, city_longitude, offsets, arc_targets, arc_lengths)
+    return RoadGraph(interned_names(city_ids), interned_names(highway_ids), city_latitude, city_longitude,
+                     sources, targets, lengths, speeds, highways, flags, offsets, arc_targets, arc_lengths,
+                     speeds[arc_segments], arc_lengths / speeds[arc_segments], highways[arc_segments], arc_segments,
+                     *gps_bounds)
+
+
+def interned_names(interned_ids):
+    """ Lists the interned names in id order
+    :param interned_ids: InternTable object
+    :return:             Array of the names, indexed by interned id
+    """
+    names = [None] * len(interned_ids)
+    for name, interned_id in interned_ids.iteritems():
+        names[interned_id] = name
+    return numpy.array(names, dtype=str)
+
+
+def source_signature(*file_paths):
+    """ Identifies the contents of the input files by their sizes and modification times
+    :param file_paths: Paths of the input files
+    :return:           Array (cache version, size and modification time of every file)
+    """
+    signature = [cache_version]
+    for file_path in file_paths:
+        stat = os.stat(file_path)
+        signature.extend((stat.st_size, stat.st_mtime))
+    return numpy.array(signature, dtype=numpy.float64)
+
+
+def cache_directory(segments_path):
+    """ Returns the cache directory of a road segments file
+    :param segments_path: Path of road-segments.txt
+    :return:              Path of the cache directory
+    """
+    return segments_path + '.cache'
+
+
+def load_cached_road_graph(segments_path, gps_path):
+    """ Memory-maps the cached arrays of the input files
+    :param segments_path: Path of road-segments.txt
+    :param gps_path:      Path of city-gps.txt
+    :return:              RoadGraph object, None if there is no cache or an input has changed since
+    """
+    directory = cache_directory(segments_path)
+    try:
+        if not numpy.array_equal(numpy.load(os.path.join(directory, 'source.npy')),
+                                 source_signature(segments_path, gps_path)):
+            return None
+        return RoadGraph(*[numpy.load(os.path.join(directory, name + '.npy'), mmap_mode='r')
+                           for name in cached_arrays])
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def save_cached_road_graph(segments_path, gps_path, road_graph):
+    """ Saves the arrays of the input files in the cache directory, the directory is replaced atomically
+        The cache is skipped silently if the directory can not be written
+    :param segments_path: Path of road-segments.txt
+    :param gps_path:      Path of city-gps.txt
+    :param road_graph:    RoadGraph object
+    """
+    directory = cache_directory(segments_path)
+    try:
+        temp_directory = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(segments_path)), prefix='.roads-')
+    except (IOError, OSError):
+        return
+    try:
+        for name in cached_arrays:
+            numpy.save(os.path.join(temp_directory, name + '.npy'), getattr(road_graph, name))
+        numpy.save(os.path.join(temp_directory, 'source.npy'), source_signature(segments_path, gps_path))
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.rename(temp_directory, directory)
+    except (IOError, OSError):
+        shutil.rmtree(temp_directory, ignore_errors=True)
+
+
+def load_road_graph(segments_path=default_segments_path, gps_path=default_gps_path, use_cache=True):
+    """ Loads the road network
+    :param segments_path: Path of road-segments.txt
+    :param gps_path:      Path of city-gps.txt
+    :param use_cache:     Whether the binary cache is read, and written when it is missing or outdated
+    :return:              RoadGraph object
+    """
+    if use_cache:
+        road_graph = load_cached_road_graph(segments_path, gps_path)
+        if road_graph is not None:
+            return road_graph
+    road_graph = parse_road_graph(segments_path, gps_path)
+    if use_cache:
+        save_cached_road_graph(segments_path, gps_path, road_graph)
+    return road_graph
+
+
+def main():
+    """ Main function
+    """
+    segments_path = sys.argv[1] if len(sys.argv) > 1 else default_segments_path
+    gps_path = sys.argv[2] if len(sys.argv) > 2 else default_gps_path
+    start_time = time.time()
+    road_graph = parse_road_graph(segments_path, gps_path)
+    parse_seconds = time.time() - start_time
+    save_cached_road_graph(segments_path, gps_path, road_graph)
+    start_time = time.time()
+    road_graph = load_cached_road_graph(segments_path, gps_path)
+    if road_graph is None:
+        sys.exit('road_graph.py: could not write the cache %s' % cache_directory(segments_path))
+    load_seconds = time.time() - start_time
+    print '%d cities, %d without GPS, %d with untrusted GPS' % (len(road_graph), numpy.isnan(road_graph.latitude).sum(),
+                                                              (~road_graph.trusted).sum() -
+                                                              numpy.isnan(road_graph.latitude).sum())
+    print '%d highways, %d road segments, %d arcs' % (len(road_graph.highway_names), len(road_graph.segment_sources),
+                                                     len(road_graph.targets))
+    print 'Parsed in %.3f s, cache %s loaded in %.3f s' % (parse_seconds, cache_directory(segments_path),
+                                                           load_seconds)
+
+
+if __name__ == '__main__':
+    main()
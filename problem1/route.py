@@ -1 +1,92 @@
-# put your routing program here!
+#!/usr/bin/env python
+#
+# route.py : Finds the best route between two cities of the road network
+#
+# Prerequisites : Install the package 'numpy'
+#                 Execute the command `sudo pip install numpy`
+#
+# Usage         : python route.py [start-city] [end-city] [routing-option] [routing-algorithm]
+#                  where routing-option    -> segments, distance or time (default: distance)
+#                        routing-algorithm -> uniform, astar, bidirectional, bidirectional-astar or ch, the contraction
+#                                             hierarchy of contraction.py (default: astar)
+#                  Options: --no-cache -> Parse the text files instead of the binary cache, see road_graph.py
+#                           --stats    -> Print the number of expanded cities and the query time to stderr
+#                           --compare  -> Run every algorithm on the query and print their costs, expanded cities
+#                                         and query times to stderr
+#                 The query time of ch leaves out loading the hierarchy, which --stats and --compare print first
+#
+# Output        : [optimal?] [total-distance-in-miles] [total-time-in-hours] [start-city] [city 1] ... [end-city]
+#
+# The road network is loaded from the binary cache of road_graph.py, so a query does not parse the text files. The
+# contraction hierarchy of a metric is built on its first query, with a notice on stderr, or ahead of time by
+# contraction.py, and saved in the same cache.
+#
+
+import argparse
+import sys
+import time
+
+from road_graph import default_segments_path, load_road_graph
+from search import RouteFinder, engines, metrics
+
+
+def parse_arguments():
+    """ Parses the command line arguments
+    :return: Namespace with the parsed arguments
+    """
+    parser = argparse.ArgumentParser(description='Finds the best route between two cities')
+    parser.add_argument('start_city', help='City the route starts from, as written in road-segments.txt')
+    parser.add_argument('end_city', help='City the route ends at')
+    parser.add_argument('routing_option', nargs='?', choices=metrics, default='distance',
+                        help='Cost of the route that is minimized (default: distance)')
+    parser.add_argument('routing_algorithm', nargs='?', choices=engines, default='astar',
+                        help='Search algorithm (default: astar)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Parse the text files instead of reading and writing the binary cache')
+    parser.add_argument('--stats', action='store_true',
+                        help='Print the number of expanded cities and the query time to stderr')
+    parser.add_argument('--compare', action='store_true',
+                        help='Run every algorithm on the query and print their costs, expanded cities and query times '
+                             'to stderr')
+    return parser.parse_args()
+
+
+def main():
+    """ Main function
+    """
+    arguments = parse_arguments()
+    road_graph = load_road_graph(use_cache=not arguments.no_cache)
+    city_ids = list()
+    for city_name in (arguments.start_city, arguments.end_city):
+        city_id = road_graph.city_id(city_name)
+        if city_id is None:
+            sys.exit('route.py: unknown city %s' % city_name)
+        city_ids.append(city_id)
+    route_finder = RouteFinder(road_graph, None if arguments.no_cache else default_segments_path)
+    for engine in engines if arguments.compare else [arguments.routing_algorithm]:
+        if engine == 'ch':
+            # Loading, or on the first query building, the hierarchy is not part of the query time
+            start_time = time.time()
+            route_finder.hierarchy(arguments.routing_option)
+            if arguments.stats or arguments.compare:
+                sys.stderr.write('ch: hierarchy of %s ready in %.2f ms\n' %
+                                 (arguments.routing_option, (time.time() - start_time) * 1000))
+        start_time = time.time()
+        engine_route = route_finder.find(engine, city_ids[0], city_ids[1], arguments.routing_option)
+        query_seconds = time.time() - start_time
+        if engine == arguments.routing_algorithm:
+            route = engine_route
+        if arguments.stats or arguments.compare:
+            sys.stderr.write('%s: cost %r, expanded %d cities in %.2f ms\n' %
+                             (engine, engine_route.cost if engine_route else None,
+                              engine_route.expanded if engine_route else 0, query_seconds * 1000))
+    if route is None:
+        sys.exit('route.py: no route from %s to %s' % (arguments.start_city, arguments.end_city))
+    total_distance = sum(road_graph.lengths[arc] for arc in route.arcs)
+    total_time = sum(road_graph.times[arc] for arc in route.arcs)
+    print 'yes %.4f %.4f %s' % (total_distance, total_time,
+                                ' '.join(road_graph.city_names[city_id] for city_id in route.cities))
+
+
+if __name__ == '__main__':
+    main()
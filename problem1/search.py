@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+#
+# search.py : Shortest route queries over the road graph of route.py
+#
+# Prerequisites : Install the package 'numpy'
+#                 Execute the command `sudo pip install numpy`
+#
+# A route is the cheapest one in one of the metrics:
+#   segments -> Number of road segments
+#   distance -> Miles
+#   time     -> Hours at the speed limits
+# Uniform cost search is Dijkstra's algorithm with a binary heap. A* adds a lower bound of the remaining cost to
+# the goal to the priority of every city, so the search heads for the goal instead of growing a ball around the
+# start. The bound is the great-circle distance to the goal, scaled so that it never exceeds a road distance, and
+# turned into a time with the highest speed limit and into a segment count with the longest segment. The cities
+# without trusted GPS are bounded through the anchors of their cluster, see road_graph.py. The bound is
+# consistent, so no city is expanded twice in practice, but a city is expanded again if its cost improves anyway.
+#
+# The bidirectional searches grow one search from the start and one from the goal over the same bidirectional
+# roads, always expanding the side with the smaller priority, and stop once the two smallest priorities add up to
+# the cheapest route seen where the searches met. Bidirectional A* runs both sides on the average of the bound to
+# the goal and the bound to the start, p(v) = (bound to goal - bound to start) / 2 forward and -p(v) backward,
+# which keeps the costs of both sides consistent with each other, so the same stopping rule stays exact.
+#
+# The contraction hierarchy engine searches upward from both ends in the hierarchy of the metric, see
+# contraction.py, and unpacks the shortcuts of the route into road segments.
+#
+# The cost of a route is the exactly rounded sum of its arc weights, so every engine reports the same bits for
+# the same route, whatever order it added the weights in.
+#
+
+import heapq
+import math
+
+import numpy
+
+from contraction import load_hierarchy
+from road_graph import great_circle_distance
+
+metrics = ('segments', 'distance', 'time')
+engines = ('uniform', 'astar', 'bidirectional', 'bidirectional-astar', 'ch')
+
+
+class Route:
+    """ Result of a route query
+    """
+    def __init__(self, cost, cities, arcs, expanded):
+        """ Constructor
+        :param cost:     Cost of the route in the metric of the query
+        :param cities:   List of the city ids from the start to the goal
+        :param arcs:     List of the arcs of the roads taken from the start to the goal, in either direction
+        :param expanded: Number of cities expanded by the search
+        """
+        self.cost = cost
+        self.cities = cities
+        self.arcs = arcs
+        self.expanded = expanded
+
+
+class RouteFinder:
+    """ Route queries over a RoadGraph, with the arrays copied to lists for fast scalar access
+    """
+    def __init__(self, road_graph, segments_path=None):
+        """ Constructor
+        :param road_graph:    RoadGraph object
+        :param segments_path: Path of road-segments.txt whose cache directory keeps the contraction hierarchies,
+                              None to build them in memory
+        """
+        self.road_graph = road_graph
+        self.segments_path = segments_path
+        self.offsets = road_graph.offsets.tolist()
+        self.targets = road_graph.targets.tolist()
+        self.arc_sources = numpy.repeat(numpy.arange(len(road_graph)), numpy.diff(road_graph.offsets)).tolist()
+        self.hierarchies = dict()   # Metric -> ContractionHierarchy object, loaded on the first query
+        self.weights = {'segments': [1.0] * len(self.targets), 'distance': road_graph.lengths.tolist(),
+                        'time': road_graph.times.tolist()}
+        # Cost of one mile of the bound in every metric
+        self.mile_costs = {'segments': 1.0 / road_graph.lengths.max(), 'distance': 1.0,
+                           'time': 1.0 / road_graph.speeds.max()}
+
+    def lower_bounds(self, goal, metric):
+        """ Calculates a consistent lower bound of the cost from every city to the goal
+        :param goal:   City id of the goal
+        :param metric: Name of the metric, one of metrics
+        :return:       Array of the lower bounds, indexed by city id
+        """
+        graph = self.road_graph
+        scale = graph.bound_scale[0]
+        if graph.trusted[goal]:
+            bounds = scale * great_circle_distance(graph.latitude, graph.longitude, graph.latitude[goal],
+                                                   graph.longitude[goal])
+        else:
+            # The goal is at most the distance to an anchor of its cluster away from that anchor
+            bounds = numpy.full(len(graph), -numpy.inf)
+            for anchor_index in xrange(graph.anchor_offsets[goal], graph.anchor_offsets[goal + 1]):
+                anchor = graph.anchor_cities[anchor_index]
+                bounds = numpy.fmax(bounds, scale * great_circle_distance(graph.latitude, graph.longitude,
+                                                                          graph.latitude[anchor],
+                                                                          graph.longitude[anchor]) -
+                                    graph.anchor_distances[anchor_index])
+        bounds[~graph.trusted] = -numpy.inf
+        anchored_cities = numpy.nonzero(numpy.diff(graph.anchor_offsets))[0]
+        if len(anchored_cities):
+            bounds[anchored_cities] = numpy.maximum.reduceat(bounds[graph.anchor_cities] - graph.anchor_distances,
+                                                             graph.anchor_offsets[anchored_cities])
+        return numpy.maximum(bounds, 0) * self.mile_costs[metric]
+
+    def uniform(self, start, goal, metric):
+        """ Finds the cheapest route with uniform cost search
+        :param start:  City id of the start
+        :param goal:   City id of the goal
+        :param metric: Name of the metric, one of metrics
+        :return:       Route object, None if the goal can not be reached
+        """
+        return self.search(start, goal, metric, [0.0] * len(self.offsets))
+
+    def astar(self, start, goal, metric):
+        """ Finds the cheapest route with A* search
+        :param start:  City id of the start
+        :param goal:   City id of the goal
+        :param metric: Name of the metric, one of metrics
+        :return:       Route object, None if the goal can not be reached
+        """
+        return self.search(start, goal, metric, self.lower_bounds(goal, metric).tolist())
+
+    def bidirectional(self, start, goal, metric):
+        """ Finds the cheapest route with bidirectional uniform cost search
+        :param start:  City id of the start
+        :param goal:   City id of the goal
+        :param metric: Name of the metric, one of metrics
+        :return:       Route object, None if the goal can not be reached
+        """
+        return self.bidirectional_search(start, goal, metric, [0.0] * len(self.offsets))
+
+    def bidirectional_astar(self, start, goal, metric):
+        """ Finds the cheapest route with bidirectional A* search over the average of both bounds
+        :param start:  City id of the start
+        :param goal:   City id of the goal
+        :param metric: Name of the metric, one of metrics
+        :return:       Route object, None if the goal can not be reached
+        """
+        potentials = (self.lower_bounds(goal, metric) - self.lower_bounds(start, metric)) / 2
+        return self.bidirectional_search(start, goal, metric, potentials.tolist())
+
+    def hierarchy(self, metric):
+        """ Returns the contraction hierarchy of a metric, loading it, or building it if it was not saved, on first use
+        :param metric: Name of the metric, one of metrics
+        :return:       ContractionHierarchy object
+        """
+        if metric not in self.hierarchies:
+            self.hierarchies[metric] = load_hierarchy(self.road_graph, metric, self.weights[metric], self.segments_path)
+        return self.hierarchies[metric]
+
+    def ch(self, start, goal, metric):
+        """ Finds the cheapest route in the contraction hierarchy of the metric
+        :param start:  City id of the start
+        :param goal:   City id of the goal
+        :param metric: Name of the metric, one of metrics
+        :return:       Route object, None if the goal can not be reached
+        """
+        result = self.hierarchy(metric).route_arcs(start, goal)
+        if result is None:
+            return None
+        arcs, expanded = result
+        steps = [(start, None)]
+        for arc in arcs:
+            city = steps[-1][0]
+            steps.append((self.targets[arc] if self.arc_sources[arc] == city else self.arc_sources[arc], arc))
+        return self.make_route(metric, steps, expanded)
+
+    def find(self, engine, start, goal, metric):
+        """ Finds the cheapest route with one of the engines
+        :param engine: Name of the search engine, one of engines
+        :param start:  City id of the start
+        :param goal:   City id of the goal
+        :param metric: Name of the metric, one of metrics
+        :return:       Route object, None if the goal can not be reached
+        """
+        return getattr(self, engine.replace('-', '_'))(start, goal, metric)
+
+    def search(self, start, goal, metric, bounds):
+        """ Finds the cheapest route, expanding the cities in order of their cost plus their bound
+        :param start:  City id of the start
+        :param goal:   City id of the goal
+        :param metric: Name of the metric, one of metrics
+        :param bounds: List of the lower bounds of the cost from every city to the goal
+        :return:       Route object, None if the goal can not be reached
+        """
+        offsets, targets, weights = self.offsets, self.targets, self.weights[metric]
+        costs = {start: 0.0}
+        previous = {start: None}   # City id -> (previous city id, arc) on the cheapest route found
+        heap = [(bounds[start], 0.0, start)]
+        expanded = 0
+        while heap:
+            estimate, cost, city = heapq.heappop(heap)
+            if cost > costs[city]:
+                continue
+            expanded += 1
+            if city == goal:
+                return self.make_route(metric, self.follow_previous(previous, goal)[::-1], expanded)
+            for arc in xrange(offsets[city], offsets[city + 1]):
+                target, new_cost = targets[arc], cost + weights[arc]
+                if new_cost < costs.get(target, float('inf')):
+                    costs[target] = new_cost
+                    previous[target] = (city, arc)
+                    heapq.heappush(heap, (new_cost + bounds[target], new_cost, target))
+        return None
+
+    def bidirectional_search(self, start, goal, metric, potentials):
+        """ Finds the cheapest route with a search from each end, the sides meet in the middle
+        :param start:      City id of the start
+        :param goal:       City id of the goal
+        :param metric:     Name of the metric, one of metrics
+        :param potentials: List of the consistent potentials of the forward side, the backward side uses minus them
+        :return:           Route object, None if the goal can not be reached
+        """
+        offsets, targets, weights = self.offsets, self.targets, self.weights[metric]
+        costs = ({start: 0.0}, {goal: 0.0})
+        previous = ({start: None}, {goal: None})   # City id -> (previous city id, arc) of every side
+        heaps = ([(potentials[start], 0.0, start)], [(-potentials[goal], 0.0, goal)])
+        signs = (1.0, -1.0)
+        best_cost, meeting_city = (0.0, start) if start == goal else (float('inf'), None)
+        expanded = 0
+        while heaps[0] and heaps[1] and heaps[0][0][0] + heaps[1][0][0] < best_cost:
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            estimate, cost, city = heapq.heappop(heaps[side])
+            if cost > costs[side][city]:
+                continue
+            expanded += 1
+            side_costs, other_costs, side_previous, heap, sign = \
+                costs[side], costs[1 - side], previous[side], heaps[side], signs[side]
+            for arc in xrange(offsets[city], offsets[city + 1]):
+                target, new_cost = targets[arc], cost + weights[arc]
+                if new_cost < side_costs.get(target, float('inf')):
+                    side_costs[target] = new_cost
+                    side_previous[target] = (city, arc)
+                    heapq.heappush(heap, (new_cost + sign * potentials[target], new_cost, target))
+                    if target in other_costs and new_cost + other_costs[target] < best_cost:
+                        best_cost, meeting_city = new_cost + other_costs[target], target
+        if meeting_city is None:
+            return None
+        steps = self.follow_previous(previous[0], meeting_city)[::-1]
+        # The backward side walks from the goal, so its steps are turned around to lead away from the meeting city
+        backward_steps = self.follow_previous(previous[1], meeting_city)
+        for (city, arc), (next_city, next_arc) in zip(backward_steps, backward_steps[1:]):
+            steps.append((next_city, arc))
+        return self.make_route(metric, steps, expanded)
+
+    @staticmethod
+    def follow_previous(previous, city):
+        """ Follows the previous cities back to the city the search started from
+        :param previous: Dictionary mapping city id to (previous city id, arc), None for the first city
+        :param city:     City id the walk starts from
+        :return:         List of (city id, arc into it from the next city of the list), the first city of the search
+                         last with arc None
+        """
+        steps = list()
+        while previous[city] is not None:
+            previous_city, arc = previous[city]
+            steps.append((city, arc))
+            city = previous_city
+        steps.append((city, None))
+        return steps
+
+    def make_route(self, metric, steps, expanded):
+        """ Builds the route of the steps from the start
+        :param metric:   Name of the metric, one of metrics
+        :param steps:    List of (city id, arc into it), from the start with arc None to the goal
+        :param expanded: Number of cities expanded by the search
+        :return:         Route object
+        """
+        weights = self.weights[metric]
+        arcs = [arc for city, arc in steps[1:]]
+        return Route(math.fsum(weights[arc] for arc in arcs), [city for city, arc in steps], arcs, expanded)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+#
+# anytime.py : Budget and progress reporting of the anytime search mode of assign.py
+#
+# In the anytime mode the search runs until a wall-clock or an evaluation budget is used up, instead of
+# stopping after a fixed number of iterations without improvement. Every improvement of the best state
+# is streamed, so a valid answer is available at any time.
+#
+
+import os
+import sys
+import tempfile
+import time
+
+
+class SearchBudget:
+    """ Wall-clock and evaluation budget of a search
+    """
+    def __init__(self, time_budget=None, eval_budget=None):
+        """ Constructor
+        :param time_budget: Wall-clock budget in seconds, counted from now, None for no limit
+        :param eval_budget: Number of evaluations that one search may count, moves of a local search or cycles of
+                            the Iterated Squeaky Wheel, None for no limit
+        """
+        self.deadline = time.time() + time_budget if time_budget is not None else None
+        self.eval_budget = eval_budget
+        self.evaluations = 0
+
+    def start_search(self):
+        """ Resets the evaluation count at the start of a search, the deadline is shared by all the searches
+        """
+        self.evaluations = 0
+
+    def count_evaluation(self):
+        """ Counts one evaluated move, or one Squeaky Wheel cycle
+        """
+        self.evaluations += 1
+
+    def exhausted(self):
+        """ Checks whether the budget is used up
+        :return: True if the search has to stop
+        """
+        if self.eval_budget is not None and self.evaluations >= self.eval_budget:
+            return True
+        return self.deadline is not None and time.time() >= self.deadline
+
+
+class ProgressReporter:
+    """ Streams every improvement of the best state to stdout or to a file
+        A file is replaced atomically, so it always holds a complete answer
+    """
+    def __init__(self, path, min_interval=0.0):
+        """ Constructor
+        :param path:         Path of the file to be written, '-' for stdout
+        :param min_interval: Minimum number of seconds between two reports, the latest one is kept until flush
+        """
+        self.path = path
+        self.min_interval = min_interval
+        self.last_report_time = None
+        self.pending = None
+
+    def report(self, render):
+        """ Reports an improved state
+        :param render: Function without arguments that returns the string representation of the state
+        """
+        now = time.time()
+        if self.last_report_time is not None and now - self.last_report_time < self.min_interval:
+            self.pending = render
+            return
+        self.last_report_time = now
+        self.pending = None
+        self.write(render())
+
+    def flush(self):
+        """ Writes the latest improvement held back by the minimum interval
+        """
+        if self.pending is not None:
+            render, self.pending = self.pending, None
+            self.last_report_time = time.time()
+            self.write(render())
+
+    def write(self, text):
+        """ Writes a report
+        :param text: String representation of the state
+        """
+        if self.path == '-':
+            sys.stdout.write(text + '\n\n')
+            sys.stdout.flush()
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.assign-')
+        with os.fdopen(fd, 'w') as fh:
+            fh.write(text + '\n')
+        os.chmod(temp_path, 0o644)
+        os.rename(temp_path, self.path)
@@ -10,6 +10,24 @@
 #                  where k -> Time required to grade each assignment
 #                        m -> Time required to complain about being teamed with a foe
 #                        n -> Time required to complain about not being teamed with a friend
+#                 Options: --starts S  -> Run S independent searches from perturbed starts and keep the best
+#                          --workers W -> Number of processes running the searches
+#                          --neighborhoods swap,eject -> Also try swap and ejection chain moves
+#                          --time-budget T, --eval-budget E -> Anytime mode, search until the budget is used up
+#                          --progress PATH -> Write every improvement of the best state to PATH, '-' for stdout
+#                          --metaheuristic NAME -> tabu, adaptive-tabu, annealing or late-acceptance
+#                          --decompose -> Solve the independent groups of students concurrently, then repair the
+#                                       teams that can still gain from the other groups
+#                          --warm-start OUTPUT [--previous-input FILE] -> Re-optimize only the teams affected by
+#                                       the changes since a previous run, the other teams stay as they were
+#                          --trace PATH -> Write phase timers, counters and the best cost over time as JSON or CSV
+#                          --cache -> Reuse the parsed preferences from a binary cache next to the file
+#                          --exact -> Branch and bound for small inputs, prints the optimality gap to stderr
+#                          --team-cache-size N -> Number of team costs kept in the cache, 0 disables it
+#                          --gap -> Print the lower bound of the optimal cost and the optimality gap to stderr
+#                          --squeaky-wheel-iterations N, --squeaky-wheel-time T -> After the first Squeaky Wheel
+#                                       construction, rebuild the teams of the unhappy students N more times or
+#                                       for T seconds, blaming the unhappy students, and start from the best one
 #
 # References (1): http://ieeexplore.ieee.org/document/5518761/
 #                     Borrowing terms like friends and foes from this paper
@@ -73,79 +91,63 @@
 #    sub-optimal state.
 #
 
+import argparse
+import itertools
+import multiprocessing
+import random
+import signal
 import sys
-from Queue import PriorityQueue
 from collections import defaultdict
 
 import numpy
 
-# Constants
+from anytime import ProgressReporter, SearchBudget
+from bounds import roster_lower_bound
+from cost_engine import CompatibilityMatrix, CostEngine, PreferenceGraph
+from decomposition import connected_components, pack_components, relation_edges, split_components
+from exact import BranchAndBound
+from indexed_heap import IndexedHeap
+from instrumentation import Instrumentation, null_phase
+from metaheuristics import metaheuristic_map
+from roster import load_roster
+from student_table import StudentTable
+from team_cost_cache import TeamCostCache, default_capacity
+
+# Constants, the defaults of every Solver
 max_team_size = 3          # The maximum team size allowed
 threshold_iterations = 300  # Program will terminate if the best state does not change in these many iterations
-
-# Global variables
-student_dict = dict()      # Global dictionary to store student object wrt student id
-assn_grading = 0           # Time spent in grading assignment for one team
+perturbation_ratio = 0.1   # Fraction of the students moved at random to build the start of every extra search
 size_complaint = 1         # Time spent by a student to complain about their team size
-friend_complaint = 0       # Time spent by a student to complain about not being grouped with a friend
-foe_complaint = 0          # Time spent by a student to complain about being grouped with a foe
-
-tabu_dict = dict()
-
-
-class Student:
-    """ Object representation of the student
-    """
-    def __init__(self, student_id, student_name, pref_team_size, friend_list, foe_list):
-        """ Constructor
-        :param student_id:     ID of the student
-        :param student_name:   Name of the student
-        :param pref_team_size: Preferred team size of the student
-        :param friend_list:    List of people with whom the student wants to work with
-        :param foe_list:       List of people with whom the student does not want to work
-        """
-        global max_team_size
-        self.student_id = student_id
-        self.student_name = student_name
-        self.pref_team_size = pref_team_size
-        self.friend_list = friend_list
-        self.foe_list = foe_list
-
-    def __str__(self):
-        """ Returns a string representation of the Student object to be printed
-        :return: String representation of the Student object
-        """
-        return 'Student ID = %s\nStudent name = %s\nPref team size = %s\nFriends = %s\nFoes = %s\n' \
-               % (str(self.student_id), self.student_name, str(self.pref_team_size),
-                  str(self.friend_list), str(self.foe_list))
+sw_rebuild_ratio = 0.1     # Fraction of the students whose teams are built again in every Iterated Squeaky Wheel cycle
 
-    def calculate_total_cost(self, team):
-        """ Calculates the total time taken by the student for complaining
-        :param team: Set of the team members
-        :return:     Total time taken by the student for complaining
-        """
-        global size_complaint, friend_complaint, foe_complaint, max_team_size
-        curr_size_complaint = size_complaint if self.pref_team_size != len(team) else 0
-        friend_count_not_in_team = min(len(self.friend_list), max_team_size) - \
-                                   len(list(team.intersection(self.friend_list)))
-        foe_count_in_team = len(list(team.intersection(self.foe_list)))
-        total_cost = curr_size_complaint + friend_count_not_in_team * friend_complaint + \
-                     foe_count_in_team * foe_complaint
-        return total_cost
+# Solvers of the running multi-start searches, inherited by the forked worker processes
+solver_registry = dict()
+solver_keys = itertools.count()
 
 
 class State:
     """ State is the current mapping of student into teams
+        Costs are maintained incrementally, so moving a student only re-scores the source and destination teams
     """
-    def __init__(self, student_to_team_map):
+    def __init__(self, solver, student_to_team_map):
         """ Constructor
+        :param solver:              Solver object of the problem
         :param student_to_team_map: Dictionary mapping student id to team id
         """
-        global assn_grading
+        self.solver = solver
         self.student_to_team_map = student_to_team_map
         self.team_to_student_map = self.build_team_to_student_map()
-        self.assn_grading_cost = assn_grading * len(self.team_to_student_map)
-        self.student_cost_queue = PriorityQueue()
+        self.cost_engine = CostEngine(solver.preference_graph, solver.assn_grading, solver.size_complaint,
+                                      solver.friend_complaint, solver.foe_complaint)
+        for student_id, team_number in student_to_team_map.iteritems():
+            self.cost_engine.assign_student_to_team(student_id, team_number)
+        if solver.team_cost_cache is not None:
+            solver.team_cost_cache.validate((solver.size_complaint, solver.friend_complaint, solver.foe_complaint,
+                                             solver.max_team_size))
+        self.assn_grading_cost = solver.assn_grading * len(self.team_to_student_map)
+        self.student_cost_map = dict()           # Individual cost of every student
+        self.team_cost_map = dict()              # Sum of the individual costs of the members of every team
+        self.student_cost_queue = IndexedHeap()  # Unhappy students keyed by (negated cost, id), unhappiest on top
         self.total_cost = self.assn_grading_cost
         self.calculate_costs_for_all()
 
@@ -153,24 +155,51 @@ class State:
         """ Calculates individual and total cost for all the students
             Keeps the individual costs in a max priority queue
         """
-        global student_dict
-        for student_id, team_number in self.student_to_team_map.iteritems():
-            team = self.team_to_student_map[team_number]
-            student_cost = student_dict[student_id].calculate_total_cost(team)
-            if student_cost > 0:
-                self.student_cost_queue.put((-1 * student_cost, student_id))  # Making it Max Heap
-                self.total_cost += student_cost
+        for team_number in self.team_to_student_map:
+            self.update_team_costs(team_number)
+
+    def update_team_costs(self, team_number):
+        """ Recalculates the individual costs of all the members of a team and updates the total cost
+        :param team_number: Team number of the team whose costs are to be recalculated
+        """
+        self.total_cost -= self.team_cost_map.pop(team_number, 0)
+        team = self.team_to_student_map.get(team_number)
+        if not team:
+            return
+        members, member_costs = self.solver.team_member_costs(team)
+        team_cost = 0
+        for student_id, student_cost in zip(members, member_costs):
+            self.update_student_cost(student_id, student_cost)
+            team_cost += student_cost
+        self.team_cost_map[team_number] = team_cost
+        self.total_cost += team_cost
+
+    def update_student_cost(self, student_id, student_cost):
+        """ Records the individual cost of a student and keeps the priority queue in sync with it
+        :param student_id:   ID of the student
+        :param student_cost: New individual cost of the student
+        """
+        if self.student_cost_map.get(student_id) == student_cost:
+            return
+        self.student_cost_map[student_id] = student_cost
+        if student_cost > 0:
+            self.student_cost_queue.set(student_id, (-1 * student_cost, student_id))  # Making it Max Heap
+        else:
+            self.student_cost_queue.discard(student_id)
+
+    def get_unhappiest_student(self, excluded=()):
+        """ Finds the student with the highest cost who is not excluded
+            The student stays in the queue until their cost changes
+        :param excluded: Collection of student ids that must not be picked
+        :return:         ID of the unhappiest student, None if there is no such student
+        """
+        return self.student_cost_queue.peek(excluded)
 
     def __str__(self):
         """Returns a string representation of the State object to be printed
         :return: String representation of the State object
         """
-        global student_dict
-        state_str = ''
-        for team_set in self.team_to_student_map.values():
-            state_str += (' '.join([student_dict[student_id].student_name for student_id in team_set]) + '\n')
-        state_str += str(self.total_cost)
-        return state_str
+        return format_teams(self.solver.students, self.team_to_student_map, self.total_cost)
 
     def build_team_to_student_map(self):
         """ Builds a dictionary that maps team number to a set of students
@@ -182,287 +211,1151 @@ class State:
             team_to_student_map[team_number].add(student_id)
         return team_to_student_map
 
-    def cost_of_placing_student_in_team(self, student_id, team_num):
-        """ Calculates the cost of placing a student in a team
-        :param student_id: ID of student to be placed in the team
-        :param team_num:   Team number of the team where student is to be placed
-        :return: Change in cost if student is placed in the team
-        """
-        global student_dict
-        global friend_complaint, foe_complaint, size_complaint, assn_grading
-        student = student_dict[student_id]
-        team = self.team_to_student_map[team_num]
-        curr_team_size = len(team)
-        curr_assn_grading = 0 if curr_team_size > 1 else assn_grading
-        team_size_complaints = 0 if curr_team_size + 1 == student.pref_team_size else 1
-        friend_count_in_team = len(list(team.intersection(student.friend_list)))
-        foes_count_in_team = len(list(team.intersection(student.foe_list)))
-        for team_member_id in team:
-            team_member = student_dict[team_member_id]
-            if team_member.pref_team_size != curr_team_size + 1:
-                team_size_complaints += 1
-            if student.student_id in team_member.friend_list:
-                friend_count_in_team += 1
-            elif student.student_id in team_member.foe_list:
-                foes_count_in_team += 1
-        total_cost = (team_size_complaints * size_complaint) + (foes_count_in_team * foe_complaint) - \
-                     (friend_count_in_team * friend_complaint) - curr_assn_grading
-        return total_cost
+    def cost_delta(self, moves):
+        """ Calculates the exact change in total cost of moving several students at once, without moving them
+            Only the teams touched by the moves are re-scored, with the cost model of StudentTable.calculate_total_cost
+        :param moves: List of tuples (student id, team number of the team where the student is to be moved)
+        :return:      Change in total cost
+        """
+        solver = self.solver
+        new_team_map = dict()
+        for student_id, team_num in moves:
+            for touched_team_num in (self.student_to_team_map[student_id], team_num):
+                if touched_team_num not in new_team_map:
+                    new_team_map[touched_team_num] = set(self.team_to_student_map.get(touched_team_num, ()))
+        for student_id, team_num in moves:
+            new_team_map[self.student_to_team_map[student_id]].discard(student_id)
+        for student_id, team_num in moves:
+            new_team_map[team_num].add(student_id)
+        delta = 0
+        for team_num, new_team in new_team_map.iteritems():
+            old_team_exists = bool(self.team_to_student_map.get(team_num))
+            delta += solver.assn_grading * (int(bool(new_team)) - int(old_team_exists))
+            delta -= self.team_cost_map.get(team_num, 0)
+            if new_team:
+                delta += sum(solver.team_member_costs(new_team)[1])
+        return delta
 
     def assign_student_to_team(self, student_id, next_team_num):
         """ Assigns student to a team
+            Only the costs of the source and the destination teams are recalculated
         :param student_id:    ID of the student that has to be assigned to a team
         :param next_team_num: Team number of the team where the student is to be assigned
         """
-        if student_id in self.student_to_team_map:
-            curr_team_num = self.student_to_team_map[student_id]
-            self.team_to_student_map[curr_team_num].remove(student_id)
+        assn_grading = self.solver.assn_grading
+        curr_team_num = self.student_to_team_map.get(student_id)
+        if curr_team_num == next_team_num:
+            return
+        if curr_team_num is not None:
+            curr_team = self.team_to_student_map[curr_team_num]
+            curr_team.remove(student_id)
+            if not curr_team:
+                del self.team_to_student_map[curr_team_num]
+                self.assn_grading_cost -= assn_grading
+                self.total_cost -= assn_grading
+        if not self.team_to_student_map.get(next_team_num):
+            self.assn_grading_cost += assn_grading
+            self.total_cost += assn_grading
         self.student_to_team_map[student_id] = next_team_num
         self.team_to_student_map[next_team_num].add(student_id)
+        self.cost_engine.assign_student_to_team(student_id, next_team_num)
+        if curr_team_num is not None:
+            self.update_team_costs(curr_team_num)
+        self.update_team_costs(next_team_num)
 
 
-def replace_student_name_with_id(student_name_to_id_map):
-    """ Initially the student object contain a names in friend list and foe list
-        This function replaces those student names with student ids
-    :param student_name_to_id_map: Dictionary that maps student name to student id
+def format_teams(students, team_to_student_map, total_cost):
+    """ Builds the output representation of a team configuration, one team per line followed by the total cost
+    :param students:            StudentTable object
+    :param team_to_student_map: Dictionary that maps team number to a set of students
+    :param total_cost:          Total cost of the team configuration
+    :return:                    String representation of the team configuration
     """
-    global student_dict
-    for student in student_dict.values():
-        new_friend_list = list()
-        for friend_name in student.friend_list:
-            new_friend_list.append(student_name_to_id_map[friend_name])
-        student.friend_list = new_friend_list
-        new_foe_list = list()
-        for foe_name in student.foe_list:
-            new_foe_list.append(student_name_to_id_map[foe_name])
-        student.foe_list = new_foe_list
-
-
-def parse_file(file_path):
+    state_str = ''
+    for team_set in team_to_student_map.values():
+        state_str += (' '.join([students.student_name(student_id) for student_id in team_set]) + '\n')
+    state_str += str(total_cost)
+    return state_str
+
+
+def parse_file(file_path, max_team_size=max_team_size, use_cache=False):
     """ Parses the provided file to fetch the student preferences
-    :param file_path: Path of the file to be parsed
-    :return:          Dictionary that maps student name to student id
+    :param file_path:     Path of the file to be parsed
+    :param max_team_size: The maximum team size allowed
+    :param use_cache:     Whether the binary cache of the file is used, see roster.load_roster
+    :return:              StudentTable object, preferred team sizes cleansed to 1 to max_team_size
+    """
+    return StudentTable.from_roster(load_roster(file_path, use_cache), max_team_size)
+
+
+def parse_output(file_path):
+    """ Parses the output of a previous run
+    :param file_path: Path of the file with the printed teams, the total cost on the last line is optional
+    :return:          List of teams, every team a list of student names
     """
-    global student_dict
-    student_name_to_id_map = dict()
     fh = open(file_path, 'r')
     lines = fh.read().splitlines()
     fh.close()
-    student_id = 0
-    for line in lines:
-        fields = line.split(' ')
-        student_name = fields[0]
-        pref_team_size = int(fields[1])
-        pref_team_size = min(max(1, pref_team_size), max_team_size)  # Cleansing preferred team size
-        friends = fields[2].split(',') if fields[2] != '_' else []
-        foes = fields[3].split(',') if fields[3] != '_' else []
-        redundant_list = list(set(friends).intersection(foes))
-        redundant_list.append(student_name)
-        # Removing redundant entries from student's friend list
-        friends = [x for x in friends if x not in redundant_list]
-        # Removing redundant entries from student's foe list
-        foes = [x for x in foes if x not in redundant_list]
-        student = Student(student_id, student_name, pref_team_size, friends, foes)
-        student_dict[student_id] = student
-        student_name_to_id_map[student_name] = student_id
-        student_id += 1
-    return student_name_to_id_map
-
-
-def read_input():
-    """ Reads the command line arguments and store them in the global variables
+    if lines and lines[-1].strip().lstrip('-').isdigit():
+        lines.pop()
+    return [line.split() for line in lines if line.strip()]
+
+
+def read_preference_lines(file_path):
+    """ Reads the preference lines of a file by student name, without parsing them
+    :param file_path: Path of the file with the preferences of the students
+    :return:          Dictionary that maps student name to the rest of their line
     """
-    global assn_grading, foe_complaint, friend_complaint
-    file_path = sys.argv[1]
-    assn_grading = int(sys.argv[2])
-    foe_complaint = int(sys.argv[3])
-    friend_complaint = int(sys.argv[4])
-    student_name_to_id_map = parse_file(file_path)
-    replace_student_name_with_id(student_name_to_id_map)
+    with open(file_path, 'r') as fh:
+        return dict(line.rstrip('\r\n').split(' ', 1) for line in fh)
 
 
-def print_input():
-    """ Prints the input
+def parse_preference_line(line):
+    """ Parses the rest of a preference line into plain names
+    :param line: Preferred team size, friends and foes as written in the file
+    :return:     Tuple (preferred team size, set of friend names, set of foe names)
     """
-    global student_dict
-    global assn_grading, size_complaint, foe_complaint, friend_complaint
-    print 'Time required for grading assignment ->', assn_grading
-    print 'Time required for complaining about team size ->', size_complaint
-    print 'Time required for complaining about not teaming with friends ->', friend_complaint
-    print 'Time required for complaining about teaming with foes ->', foe_complaint, '\n'
-    for student in student_dict.values():
-        print student
-
-
-def find_compatibility_value(student1, student2):
-    """ Calculates and returns the compatibility value between 2 students
-    :param student1: Student object
-    :param student2: Student object
-    :return:         Compatibility value between 2 students
+    fields = line.split(' ')
+    return int(fields[0]), frozenset(fields[1].split(',')) - {'_'}, frozenset(fields[2].split(',')) - {'_'}
+
+
+def changed_preferences(previous_file_path, file_path):
+    """ Finds the students whose preferences differ between two versions of a preference file
+    :param previous_file_path: Path of the previous version
+    :param file_path:          Path of the current version
+    :return:                   Dictionary that maps the name of every changed or new student to the set of the
+                               names of their previous friends and foes
     """
-    if student2.student_id in student1.friend_list:
-        return 1
-    elif student2.student_id in student1.foe_list:
-        return -1
-    else:
-        return 0
+    previous_line_map = read_preference_lines(previous_file_path)
+    changed_relations = dict()
+    for student_name, line in read_preference_lines(file_path).iteritems():
+        previous_line = previous_line_map.get(student_name)
+        if line == previous_line:
+            continue
+        if previous_line is None:
+            changed_relations[student_name] = frozenset()
+            continue
+        # Lines that only list the same names in another order are not changed
+        previous_preferences = parse_preference_line(previous_line)
+        if parse_preference_line(line) != previous_preferences:
+            changed_relations[student_name] = previous_preferences[1] | previous_preferences[2]
+    return changed_relations
+
+
+class CandidateIndex:
+    """ Index of the students that are not placed in a team yet, used by the Squeaky Wheel construction
+        A candidate that has no friend or foe edge to the members of a team costs the same as every other
+        such candidate with the same preferred team size. So besides the students reachable through the
+        edges of the team, only the lowest unplaced student id of every preferred team size has to be scored.
+    """
+    def __init__(self, preference_graph, student_ids):
+        """ Constructor
+        :param preference_graph: PreferenceGraph object with the preferences of all the students
+        :param student_ids:      IDs of the students that are not placed in a team yet
+        """
+        self.pref_team_size = preference_graph.pref_team_size
+        self.remaining = [False] * preference_graph.student_count
+        self.remaining_count = 0
+        self.bucket_map = defaultdict(list)      # Preferred team size -> sorted student ids
+        self.bucket_position = dict()            # Student id -> position in their bucket
+        for student_id in sorted(student_ids):
+            self.remaining[student_id] = True
+            self.remaining_count += 1
+            bucket = self.bucket_map[int(self.pref_team_size[student_id])]
+            self.bucket_position[student_id] = len(bucket)
+            bucket.append(student_id)
+        # Next position in a bucket that holds an unplaced student, with path compression
+        self.next_position_map = dict((pref_team_size, range(len(bucket) + 1))
+                                      for pref_team_size, bucket in self.bucket_map.iteritems())
+
+    def __len__(self):
+        """ Returns the number of students that are not placed in a team yet
+        :return: Number of unplaced students
+        """
+        return self.remaining_count
+
+    def __contains__(self, student_id):
+        """ Checks whether a student is not placed in a team yet
+        :param student_id: ID of the student
+        :return:           True if the student is not placed yet
+        """
+        return self.remaining[student_id]
+
+    def remove(self, student_id):
+        """ Marks a student as placed in a team
+        :param student_id: ID of the student
+        """
+        self.remaining[student_id] = False
+        self.remaining_count -= 1
+        next_position = self.next_position_map[int(self.pref_team_size[student_id])]
+        next_position[self.bucket_position[student_id]] += 1
+
+    def find_remaining_position(self, pref_team_size, position):
+        """ Finds the first position in a bucket, at or after the given one, that holds an unplaced student
+        :param pref_team_size: Preferred team size of the bucket
+        :param position:       Position in the bucket to start from
+        :return:               Position of the unplaced student, the bucket length if there is none
+        """
+        next_position = self.next_position_map[pref_team_size]
+        root = position
+        while next_position[root] != root:
+            root = next_position[root]
+        while next_position[position] != root:
+            next_position[position], position = root, next_position[position]
+        return root
+
+    def shortlist(self, connected):
+        """ Lists the candidates that can be the best new member of a team
+        :param connected: Collection of the student ids related to the team members by a friend or a foe edge
+        :return:          List of candidate student ids
+        """
+        connected = set(student_id for student_id in connected if self.remaining[student_id])
+        candidates = list(connected)
+        for pref_team_size, bucket in self.bucket_map.iteritems():
+            position = self.find_remaining_position(pref_team_size, 0)
+            while position < len(bucket) and bucket[position] in connected:
+                position = self.find_remaining_position(pref_team_size, position + 1)
+            if position < len(bucket):
+                candidates.append(bucket[position])
+        return candidates
+
+
+class SharedBest:
+    """ Best cost shared by all the searches of a multi-start search, possibly across processes
+    """
+    def __init__(self):
+        """ Constructor
+        """
+        self.cost = multiprocessing.Value('d', float('inf'), lock=False)
+        self.improvements = multiprocessing.Value('l', 0, lock=False)
+        self.stop = multiprocessing.Value('b', 0, lock=False)
+        self.lock = multiprocessing.Lock()
+
+    def offer(self, cost, on_improvement=None):
+        """ Records a cost if it is better than the shared best cost
+        :param cost:           Best cost found by one of the searches
+        :param on_improvement: Function without arguments called under the lock if the shared best cost improves
+        """
+        if cost < self.cost.value:
+            with self.lock:
+                if cost < self.cost.value:
+                    self.cost.value = cost
+                    self.improvements.value += 1
+                    if on_improvement is not None:
+                        on_improvement()
 
+    def request_stop(self):
+        """ Asks all the searches to stop and return their best state
+        """
+        self.stop.value = 1
 
-def build_compatibility_matrix():
-    """ Builds a N*N compatibility matrix for n students
-        This matrix determines the compatibility between any 2 students
-    :return: N*N compatibility matrix
+    def stop_requested(self):
+        """ Checks whether the searches have been asked to stop
+        :return: True if the searches have to stop
+        """
+        return bool(self.stop.value)
+
+    def improvement_count(self):
+        """ Returns the number of times the shared best cost has improved
+        :return: Number of improvements
+        """
+        return self.improvements.value
+
+
+class Solver:
+    """ Groups students into teams
+        Holds the problem data, the complaint times and the search state of one problem, so several problems
+        can be solved in one process, or on several threads, without interfering with each other
     """
-    global student_dict
-    compatibility_matrix = [[0] * len(student_dict) for i in range(len(student_dict))]
-    for i in range(len(student_dict)):
-        for j in range(i + 1, len(student_dict)):
-            val_1 = find_compatibility_value(student_dict[i], student_dict[j])
-            val_2 = find_compatibility_value(student_dict[j], student_dict[i])
-            compatibility_matrix[i][j] = compatibility_matrix[j][i] = val_1 + val_2
-    return compatibility_matrix
-
-
-def make_sd_list(compatibility_matrix):
-    """ Finds standard deviation of all the students from their assigned compatibility values
-    :param compatibility_matrix: N*N matrix that determines compatibility between any 2 students
-    :return:                     List of tuples (std dev, student id) sorted by std dev in desc order
+    def __init__(self, students, assn_grading, foe_complaint, friend_complaint, size_complaint=size_complaint,
+                 max_team_size=max_team_size, threshold_iterations=threshold_iterations,
+                 perturbation_ratio=perturbation_ratio, neighborhoods=(), metaheuristic='tabu',
+                 team_cache_size=default_capacity, sw_iterations=None, sw_time_budget=None):
+        """ Constructor
+        :param students:             StudentTable object of the students
+        :param assn_grading:         Time spent in grading assignment for one team
+        :param foe_complaint:        Time spent by a student to complain about being grouped with a foe
+        :param friend_complaint:     Time spent by a student to complain about not being grouped with a friend
+        :param size_complaint:       Time spent by a student to complain about their team size
+        :param max_team_size:        The maximum team size allowed
+        :param threshold_iterations: Search terminates if the best state does not change in these many iterations
+        :param perturbation_ratio:   Fraction of the students moved at random to build the start of every extra search
+        :param neighborhoods:        Moves tried besides relocating the unhappiest student, out of 'swap' and 'eject'
+        :param metaheuristic:        Name of the search strategy, a key of metaheuristics.metaheuristic_map
+        :param team_cache_size:      Number of teams whose member costs are cached, 0 disables the cache
+        :param sw_iterations:        Number of Squeaky Wheel cycles after the first construction, None for no limit
+        :param sw_time_budget:       Wall-clock budget in seconds of the Squeaky Wheel cycles after the first
+                                     construction, None for no limit
+                                     Without both budgets the Squeaky Wheel algorithm builds the teams once
+        """
+        self.students = students
+        self.assn_grading = assn_grading
+        self.foe_complaint = foe_complaint
+        self.friend_complaint = friend_complaint
+        self.size_complaint = size_complaint
+        self.max_team_size = max_team_size
+        self.threshold_iterations = threshold_iterations
+        self.perturbation_ratio = perturbation_ratio
+        self.neighborhoods = tuple(neighborhoods)
+        self.preference_graph = PreferenceGraph(students, max_team_size)
+        self.metaheuristic_name = metaheuristic
+        self.student_ids = range(len(students))
+        self.team_cache_size = team_cache_size
+        self.team_cost_cache = TeamCostCache(team_cache_size) if team_cache_size else None
+        self.sw_iterations = sw_iterations
+        self.sw_time_budget = sw_time_budget
+        self.metaheuristic = None            # Metaheuristic object of the running search
+        self.iteration = 0                   # Iteration number of the running search
+        self.sw_student_to_team_map = None   # Squeaky Wheel start, shared with the workers of a multi-start search
+        self.batches = None                  # Batches of student ids of a decomposed search
+        self.shared_best = None              # SharedBest object of a multi-start search
+        self.budget = None                   # SearchBudget object of an anytime search
+        self.progress_reporter = None        # ProgressReporter object that streams the improvements
+        # Proven lower bound of the optimal cost, the search stops there
+        self.lower_bound = roster_lower_bound(self.preference_graph, assn_grading, size_complaint, friend_complaint)
+        self.instrumentation = None          # Instrumentation object of an instrumented run
+        self.rng = random.Random(0)          # Random moves of the search
+
+    @classmethod
+    def from_file(cls, file_path, assn_grading, foe_complaint, friend_complaint, use_cache=False, **kwargs):
+        """ Builds a solver for the preferences in a file
+        :param file_path:        Path of the file with the preferences of the students
+        :param assn_grading:     Time spent in grading assignment for one team
+        :param foe_complaint:    Time spent by a student to complain about being grouped with a foe
+        :param friend_complaint: Time spent by a student to complain about not being grouped with a friend
+        :param use_cache:        Whether the binary cache of the file is used
+        :param kwargs:           Other keyword arguments of the constructor
+        :return:                 Solver object
+        """
+        students = parse_file(file_path, kwargs.get('max_team_size', max_team_size), use_cache)
+        return cls(students, assn_grading, foe_complaint, friend_complaint, **kwargs)
+
+    def phase(self, name):
+        """ Times a phase of the run if the run is instrumented, to be used in a with statement
+        :param name: Name of the phase
+        :return:     Context manager
+        """
+        if self.instrumentation is None:
+            return null_phase
+        return self.instrumentation.phase(name)
+
+    def team_member_costs(self, team):
+        """ Calculates the individual costs of the members of a team, taken from the team cost cache if possible
+        :param team: Set of the team members
+        :return:     Sorted tuple of the member ids, Tuple of their costs in the same order
+        """
+        members = tuple(sorted(team))
+        cache = self.team_cost_cache
+        member_costs = cache.get(members) if cache is not None else None
+        if member_costs is None:
+            students = self.students
+            member_costs = tuple([students.calculate_total_cost(student_id, team, self) for student_id in members])
+            if cache is not None:
+                cache.put(members, member_costs)
+        return members, member_costs
+
+    def print_input(self):
+        """ Prints the input
+        """
+        print 'Time required for grading assignment ->', self.assn_grading
+        print 'Time required for complaining about team size ->', self.size_complaint
+        print 'Time required for complaining about not teaming with friends ->', self.friend_complaint
+        print 'Time required for complaining about teaming with foes ->', self.foe_complaint, '\n'
+        for student_id in self.student_ids:
+            print self.students.student(student_id)
+
+    def build_compatibility_matrix(self):
+        """ Builds a N*N compatibility matrix for n students
+            This matrix determines the compatibility between any 2 students
+            Preference graphs are sparse, so the matrix is built in CSR form straight from the friend and foe edges
+        :return: CompatibilityMatrix object
+        """
+        return CompatibilityMatrix(self.preference_graph)
+
+    def make_sd_list(self, compatibility_matrix):
+        """ Finds standard deviation of all the students from their assigned compatibility values
+            The students are ordered by the exact integer variance of their rows, so that rows with equal
+            standard deviation always tie and fall back to the student id
+        :param compatibility_matrix: CompatibilityMatrix object that determines compatibility between any 2 students
+        :return:                     List of tuples (std dev, student id) sorted by std dev in desc order
+        """
+        variance_keys = compatibility_matrix.row_variance_keys()
+        sd_values = compatibility_matrix.row_standard_deviations()
+        order = numpy.lexsort((numpy.arange(len(compatibility_matrix)), variance_keys))
+        return [(sd_values[i], i) for i in order.tolist()]
+
+    def initialize(self):
+        """ We assume initial state where all the students are in separate teams
+        :return: State object representing the initial state
+        """
+        student_to_team_map = dict()
+        team_number = 0
+        for student_id in self.student_ids:
+            student_to_team_map[student_id] = team_number
+            team_number += 1
+        initial_state = State(self, student_to_team_map)
+        return initial_state
+
+    def get_sw_state(self):
+        """ Uses Squeaky Wheel algorithm to determine teams
+            Reference: http://citeseerx.ist.psu.edu/viewdoc/download?doi=10.1.1.521.2649&rep=rep1&type=pdf
+        :return: State object representing the teams as outputted by the Squeaky Wheel algorithm
+        """
+        initial_state = self.initialize()
+        with self.phase('compatibility_matrix'):
+            compatibility_matrix = self.build_compatibility_matrix()
+            sd_list = self.make_sd_list(compatibility_matrix)
+        # Position of every student in the Squeaky Wheel order, squeakiest student first
+        sw_rank = numpy.empty(len(sd_list), dtype=numpy.int64)
+        sw_rank[[student_id for sd_value, student_id in reversed(sd_list)]] = numpy.arange(len(sd_list))
+        with self.phase('squeaky_wheel'):
+            curr_team_number = 0
+            remaining_students = CandidateIndex(self.preference_graph, self.student_ids)
+            while remaining_students:
+                squeakiest_student_id = sd_list.pop()[1]
+                if squeakiest_student_id not in remaining_students:
+                    continue
+                initial_state.assign_student_to_team(squeakiest_student_id, curr_team_number)
+                remaining_students.remove(squeakiest_student_id)
+                for i in range(1, self.max_team_size):
+                    best_team_member, best_cost = self.find_best_team_member(curr_team_number, remaining_students,
+                                                                             initial_state)
+                    if best_cost < 0:
+                        initial_state.assign_student_to_team(best_team_member, curr_team_number)
+                        remaining_students.remove(best_team_member)
+                curr_team_number += 1
+        sw_state = State(self, initial_state.student_to_team_map)
+        if (self.sw_iterations is None and self.sw_time_budget is None or
+                self.sw_iterations is not None and self.sw_iterations <= 0):
+            return sw_state   # No cycles to run
+        with self.phase('iterated_squeaky_wheel'):
+            return self.iterate_squeaky_wheel(sw_state, sw_rank)
+
+    def iterate_squeaky_wheel(self, state, sw_rank):
+        """ Iterates the prioritize, construct and analyze cycle of the Squeaky Wheel algorithm
+            Analyze:    Every student is blamed for their individual cost, blame from earlier cycles fades by half
+            Prioritize: The students with the most blame come first, ties in the Squeaky Wheel order
+            Construct:  Only the teams of the students with the highest cost, and the teams of their friends, are
+                        dissolved and built again in priority order, all the other teams stay as they are
+            Every cycle counts as one evaluation of the budget, the first construction is not a cycle
+        :param state:   State object of the first construction, modified in place
+        :param sw_rank: Array with the position of every student in the Squeaky Wheel order
+        :return:        State object representing the cheapest construction
+        """
+        budget = SearchBudget(self.sw_time_budget, self.sw_iterations)
+        graph = self.preference_graph
+        student_count = len(self.student_ids)
+        blame = numpy.zeros(student_count, dtype=numpy.int64)
+        rebuilt_count = max(1, int(sw_rebuild_ratio * student_count))
+        free_team_nums = [team_num for team_num in range(student_count) if team_num not in state.team_to_student_map]
+        best_cost = state.total_cost
+        best_student_to_team_map = dict(state.student_to_team_map)
+        while not budget.exhausted():
+            budget.count_evaluation()
+            costs = numpy.zeros(student_count, dtype=numpy.int64)
+            costs[state.student_cost_map.keys()] = state.student_cost_map.values()
+            blame = blame // 2 + costs
+            blamed = numpy.argsort(-costs, kind='mergesort')[:rebuilt_count]
+            blamed = blamed[costs[blamed] > 0]
+            if not len(blamed):
+                break   # Nobody complains
+            team_nums = set(state.student_to_team_map[student_id] for student_id in
+                            blamed.tolist() + graph.gather(graph.friend_offsets, graph.friend_targets, blamed).tolist())
+            rebuilt = numpy.array([student_id for team_num in team_nums
+                                   for student_id in state.team_to_student_map[team_num]], dtype=numpy.int64)
+            rebuilt = rebuilt[numpy.lexsort((sw_rank[rebuilt], -blame[rebuilt]))].tolist()
+            self.rebuild_teams(state, rebuilt, free_team_nums)
+            if state.total_cost < best_cost:
+                best_cost = state.total_cost
+                best_student_to_team_map = dict(state.student_to_team_map)
+        return State(self, best_student_to_team_map)
+
+    def rebuild_teams(self, state, student_ids, free_team_nums):
+        """ Builds new teams out of a group of students, in the way of the Squeaky Wheel construction
+            The first student in priority order without a new team opens one, which is then filled with the
+            students of the group that lower the cost most
+        :param state:          State object, modified in place
+        :param student_ids:    List of the ids of the students in priority order, every student of their teams
+        :param free_team_nums: List of team numbers below the number of students that may be empty, it is kept
+                               up to date with the teams emptied by the moves
+        """
+        if self.instrumentation is not None:
+            self.instrumentation.count('squeaky wheel students rebuilt', len(student_ids))
+        remaining_students = CandidateIndex(self.preference_graph, student_ids)
+
+        def move(student_id, team_num):
+            curr_team_num = state.student_to_team_map[student_id]
+            state.assign_student_to_team(student_id, team_num)
+            if curr_team_num not in state.team_to_student_map:
+                free_team_nums.append(curr_team_num)
+            remaining_students.remove(student_id)
+
+        for squeakiest_student_id in student_ids:
+            if squeakiest_student_id not in remaining_students:
+                continue
+            team_num = state.student_to_team_map[squeakiest_student_id]
+            if len(state.team_to_student_map[team_num]) > 1:
+                # There are fewer teams than students, so some team number below the number of students is free
+                team_num = free_team_nums.pop()
+                while team_num in state.team_to_student_map:
+                    team_num = free_team_nums.pop()
+            move(squeakiest_student_id, team_num)
+            for i in range(1, self.max_team_size):
+                best_team_member, best_cost = self.find_best_team_member(team_num, remaining_students, state)
+                if best_cost >= 0:
+                    break
+                move(best_team_member, team_num)
+
+    def find_best_team_for_student(self, student_id, state):
+        """ Finds the best team out of all the teams for a student
+            All the teams are scored in one batched operation of the cost engine
+        :param student_id: ID of the student for whom a best team is to be determined
+        :param state:      State object that contains the current configuration of the teams
+        :return:           ID of the best team for the student
+        """
+        curr_team_num = state.student_to_team_map[student_id]
+        engine = state.cost_engine
+        costs = engine.costs_of_placing_student(student_id)
+        # Only the existing teams with spare capacity, other than the current team, are considered
+        eligible = (engine.team_size > 0) & (engine.team_size < self.max_team_size)
+        eligible[curr_team_num] = False
+        if not eligible.any():
+            return curr_team_num
+        costs = numpy.where(eligible, costs, numpy.iinfo(costs.dtype).max)
+        best_team_num = int(numpy.argmin(costs))  # Lowest team number wins the ties
+        if costs[best_team_num] < state.student_cost_map[student_id]:
+            return best_team_num
+        return curr_team_num
+
+    def find_best_team_member(self, team_num, candidates, state):
+        """ Finds the best team member out of a given list of candidates for a team
+            Best team member is one that results in the lowest cost
+            Only the shortlist of the candidate index has to be scored
+        :param team_num:   Team number for which the best team member is to be determined
+        :param candidates: CandidateIndex of the students that could be added to the team
+        :param state:      State object that contains the current configuration of the teams
+        :return:           ID of the best team member, Cost of keeping the student in the team
+        """
+        friend_count, foe_count = self.preference_graph.count_relations(state.team_to_student_map.get(team_num, ()))
+        shortlist = candidates.shortlist(set(friend_count) | set(foe_count))
+        if not shortlist:
+            return -1, sys.maxint
+        costs = state.cost_engine.costs_of_placing_shortlist(shortlist, team_num, friend_count, foe_count)
+        best_cost, best_team_member = min(zip(costs, shortlist))  # Lowest student id wins the ties
+        return best_team_member, best_cost
+
+    def related_teams(self, student_id, state):
+        """ Finds the teams, other than their own, where a student has a friend or is wanted as a friend
+        :param student_id: ID of the student
+        :param state:      State object that contains the current configuration of the teams
+        :return:           Sorted list of team numbers
+        """
+        graph = self.preference_graph
+        curr_team_num = state.student_to_team_map[student_id]
+        friend_ids = graph.friends_of(student_id).tolist() + graph.friended_by(student_id).tolist()
+        return sorted(set(state.student_to_team_map[friend_id] for friend_id in friend_ids) - {curr_team_num})
+
+    def find_best_compound_move(self, student_id, state):
+        """ Finds the best swap or ejection chain move for a student, scored by the exact change in total cost
+            Swap: the student trades places with a member of a related team
+            Ejection chain: the student joins a full related team, whose ejected member moves to the team with
+            spare capacity that suits them best
+        :param student_id: ID of the student to be moved
+        :param state:      State object that contains the current configuration of the teams
+        :return:           Tuple (change in total cost, list of tuples (student id, team number)), None if there is
+                           no such move
+        """
+        curr_team_num = state.student_to_team_map[student_id]
+        engine = state.cost_engine
+        best_move = None
+        for team_num in self.related_teams(student_id, state):
+            team = state.team_to_student_map[team_num]
+            team_is_full = len(team) >= self.max_team_size
+            for other_id in sorted(team):
+                if 'swap' in self.neighborhoods:
+                    moves = [(student_id, team_num), (other_id, curr_team_num)]
+                    delta = state.cost_delta(moves)
+                    if best_move is None or delta < best_move[0]:
+                        best_move = (delta, moves)
+                if 'eject' in self.neighborhoods and team_is_full:
+                    eligible = (engine.team_size > 0) & (engine.team_size < self.max_team_size)
+                    eligible[[team_num, curr_team_num]] = False
+                    if not eligible.any():
+                        continue
+                    costs = engine.costs_of_placing_student(other_id)
+                    costs = numpy.where(eligible, costs, numpy.iinfo(costs.dtype).max)
+                    moves = [(student_id, team_num), (other_id, int(numpy.argmin(costs)))]
+                    delta = state.cost_delta(moves)
+                    if best_move is None or delta < best_move[0]:
+                        best_move = (delta, moves)
+        return best_move
+
+    def find_best_moves_for_student(self, student_id, state):
+        """ Finds the move that pacifies a student most: the relocation to their best team, or with extra
+            neighborhoods a swap or ejection chain if it lowers the total cost more
+        :param student_id: ID of the student to be pacified
+        :param state:      State object that contains the current configuration of the teams
+        :return:           List of tuples (student id, team number)
+        """
+        best_team_num = self.find_best_team_for_student(student_id, state)
+        moves = [(student_id, best_team_num)]
+        if self.neighborhoods:
+            compound_move = self.find_best_compound_move(student_id, state)
+            if compound_move is not None and compound_move[0] < min(0, state.cost_delta(moves)):
+                moves = compound_move[1]
+        return moves
+
+    def random_moves(self, state, rng):
+        """ Draws a random move: a student joins the team of another student if it has spare capacity, or trades
+            places with them, or opens a new team if both are in the same team
+        :param state: State object that contains the current configuration of the teams
+        :param rng:   random.Random object of the search
+        :return:      List of tuples (student id, team number)
+        """
+        student_id = rng.choice(self.student_ids)
+        other_id = rng.choice(self.student_ids)
+        curr_team_num = state.student_to_team_map[student_id]
+        other_team_num = state.student_to_team_map[other_id]
+        if other_team_num == curr_team_num:
+            # There are at most N teams, so one of the team numbers 0 to N is always free
+            team_num = rng.randint(0, len(self.student_ids))
+            while state.team_to_student_map.get(team_num):
+                team_num = rng.randint(0, len(self.student_ids))
+            return [(student_id, team_num)]
+        if len(state.team_to_student_map[other_team_num]) < self.max_team_size and rng.random() < 0.5:
+            return [(student_id, other_team_num)]
+        return [(student_id, other_team_num), (other_id, curr_team_num)]
+
+    def find_next_state(self, curr_state):
+        """ Takes the current state (configuration of students to teams) and moves it to the next state
+            The metaheuristic proposes the move and decides whether it is taken
+            The state is updated in place, so only the teams touched by the move are re-scored
+        :param curr_state: State object representing the current configuration of students to teams
+        :return:           State object representing the next configuration of students to teams
+        """
+        metaheuristic = self.metaheuristic
+        iteration = self.iteration
+        self.iteration += 1
+        moves = metaheuristic.next_moves(curr_state, iteration)
+        if moves and metaheuristic.accept(curr_state, moves, iteration):
+            for moved_student_id, team_num in moves:
+                curr_state.assign_student_to_team(moved_student_id, team_num)
+            if self.instrumentation is not None:
+                self.instrumentation.count('moves accepted')
+        else:
+            if self.instrumentation is not None:
+                self.instrumentation.count('moves rejected' if moves else 'no move available')
+            moves = []
+        metaheuristic.moved(curr_state, moves, iteration)
+        return curr_state
+
+    def find_best_state(self, start_state=None):
+        """ Determines and returns the best state
+            Best state is one that results in the least cost
+            In a multi-start search the search also stops once the best cost shared by all the searches stops improving
+            In an anytime search the search runs until the budget is used up, and restarts from a perturbed copy of
+            the best state whenever it stops improving
+            Interrupting the search returns the best state found so far
+        :param start_state: State object to start the search from, the Squeaky Wheel state if not given
+        :return: The best state
+        """
+        shared_best = self.shared_best
+        budget = self.budget
+        metaheuristic = self.metaheuristic
+        patience = metaheuristic.patience_factor * self.threshold_iterations
+        curr_state = start_state if start_state is not None else self.get_sw_state()
+        metaheuristic.start(curr_state)
+        best_cost = curr_state.total_cost
+        best_student_to_team_map = dict(curr_state.student_to_team_map)
+        self.report_improvement(best_cost, best_student_to_team_map)
+        counter = 0
+        if shared_best is not None:
+            seen_improvements = shared_best.improvement_count()
+            shared_counter = 0
+        if budget is not None:
+            budget.start_search()
+        # Checking whether the best state is changed in the last 'threshold_iterations' iterations
+        # Borrowed from: http://ieeexplore.ieee.org/document/5518761/
+        with self.phase('local_search'):
+            try:
+                while budget is not None or counter < patience:
+                    if self.lower_bound is not None and best_cost <= self.lower_bound:
+                        if self.instrumentation is not None:
+                            self.instrumentation.count('stops at the lower bound')
+                        break
+                    if budget is not None:
+                        if budget.exhausted():
+                            break
+                        if counter >= patience:
+                            curr_state = State(self, dict(best_student_to_team_map))
+                            self.perturb_state(curr_state, self.rng)
+                            metaheuristic.start(curr_state)
+                            counter = 0
+                        budget.count_evaluation()
+                    curr_state = self.find_next_state(curr_state)
+                    if curr_state.total_cost < best_cost:
+                        best_cost = curr_state.total_cost
+                        best_student_to_team_map = dict(curr_state.student_to_team_map)
+                        counter = 0
+                        self.report_improvement(best_cost, best_student_to_team_map)
+                    counter += 1
+                    if shared_best is not None:
+                        if shared_best.stop_requested():
+                            break
+                        improvements = shared_best.improvement_count()
+                        if improvements != seen_improvements:
+                            seen_improvements = improvements
+                            shared_counter = 0
+                        shared_counter += 1
+                        if budget is None and shared_counter >= patience:
+                            break
+            except KeyboardInterrupt:
+                if shared_best is not None:
+                    shared_best.request_stop()
+        if self.instrumentation is not None and hasattr(metaheuristic, 'tabu_list'):
+            self.instrumentation.count('tabu blocks', metaheuristic.tabu_list.block_count)
+        if self.progress_reporter is not None and shared_best is None:
+            self.progress_reporter.flush()
+        return State(self, best_student_to_team_map)
+
+    def report_improvement(self, best_cost, best_student_to_team_map):
+        """ Publishes an improved best state to the shared best cost and to the progress reporter
+        :param best_cost:                Cost of the improved state
+        :param best_student_to_team_map: Dictionary mapping student id to team id of the improved state
+        """
+        if self.instrumentation is not None:
+            self.instrumentation.record_best_cost(self.iteration, best_cost)
+        reporter = self.progress_reporter
+        render = None
+        if reporter is not None:
+            def render():
+                team_to_student_map = defaultdict(set)
+                for student_id, team_number in best_student_to_team_map.iteritems():
+                    team_to_student_map[team_number].add(student_id)
+                return format_teams(self.students, team_to_student_map, best_cost)
+        if self.shared_best is not None:
+            # Only the improvements of the shared best are streamed, right away and under the shared lock
+            self.shared_best.offer(best_cost, (lambda: reporter.write(render())) if render is not None else None)
+        elif render is not None:
+            reporter.report(render)
+
+    def perturb_state(self, state, rng):
+        """ Moves a fraction of the students to random teams with spare capacity, to diversify the start of a search
+        :param state: State object to be perturbed in place
+        :param rng:   random.Random object of the search
+        """
+        student_ids = state.student_to_team_map.keys()
+        team_nums = state.team_to_student_map.keys()
+        for i in range(max(1, int(self.perturbation_ratio * len(student_ids)))):
+            student_id = rng.choice(student_ids)
+            team_num = rng.choice(team_nums)
+            # Emptied teams are left out as well, the move is simply skipped if the team is not open
+            if 0 < len(state.team_to_student_map.get(team_num, ())) < self.max_team_size:
+                state.assign_student_to_team(student_id, team_num)
+
+    def start_metaheuristic(self):
+        """ Sets up a fresh metaheuristic for a search, sharing the random moves of the search
+        """
+        self.metaheuristic = metaheuristic_map[self.metaheuristic_name](self, self.rng)
+        self.iteration = 0
+
+    def search_from_seed(self, seed):
+        """ Runs one search of a multi-start search
+            Seed 0 starts from the Squeaky Wheel state itself, every other seed from a perturbed copy of it
+        :param seed: Seed of the search
+        :return:     Tuple (best cost, seed, dictionary mapping student id to team id)
+        """
+        self.rng = random.Random(seed)
+        self.start_metaheuristic()
+        start_state = State(self, dict(self.sw_student_to_team_map))
+        if seed:
+            self.perturb_state(start_state, self.rng)
+        best_state = self.find_best_state(start_state)
+        return best_state.total_cost, seed, best_state.student_to_team_map
+
+    def solve(self, starts=1, workers=1, time_budget=None, eval_budget=None, progress_path=None,
+              progress_interval=0.0):
+        """ Groups the students into teams
+        :param starts:            Number of independent searches, each from its own perturbed Squeaky Wheel start
+        :param workers:           Number of processes running the searches
+        :param time_budget:       Wall-clock budget in seconds of the anytime mode, None for no limit
+        :param eval_budget:       Number of moves every search may evaluate in the anytime mode, None for no limit
+        :param progress_path:     File where every improvement is written, '-' for stdout, None for no reports
+        :param progress_interval: Minimum number of seconds between two reports of a single search
+        :return:                  State object representing the best teams found
+        """
+        self.rng = random.Random(0)
+        self.start_metaheuristic()
+        self.shared_best = None
+        self.budget = None
+        if time_budget is not None or eval_budget is not None:
+            self.budget = SearchBudget(time_budget, eval_budget)
+        self.progress_reporter = ProgressReporter(progress_path, progress_interval) if progress_path else None
+        try:
+            if starts <= 1:
+                return self.find_best_state()
+            return self.find_best_state_multi_start(starts, workers)
+        finally:
+            self.budget = None
+            self.progress_reporter = None
+
+    def solve_exact(self, time_budget=None, eval_budget=None):
+        """ Groups the students into teams with a branch and bound search, meant for small inputs
+            The local search provides the first upper bound and stops as soon as it meets the root lower bound,
+            which includes the lower bound of the roster
+        :param time_budget: Wall-clock budget in seconds of the branch and bound, None for no limit
+        :param eval_budget: Number of nodes the branch and bound may expand, None for no limit
+        :return:            State object representing the best teams found, Lower bound of the optimal cost
+        """
+        branch_and_bound = BranchAndBound(self)
+        roster_bound = self.lower_bound
+        self.lower_bound = branch_and_bound.root_bound
+        try:
+            best_state = self.solve()
+        finally:
+            self.lower_bound = roster_bound
+        if time_budget is not None or eval_budget is not None:
+            branch_and_bound.budget = SearchBudget(time_budget, eval_budget)
+        best_cost, lower_bound, best_student_to_team_map = branch_and_bound.search(
+            best_state.total_cost, best_state.student_to_team_map)
+        return State(self, best_student_to_team_map), lower_bound
+
+    def make_sub_solver(self, student_ids, sub_threshold_iterations):
+        """ Builds a solver for a subset of the students, with local ids 0 to len(student_ids) - 1
+            Friends and foes outside of the subset are left out. The team of an outside friend is not part of
+            the subproblem, so leaving the friend out only changes a student's cost by a constant.
+        :param student_ids:              Sorted list of the student ids of the subset
+        :param sub_threshold_iterations: Threshold iterations of the sub solver
+        :return:                         Solver object, the local id of a student is its index in student_ids
+        """
+        # The Squeaky Wheel time is split in proportion to the size of the subset, like the threshold iterations
+        sub_sw_time_budget = (self.sw_time_budget * len(student_ids) / len(self.students)
+                              if self.sw_time_budget is not None else None)
+        return Solver(self.students.subset(student_ids), self.assn_grading, self.foe_complaint, self.friend_complaint,
+                      self.size_complaint, self.max_team_size, sub_threshold_iterations, self.perturbation_ratio,
+                      self.neighborhoods, self.metaheuristic_name, self.team_cache_size, self.sw_iterations,
+                      sub_sw_time_budget)
+
+    def solve_incremental(self, previous_teams, changed_relations=None):
+        """ Re-optimizes the teams of a previous run after the preferences have changed
+            Only the teams of the changed students and of their friends and foes, old and new, are searched again,
+            starting from their previous configuration, all the other teams stay as they were
+            Without the changes, only new students and teams that lost a student count as changed
+        :param previous_teams:    List of teams of the previous run, every team a list of student names
+        :param changed_relations: Dictionary that maps the name of every student whose preferences changed to the
+                                  names of their previous friends and foes, see changed_preferences
+        :return:                  State object representing the teams
+        """
+        name_to_id_map = dict((student_name, student_id)
+                              for student_id, student_name in enumerate(self.students.names.tolist()))
+        student_to_team_map = dict()
+        affected_teams = set()
+        for team_num, team in enumerate(previous_teams):
+            for student_name in team:
+                if student_name in name_to_id_map:
+                    student_to_team_map[name_to_id_map[student_name]] = team_num
+                else:
+                    affected_teams.add(team_num)   # The student left
+        changed = set(student_id for student_id in self.student_ids if student_id not in student_to_team_map)
+        for student_id in sorted(changed):
+            student_to_team_map[student_id] = len(previous_teams) + student_id   # A new student starts alone
+        for student_name, previous_names in (changed_relations or {}).iteritems():
+            if student_name in name_to_id_map:
+                changed.add(name_to_id_map[student_name])
+            # Relations dropped by the change still shaped the previous teams
+            for other_name in previous_names:
+                if other_name in name_to_id_map:
+                    affected_teams.add(student_to_team_map[name_to_id_map[other_name]])
+        graph = self.preference_graph
+        for student_id in changed:
+            affected_teams.add(student_to_team_map[student_id])
+            for other_id in (graph.friends_of(student_id).tolist() + graph.foes_of(student_id).tolist() +
+                             graph.friended_by(student_id).tolist() + graph.foed_by(student_id).tolist()):
+                affected_teams.add(student_to_team_map[other_id])
+        self.reoptimize_teams(student_to_team_map, affected_teams)
+        return State(self, student_to_team_map)
+
+    def reoptimize_teams(self, student_to_team_map, affected_teams):
+        """ Searches the students of some teams again, starting from their current teams, all the other teams
+            stay as they are
+        :param student_to_team_map: Dictionary mapping student id to team id of every student, modified in place
+        :param affected_teams:      Set of the team ids that are searched again
+        """
+        affected_students = sorted(student_id for student_id, team_num in student_to_team_map.iteritems()
+                                   if team_num in affected_teams)
+        if not affected_students:
+            return
+        sub_solver = self.make_sub_solver(affected_students, self.threshold_iterations)
+        sub_solver.rng = random.Random(0)
+        sub_solver.start_metaheuristic()
+        # The affected teams are renumbered from 0, so the sub solver only scans its own teams
+        local_team_map = dict((team_num, local_team_num)
+                              for local_team_num, team_num in enumerate(sorted(affected_teams)))
+        sub_state = sub_solver.find_best_state(State(sub_solver, dict(
+            (local_id, local_team_map[student_to_team_map[student_id]])
+            for local_id, student_id in enumerate(affected_students))))
+        # Team numbers of the re-optimized teams come after the ones of the untouched teams
+        team_offset = max(student_to_team_map.itervalues()) + 1
+        for local_id, team_num in sub_state.student_to_team_map.iteritems():
+            student_to_team_map[affected_students[local_id]] = team_offset + team_num
+
+    def solve_batch(self, batch_index):
+        """ Solves the students of one batch of a decomposed search on their own
+        :param batch_index: Index of the batch in self.batches
+        :return:            Dictionary mapping student id to team id, team ids local to the batch
+        """
+        batch = self.batches[batch_index]
+        batch_solver = self.make_sub_solver(batch, max(1, self.threshold_iterations * len(batch) //
+                                                       len(self.students)))
+        best_state = batch_solver.solve()
+        return dict((batch[local_id], team_num) for local_id, team_num in best_state.student_to_team_map.iteritems())
+
+    def solve_decomposed(self, workers=1):
+        """ Groups the students into teams by solving the connected components of the friend and foe graph, and
+            the clusters of the components larger than a batch, separately, packed into batches
+            The merged teams are repaired by a local search over the teams that can still gain from students of other
+            batches: the teams that are not full, and the teams with a friend in another batch
+        :param workers: Number of processes solving the batches
+        :return:        State object representing the best teams found
+        """
+        graph = self.preference_graph
+        self.batches = pack_components(split_components(graph, connected_components(graph)))
+        if len(self.batches) <= 1:
+            self.batches = None
+            return self.solve()
+        if workers > 1:
+            solver_key = next(solver_keys)
+            solver_registry[solver_key] = self
+            pool = multiprocessing.Pool(min(workers, len(self.batches)), ignore_interrupts)
+            try:
+                batch_maps = pool.map(solve_batch, [(solver_key, batch_index)
+                                                    for batch_index in range(len(self.batches))])
+            finally:
+                pool.close()
+                pool.join()
+                del solver_registry[solver_key]
+        else:
+            batch_maps = map(self.solve_batch, range(len(self.batches)))
+        batch_numbers = numpy.empty(len(self.students), dtype=numpy.int64)
+        for batch_number, batch in enumerate(self.batches):
+            batch_numbers[batch] = batch_number
+        self.batches = None
+        student_to_team_map = dict()
+        team_offset = 0
+        for batch_map in batch_maps:
+            for student_id, team_num in batch_map.iteritems():
+                student_to_team_map[student_id] = team_offset + team_num
+            team_offset += max(batch_map.itervalues()) + 1
+        # Repair pass: only teams that are not full can take students of other batches, and only students with
+        # a friend in another batch can lower their cost by trading teams across batches
+        with self.phase('repair'):
+            team_sizes = defaultdict(int)
+            for team_num in student_to_team_map.itervalues():
+                team_sizes[team_num] += 1
+            affected_teams = set(team_num for team_num, team_size in team_sizes.iteritems()
+                                 if team_size < self.max_team_size)
+            sources, targets = relation_edges(graph, include_foes=False)
+            crossing = batch_numbers[sources] != batch_numbers[targets]
+            for student_id in numpy.union1d(sources[crossing], targets[crossing]).tolist():
+                affected_teams.add(student_to_team_map[student_id])
+            if self.instrumentation is not None:
+                self.instrumentation.count('repaired teams', len(affected_teams))
+            self.reoptimize_teams(student_to_team_map, affected_teams)
+        return State(self, student_to_team_map)
+
+    def find_best_state_multi_start(self, starts, workers):
+        """ Runs independent searches from perturbed Squeaky Wheel starts and keeps the global best
+        :param starts:  Number of searches
+        :param workers: Number of processes running the searches
+        :return:        State object representing the best state out of all the searches
+        """
+        self.sw_student_to_team_map = self.get_sw_state().student_to_team_map
+        self.shared_best = SharedBest()
+        if workers > 1:
+            # Forked workers inherit the parsed preferences and the shared best cost through the registry,
+            # so only the seeds and the results are pickled
+            solver_key = next(solver_keys)
+            solver_registry[solver_key] = self
+            pool = multiprocessing.Pool(min(workers, starts), ignore_interrupts)
+            try:
+                async_results = pool.map_async(search_from_seed, [(solver_key, seed) for seed in range(starts)])
+                try:
+                    while not async_results.ready():
+                        async_results.wait(0.1)
+                except KeyboardInterrupt:
+                    # The workers return their best states as soon as they see the stop request
+                    self.shared_best.request_stop()
+                results = async_results.get()
+            finally:
+                pool.close()
+                pool.join()
+                del solver_registry[solver_key]
+        else:
+            results = map(self.search_from_seed, range(starts))
+        self.shared_best = None
+        best_cost, seed, best_student_to_team_map = min(results)
+        return State(self, best_student_to_team_map)
+
+
+def ignore_interrupts():
+    """ Makes a worker process ignore interrupts, which are handled by the parent process
     """
-    sd_list = list()
-    for i in range(len(compatibility_matrix)):
-        sd_list.append((numpy.std(compatibility_matrix[i]), i))
-    return sorted(sd_list)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
 
 
-def initialize():
-    """ We assume initial state where all the students are in separate teams
-    :return: State object representing the initial state
+def raise_interrupt(signal_number, frame):
+    """ Signal handler that turns a termination request into an interrupt of the search
+    :param signal_number: Number of the received signal
+    :param frame:         Current stack frame
     """
-    student_to_team_map = dict()
-    team_number = 0
-    for student_id in student_dict:
-        student_to_team_map[student_id] = team_number
-        team_number += 1
-    initial_state = State(student_to_team_map)
-    return initial_state
-
-
-def get_sw_state():
-    """ Uses Squeaky Wheel algorithm to determine teams
-        Reference: http://citeseerx.ist.psu.edu/viewdoc/download?doi=10.1.1.521.2649&rep=rep1&type=pdf
-    :return: State object representing the teams as outputted by the Squeaky Wheel algorithm
+    raise KeyboardInterrupt
+
+
+def search_from_seed(task):
+    """ Runs one search of a multi-start search in a worker process
+    :param task: Tuple (key of the solver in the solver registry, seed of the search)
+    :return:     Tuple (best cost, seed, dictionary mapping student id to team id)
     """
-    global student_dict, max_team_size
-    initial_state = initialize()
-    compatibility_matrix = build_compatibility_matrix()
-    sd_list = make_sd_list(compatibility_matrix)
-    curr_team_number = 0
-    remaining_students = student_dict.keys()
-    while remaining_students:
-        squeakiest_student = student_dict[sd_list.pop()[1]]
-        if squeakiest_student.student_id not in remaining_students:
-            continue
-        initial_state.assign_student_to_team(squeakiest_student.student_id, curr_team_number)
-        remaining_students.remove(squeakiest_student.student_id)
-        for i in range(1, max_team_size):
-            best_team_member, best_cost = find_best_team_member(curr_team_number, remaining_students, initial_state)
-            if best_cost < 0:
-                initial_state.assign_student_to_team(best_team_member, curr_team_number)
-                remaining_students.remove(best_team_member)
-        curr_team_number += 1
-    return State(initial_state.student_to_team_map)
-
-
-def find_best_team_for_student(student_id, state):
-    """ Finds the best team out of all the teams for a student
-    :param student_id: ID of the student for whom a best team is to be determined
-    :param state:      State object that contains the current configuration of the teams
-    :return:           ID of the best team for the student
+    solver_key, seed = task
+    return solver_registry[solver_key].search_from_seed(seed)
+
+
+def solve_batch(task):
+    """ Solves one batch of a decomposed search in a worker process
+    :param task: Tuple (key of the solver in the solver registry, index of the batch)
+    :return:     Dictionary mapping student id to team id, team ids local to the batch
     """
-    global student_dict, max_team_size
-    team_set = state.team_to_student_map[state.student_to_team_map[student_id]]
-    best_cost = student_dict[student_id].calculate_total_cost(team_set)
-    best_team_num = state.student_to_team_map[student_id]
-    for team_num, team in state.team_to_student_map.iteritems():
-        if team_num != state.student_to_team_map[student_id] and \
-                        len(state.team_to_student_map[team_num]) < max_team_size:
-            curr_cost = state.cost_of_placing_student_in_team(student_id, team_num)
-            if curr_cost < best_cost:
-                best_cost = curr_cost
-                best_team_num = team_num
-    return best_team_num
-
-
-def find_best_team_member(team_num, candidates, state):
-    """ Finds the best team member out of a given list of candidates for a team
-        Best team member is one that results in the lowest cost
-    :param team_num:   Team number for which the best team member is to be determined
-    :param candidates: List of students that could be added to the team
-    :param state:      State object that contains the current configuration of the teams
-    :return:           ID of the best team member, Cost of keeping the student in the team
+    solver_key, batch_index = task
+    return solver_registry[solver_key].solve_batch(batch_index)
+
+
+def parse_arguments():
+    """ Parses the command line arguments
+    :return: Namespace with the parsed arguments
     """
-    best_cost = sys.maxint
-    best_team_member = -1
-    for candidate in candidates:
-        curr_cost = state.cost_of_placing_student_in_team(candidate, team_num)
-        if curr_cost < best_cost:
-            best_cost = curr_cost
-            best_team_member = candidate
-    return best_team_member, best_cost
-
-
-def find_next_state(curr_state):
-    """ Takes the current state (configuration of students to teams) and finds the next state
-    :param curr_state: State object representing the current configuration of students to teams
-    :return:           State object representing the next configuration of students to teams
+    parser = argparse.ArgumentParser(description='Groups students into teams based on their preferences')
+    parser.add_argument('file_path', help='File with the preferences of the students')
+    parser.add_argument('k', type=int, help='Time required to grade each assignment')
+    parser.add_argument('m', type=int, help='Time required to complain about being teamed with a foe')
+    parser.add_argument('n', type=int, help='Time required to complain about not being teamed with a friend')
+    parser.add_argument('--starts', type=int, default=1,
+                        help='Number of independent searches, each from its own perturbed start (default: 1)')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                        help='Number of processes running the searches (default: number of cores)')
+    parser.add_argument('--neighborhoods', default='',
+                        help="Comma separated moves tried besides relocation: 'swap', 'eject' (default: none)")
+    parser.add_argument('--metaheuristic', choices=sorted(metaheuristic_map), default='tabu',
+                        help='Search strategy (default: tabu)')
+    parser.add_argument('--decompose', action='store_true',
+                        help='Solve the connected components of the friend and foe graph concurrently, then repair')
+    parser.add_argument('--warm-start', metavar='OUTPUT',
+                        help='Output of a previous run: only the teams affected by the changes are searched again')
+    parser.add_argument('--previous-input', metavar='FILE',
+                        help='Preference file of the previous run, to detect which students changed')
+    parser.add_argument('--trace', metavar='PATH',
+                        help="Write phase timers, counters and the best cost over time to PATH, CSV if it ends "
+                             "with '.csv' and JSON otherwise")
+    parser.add_argument('--cache', action='store_true',
+                        help='Keep the parsed preferences in a binary cache next to the file and reuse it')
+    parser.add_argument('--team-cache-size', type=int, default=default_capacity, metavar='N',
+                        help='Number of teams whose member costs are cached, 0 disables the cache (default: %d)'
+                             % default_capacity)
+    parser.add_argument('--gap', action='store_true',
+                        help='Print the lower bound of the optimal cost and the optimality gap to stderr')
+    parser.add_argument('--squeaky-wheel-iterations', type=int, metavar='N',
+                        help='Iterated Squeaky Wheel: number of cycles after the first construction, every cycle '
+                             'rebuilds the teams of the unhappy students with the most blamed students first')
+    parser.add_argument('--squeaky-wheel-time', type=float, metavar='T',
+                        help='Iterated Squeaky Wheel: seconds spent on the cycles after the first construction')
+    parser.add_argument('--exact', action='store_true',
+                        help='Branch and bound for small inputs, the budgets limit the branch and bound')
+    parser.add_argument('--time-budget', type=float,
+                        help='Anytime mode: search until this many seconds have passed')
+    parser.add_argument('--eval-budget', type=int,
+                        help='Anytime mode: search until every search has evaluated this many moves')
+    parser.add_argument('--progress', metavar='PATH',
+                        help="Write every improvement of the best state to this file, '-' for stdout")
+    parser.add_argument('--progress-interval', type=float, default=0.0,
+                        help='Minimum number of seconds between two progress reports (default: 0)')
+    return parser.parse_args()
+
+
+def run(arguments, instrumentation=None):
+    """ Solves the problem given on the command line and prints the teams
+    :param arguments:       Namespace with the parsed arguments
+    :param instrumentation: Instrumentation object of an instrumented run, None otherwise
     """
-    global tabu_dict
-    while curr_state.student_cost_queue.qsize() > 0:
-        student_id = curr_state.student_cost_queue.get()[1]
-        if student_id not in tabu_dict:
-            best_team_num = find_best_team_for_student(student_id, curr_state)
-            curr_state.assign_student_to_team(student_id, best_team_num)
-            tabu_dict[student_id] = 1
-            break
-    student_to_team_map = curr_state.student_to_team_map
-    to_be_removed_list = list()
-    for student_id, tabu_val in tabu_dict.iteritems():
-        if tabu_val < 5:
-            tabu_dict[student_id] = tabu_val + 1
-        else:
-            to_be_removed_list.append(student_id)
-    for student_id in to_be_removed_list:
-        tabu_dict.pop(student_id)
-    return State(student_to_team_map)
+    neighborhoods = [neighborhood for neighborhood in arguments.neighborhoods.split(',') if neighborhood]
+    with instrumentation.phase('parse') if instrumentation is not None else null_phase:
+        solver = Solver.from_file(arguments.file_path, arguments.k, arguments.m, arguments.n,
+                                  use_cache=arguments.cache, neighborhoods=neighborhoods,
+                                  metaheuristic=arguments.metaheuristic, team_cache_size=arguments.team_cache_size,
+                                  sw_iterations=arguments.squeaky_wheel_iterations,
+                                  sw_time_budget=arguments.squeaky_wheel_time)
+    solver.instrumentation = instrumentation
+    try:
+        best_state = run_search(solver, arguments)
+    finally:
+        if instrumentation is not None and solver.team_cost_cache is not None:
+            instrumentation.count('team cost cache hits', solver.team_cost_cache.hits)
+            instrumentation.count('team cost cache misses', solver.team_cost_cache.misses)
+    if best_state is None:
+        return
+    if instrumentation is not None:
+        instrumentation.count('lower bound', solver.lower_bound)
+        instrumentation.count('optimality gap', best_state.total_cost - solver.lower_bound)
+    if arguments.gap:
+        sys.stderr.write('Lower bound = %d, optimality gap = %d\n' % (solver.lower_bound,
+                                                                       best_state.total_cost - solver.lower_bound))
 
 
-def find_best_state():
-    """ Determines and returns the best state
-        Best state is one that results in the least cost
-    :return: The best state
+def run_search(solver, arguments):
+    """ Runs the search selected on the command line and prints the teams
+    :param solver:    Solver object of the problem
+    :param arguments: Namespace with the parsed arguments
+    :return:          State object representing the printed teams, None in exact mode, which reports its own gap
     """
-    global threshold_iterations
-    curr_state = best_state = get_sw_state()
-    counter = 0
-    # Checking whether the best state is changed in the last 'threshold_iterations' iterations
-    # Borrowed from: http://ieeexplore.ieee.org/document/5518761/
-    while counter < threshold_iterations:
-        next_state = find_next_state(curr_state)
-        if next_state.total_cost < best_state.total_cost:
-            best_state = next_state
-            counter = 0
-        curr_state = next_state
-        counter += 1
+    # solver.print_input()
+    # print 'Printing best state'
+    if arguments.exact:
+        best_state, lower_bound = solver.solve_exact(arguments.time_budget, arguments.eval_budget)
+        print best_state
+        sys.stderr.write('Lower bound = %d, optimality gap = %d\n' % (lower_bound,
+                                                                       best_state.total_cost - lower_bound))
+        return
+    if arguments.warm_start:
+        changed_relations = None
+        if arguments.previous_input:
+            changed_relations = changed_preferences(arguments.previous_input, arguments.file_path)
+        best_state = solver.solve_incremental(parse_output(arguments.warm_start), changed_relations)
+    elif arguments.decompose:
+        best_state = solver.solve_decomposed(arguments.workers)
+    else:
+        best_state = solver.solve(arguments.starts, arguments.workers, arguments.time_budget, arguments.eval_budget,
+                                  arguments.progress, arguments.progress_interval)
+    print best_state
     return best_state
 
 
 def main():
     """ Main function
     """
-    read_input()
-    # print_input()
-    # print 'Printing best state'
-    print find_best_state()
+    arguments = parse_arguments()
+    signal.signal(signal.SIGTERM, raise_interrupt)
+    instrumentation = None
+    if arguments.trace:
+        # Searches running in worker processes are not counted
+        instrumentation = Instrumentation()
+        for owner, function_name in ((StudentTable, 'calculate_total_cost'), (State, 'cost_delta'),
+                                     (CostEngine, 'costs_of_placing_student'),
+                                     (CostEngine, 'costs_of_placing_shortlist')):
+            instrumentation.count_calls(owner, function_name)
+    try:
+        run(arguments, instrumentation)
+    finally:
+        if instrumentation is not None:
+            instrumentation.restore()
+            instrumentation.write(arguments.trace)
 
 
 if __name__ == '__main__':
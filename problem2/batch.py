@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+#
+# batch.py : Solves many course sections with assign.py in one invocation
+#
+# Usage    : python batch.py SOURCE [k] [m] [n]
+#             where SOURCE -> Directory of preference files, or manifest file with one section per line:
+#                             'FILE [k m n]', paths relative to the manifest, lines starting with '#' are skipped
+#                   k m n  -> Weights of the sections that do not give their own, see assign.py
+#             Options: --workers W      -> Number of processes solving the sections
+#                      --time-limit T   -> Seconds per section, the search then stops with the best teams so far
+#                      --output PATH    -> File of the JSON results, '-' for stdout
+#                      --metaheuristic NAME, --neighborhoods swap,eject, --cache -> Passed on to every section
+#
+# The sections are solved on a pool of worker processes that are forked once, after NumPy and the solver are
+# imported, so the start-up cost is paid once and not for every section. One JSON line is written per section as
+# soon as it is solved, in order of completion.
+#
+
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+import traceback
+from collections import OrderedDict
+
+from assign import Solver, ignore_interrupts
+from metaheuristics import metaheuristic_map
+
+result_poll_seconds = 0.1   # The parent waits for results in steps of this many seconds, so it sees Ctrl-C
+
+
+class TimeLimitExceeded(KeyboardInterrupt):
+    """ Raised in a worker when a section runs out of time
+        It is a KeyboardInterrupt, so a running local search stops and returns the best teams found so far
+    """
+    pass
+
+
+def raise_time_limit(signal_number, frame):
+    """ Signal handler of the time limit of a section
+    :param signal_number: Number of the received signal
+    :param frame:         Current stack frame
+    """
+    raise TimeLimitExceeded
+
+
+def read_manifest(manifest_path, default_weights):
+    """ Reads the sections of a manifest file
+    :param manifest_path:   Path of the manifest, one 'FILE [k m n]' per line
+    :param default_weights: Weights (k, m, n) of the sections without their own, None if every line needs them
+    :return:                List of tuples (path of the preference file, weights)
+    """
+    directory = os.path.dirname(os.path.abspath(manifest_path))
+    sections = list()
+    with open(manifest_path, 'r') as fh:
+        for line_number, line in enumerate(fh, 1):
+            fields = line.split()
+            if not fields or fields[0].startswith('#'):
+                continue
+            if len(fields) == 4:
+                weights = tuple(int(field) for field in fields[1:])
+            elif len(fields) == 1 and default_weights is not None:
+                weights = default_weights
+            else:
+                raise ValueError('%s:%d: expected FILE k m n%s' % (manifest_path, line_number,
+                                                                   '' if default_weights is None else ' or FILE'))
+            sections.append((os.path.join(directory, fields[0]), weights))
+    return sections
+
+
+def list_sections(source, default_weights):
+    """ Lists the sections of a directory or a manifest
+    :param source:          Directory of preference files, or manifest file
+    :param default_weights: Weights (k, m, n) of the sections without their own, None if not given
+    :return:                List of tuples (path of the preference file, weights)
+    """
+    if not os.path.isdir(source):
+        return read_manifest(source, default_weights)
+    if default_weights is None:
+        raise ValueError('The weights k m n are needed to solve a directory')
+    return [(os.path.join(source, name), default_weights) for name in sorted(os.listdir(source))
+            if not name.startswith('.') and os.path.isfile(os.path.join(source, name))]
+
+
+def solve_section(job):
+    """ Solves one section in a worker process
+    :param job: Tuple (path of the preference file, weights (k, m, n), time limit in seconds or None,
+                dictionary of keyword arguments of Solver.from_file)
+    :return:    Dictionary with the result of the section
+    """
+    file_path, weights, time_limit, solver_options = job
+    result = OrderedDict([('input', file_path), ('weights', list(weights)), ('status', 'ok')])
+    start_time = time.time()
+    if time_limit:
+        signal.signal(signal.SIGALRM, raise_time_limit)
+        signal.setitimer(signal.ITIMER_REAL, time_limit)
+    try:
+        solver = Solver.from_file(file_path, *weights, **solver_options)
+        best_state = solver.solve()
+        if time_limit:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        if time_limit and time.time() - start_time >= time_limit:
+            result['status'] = 'time_limit'   # The search was cut short, the teams are the best found in time
+        result['students'] = len(solver.students)
+        result['cost'] = best_state.total_cost
+        result['teams'] = [[solver.students.student_name(student_id) for student_id in team]
+                           for team in best_state.team_to_student_map.values()]
+    except TimeLimitExceeded:
+        result['status'] = 'time_limit'   # Out of time before the search started, there are no teams
+    except Exception:
+        result['status'] = 'error'
+        result['error'] = traceback.format_exc().strip().splitlines()[-1]
+    finally:
+        if time_limit:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    result['seconds'] = time.time() - start_time
+    return result
+
+
+def parse_arguments():
+    """ Parses the command line arguments
+    :return: Namespace with the parsed arguments
+    """
+    parser = argparse.ArgumentParser(description='Solves many course sections with assign.py on a worker pool')
+    parser.add_argument('source', help="Directory of preference files, or manifest with one 'FILE [k m n]' per line")
+    parser.add_argument('weights', nargs='*', type=int, metavar='k m n',
+                        help='Weights of the sections that do not give their own')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                        help='Number of processes solving the sections (default: number of cores)')
+    parser.add_argument('--time-limit', type=float,
+                        help='Seconds per section, the search then stops with the best teams found so far')
+    parser.add_argument('--output', default='-', help="File of the JSON results, '-' for stdout (default: -)")
+    parser.add_argument('--metaheuristic', choices=sorted(metaheuristic_map), default='tabu',
+                        help='Search strategy (default: tabu)')
+    parser.add_argument('--neighborhoods', default='',
+                        help="Comma separated moves tried besides relocation: 'swap', 'eject' (default: none)")
+    parser.add_argument('--cache', action='store_true',
+                        help='Keep the parsed preferences in a binary cache next to every file and reuse it')
+    arguments = parser.parse_args()
+    if arguments.weights and len(arguments.weights) != 3:
+        parser.error('expected the three weights k m n')
+    return arguments
+
+
+def main():
+    """ Main function
+    """
+    arguments = parse_arguments()
+    try:
+        sections = list_sections(arguments.source, tuple(arguments.weights) or None)
+    except (IOError, OSError, ValueError) as error:
+        sys.exit('batch.py: %s' % error)
+    solver_options = {
+        'use_cache': arguments.cache,
+        'metaheuristic': arguments.metaheuristic,
+        'neighborhoods': [neighborhood for neighborhood in arguments.neighborhoods.split(',') if neighborhood],
+    }
+    jobs = [(file_path, weights, arguments.time_limit, solver_options) for file_path, weights in sections]
+    fh = sys.stdout if arguments.output == '-' else open(arguments.output, 'w')
+    pool = multiprocessing.Pool(max(1, min(arguments.workers, len(jobs))), ignore_interrupts)
+    try:
+        results = pool.imap_unordered(solve_section, jobs)
+        for i in range(len(jobs)):
+            while True:
+                try:
+                    result = results.next(result_poll_seconds)
+                    break
+                except multiprocessing.TimeoutError:
+                    continue
+            fh.write(json.dumps(result) + '\n')
+            fh.flush()
+        pool.close()
+    except KeyboardInterrupt:
+        pool.terminate()
+        sys.exit(130)
+    finally:
+        pool.join()
+        if fh is not sys.stdout:
+            fh.close()
+
+
+if __name__ == '__main__':
+    main()
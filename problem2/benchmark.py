@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+#
+# benchmark.py : Benchmark suite of assign.py on synthetic inputs
+#
+# Usage        : python benchmark.py [results file]
+#                 Options: --students 1000,10000 -> Sizes of the generated inputs
+#                          --inputs FILE ...     -> Benchmark existing input files as well
+#                          --weights "k m n"     -> Cost weights, may be repeated
+#                          --time-budget T, --eval-budget E, --metaheuristic NAME -> Passed on to the search
+#
+# Every input is solved in its own process, so that the peak resident set size belongs to that input alone.
+# The results are written as JSON: the wall time of every phase (parse, Squeaky Wheel construction, local
+# search), the peak RSS, the iterations per second of the local search and the costs, together with the
+# commit they were measured on, so that two result files can be compared for regressions.
+#
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from collections import OrderedDict
+
+from anytime import SearchBudget
+from assign import Solver
+from generate_input import generate
+from metaheuristics import metaheuristic_map
+
+
+def run_benchmark(file_path, assn_grading, foe_complaint, friend_complaint, time_budget=None, eval_budget=None,
+                  metaheuristic='tabu'):
+    """ Solves one input and measures every phase
+    :param file_path:        Path of the input file
+    :param assn_grading:     Time spent in grading assignment for one team
+    :param foe_complaint:    Time spent by a student to complain about being grouped with a foe
+    :param friend_complaint: Time spent by a student to complain about not being grouped with a friend
+    :param time_budget:      Wall-clock budget in seconds of the local search, None for the default stopping rule
+    :param eval_budget:      Number of moves the local search may evaluate, None for the default stopping rule
+    :param metaheuristic:    Name of the search strategy
+    :return:                 Dictionary with the measurements
+    """
+    phase_times = OrderedDict()
+    start_time = time.time()
+    solver = Solver.from_file(file_path, assn_grading, foe_complaint, friend_complaint, metaheuristic=metaheuristic)
+    phase_times['parse'] = time.time() - start_time
+    start_time = time.time()
+    sw_state = solver.get_sw_state()
+    construction_cost = sw_state.total_cost
+    phase_times['construction'] = time.time() - start_time
+    start_time = time.time()
+    solver.rng = random.Random(0)
+    solver.start_metaheuristic()
+    if time_budget is not None or eval_budget is not None:
+        solver.budget = SearchBudget(time_budget, eval_budget)
+    best_state = solver.find_best_state(sw_state)
+    phase_times['search'] = time.time() - start_time
+    return OrderedDict([
+        ('input', file_path),
+        ('students', len(solver.students)),
+        ('weights', [assn_grading, foe_complaint, friend_complaint]),
+        ('metaheuristic', metaheuristic),
+        ('phase_seconds', phase_times),
+        ('total_seconds', sum(phase_times.values())),
+        ('peak_rss_kb', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss),
+        ('iterations', solver.iteration),
+        ('iterations_per_second', solver.iteration / phase_times['search'] if phase_times['search'] else None),
+        ('team_cost_cache_hits', solver.team_cost_cache.hits),
+        ('team_cost_cache_misses', solver.team_cost_cache.misses),
+        ('construction_cost', construction_cost),
+        ('final_cost', best_state.total_cost),
+        ('lower_bound', solver.lower_bound),
+    ])
+
+
+def generated_input(directory, student_count, seed):
+    """ Generates an input with the default generator settings, unless it is already there
+    :param directory:     Directory of the generated inputs
+    :param student_count: Number of students
+    :param seed:          Seed of the generator
+    :return:              Path of the input file
+    """
+    file_path = os.path.join(directory, 'students_%d_seed_%d' % (student_count, seed))
+    if not os.path.exists(file_path):
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(file_path + '.tmp', 'w') as fh:
+            generate(fh, student_count, seed=seed)
+        os.rename(file_path + '.tmp', file_path)
+    return file_path
+
+
+def current_commit():
+    """ Finds the commit of the working tree
+    :return: Commit hash, None outside of a git repository
+    """
+    try:
+        with open(os.devnull, 'w') as devnull:
+            return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=devnull,
+                                           cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_arguments():
+    """ Parses the command line arguments
+    :return: Namespace with the parsed arguments
+    """
+    parser = argparse.ArgumentParser(description='Benchmarks assign.py on synthetic inputs')
+    parser.add_argument('results', nargs='?', default='benchmark_results.json',
+                        help='JSON file where the results are written (default: benchmark_results.json)')
+    parser.add_argument('--students', default='1000,10000,100000',
+                        help='Comma separated sizes of the generated inputs (default: 1000,10000,100000)')
+    parser.add_argument('--inputs', nargs='*', default=[], help='Existing input files to be benchmarked as well')
+    parser.add_argument('--input-dir', default='benchmark_inputs',
+                        help='Directory of the generated inputs (default: benchmark_inputs)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the generated inputs (default: 0)')
+    parser.add_argument('--weights', action='append',
+                        help="Cost weights 'k m n', may be repeated (default: '10 1 1')")
+    parser.add_argument('--time-budget', type=float, help='Wall-clock budget in seconds of every local search')
+    parser.add_argument('--eval-budget', type=int, help='Number of moves every local search may evaluate')
+    parser.add_argument('--metaheuristic', choices=sorted(metaheuristic_map), default='tabu',
+                        help='Search strategy (default: tabu)')
+    parser.add_argument('--run-one', nargs=4, metavar=('FILE', 'K', 'M', 'N'), help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    """ Main function
+    """
+    arguments = parse_arguments()
+    if arguments.run_one:
+        file_path, k, m, n = arguments.run_one
+        print json.dumps(run_benchmark(file_path, int(k), int(m), int(n), arguments.time_budget,
+                                       arguments.eval_budget, arguments.metaheuristic))
+        return
+    input_paths = [generated_input(arguments.input_dir, int(student_count), arguments.seed)
+                   for student_count in arguments.students.split(',') if student_count]
+    input_paths += arguments.inputs
+    runs = list()
+    for weights in arguments.weights or ['10 1 1']:
+        for file_path in input_paths:
+            command = [sys.executable, os.path.abspath(__file__), '--run-one', file_path] + weights.split() + \
+                      ['--metaheuristic', arguments.metaheuristic]
+            if arguments.time_budget is not None:
+                command += ['--time-budget', str(arguments.time_budget)]
+            if arguments.eval_budget is not None:
+                command += ['--eval-budget', str(arguments.eval_budget)]
+            run = json.loads(subprocess.check_output(command).splitlines()[-1], object_pairs_hook=OrderedDict)
+            sys.stderr.write('%s %s: %.2fs, cost %d\n' % (file_path, weights, run['total_seconds'],
+                                                          run['final_cost']))
+            runs.append(run)
+    results = OrderedDict([
+        ('commit', current_commit()),
+        ('python', platform.python_version()),
+        ('date', time.strftime('%Y-%m-%dT%H:%M:%S')),
+        ('runs', runs),
+    ])
+    with open(arguments.results, 'w') as fh:
+        json.dump(results, fh, indent=2)
+        fh.write('\n')
+
+
+if __name__ == '__main__':
+    main()
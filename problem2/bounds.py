@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+#
+# bounds.py : Fast lower bound of the optimal total cost of assign.py
+#
+# Prerequisites : Install the package 'numpy'
+#                 Execute the command `sudo pip install numpy`
+#
+# The bound is computed in O(N + E) with NumPy, so it is available for every roster and weight set, and the
+# local search can stop as soon as it reaches it. It is the larger of two bounds:
+#   counting   -> At least ceil(N / max_team_size) teams are graded, and a student with more friend requests than
+#                 a team has room for misses the rest of them, whatever the teams are
+#   relaxation -> Every team of s members costs s * (k / s) in grading, so the grading can be split over the
+#                 members. Every student is then given the team size that minimizes their share of the grading,
+#                 their size complaint and the friend requests that a team of that size can not honour, as if the
+#                 team sizes could be chosen freely. Foes are left out, since a student can always be kept apart
+#                 from them.
+# The shares are scaled by the least common multiple of the team sizes, so the bound is computed exactly in integers.
+#
+
+import fractions
+
+import numpy
+
+
+def team_size_multiple(max_team_size):
+    """ Calculates the least common multiple of all the team sizes
+    :param max_team_size: The maximum team size allowed
+    :return:              Least common multiple of 1 to max_team_size
+    """
+    multiple = 1
+    for team_size in range(2, max_team_size + 1):
+        multiple = multiple * team_size // fractions.gcd(multiple, team_size)
+    return multiple
+
+
+def missing_friend_counts(graph, team_size):
+    """ Counts the friend requests of every student that a team of a given size can not honour
+    :param graph:     PreferenceGraph object
+    :param team_size: Size of the team of every student
+    :return:          Array with the number of missed friend requests of every student
+    """
+    friend_counts = numpy.diff(graph.friend_offsets)
+    return numpy.maximum(0, graph.wanted_friend_count - numpy.minimum(team_size - 1, friend_counts))
+
+
+def roster_lower_bound(graph, assn_grading, size_complaint, friend_complaint):
+    """ Calculates a lower bound of the total cost of every grouping of the students
+    :param graph:            PreferenceGraph object
+    :param assn_grading:     Time spent in grading assignment for one team
+    :param size_complaint:   Time spent by a student to complain about their team size
+    :param friend_complaint: Time spent by a student to complain about not being grouped with a friend
+    :return:                 Lower bound of the optimal total cost
+    """
+    student_count = graph.student_count
+    max_team_size = graph.max_team_size
+    if not student_count:
+        return 0
+    counting_bound = assn_grading * -(-student_count // max_team_size) + \
+                     friend_complaint * int(missing_friend_counts(graph, max_team_size).sum())
+    multiple = team_size_multiple(max_team_size)
+    scaled_costs = None
+    for team_size in range(1, max_team_size + 1):
+        costs = multiple * (size_complaint * (graph.pref_team_size != team_size) +
+                            friend_complaint * missing_friend_counts(graph, team_size)) + \
+                assn_grading * multiple // team_size
+        scaled_costs = costs if scaled_costs is None else numpy.minimum(scaled_costs, costs)
+    relaxation_bound = -(-int(scaled_costs.sum()) // multiple)
+    return max(counting_bound, relaxation_bound)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+#
+# check_sd_order.py : Checks the Squeaky Wheel order of assign.py against the dense compatibility matrix
+#
+# Prerequisites     : Install the package 'numpy'
+#                     Execute the command `sudo pip install numpy`
+#
+# Usage             : python check_sd_order.py [--weights "K M N" ...] [FILE ...]
+#                      where K, M, N -> Weight sets of the solved outputs, the usual ones if none is given
+#                            FILE    -> Preference file, the bundled inputs if none is given
+#
+# The sparse CompatibilityMatrix orders the students by the exact integer variance of their rows, with the student
+# id breaking the ties. This script builds the N*N matrix the way the dense path did, one find_compatibility_value
+# pair at a time, and takes numpy.std of every row. Both orders must be the same, except that students whose rows
+# have exactly the same variance are ordered by id, where the dense path ordered them by the rounding noise of
+# numpy.std. Every difference is printed, and the exit status is 1 if there is any.
+#
+# The script then solves every file with every weight set twice, once with the sparse order and once with the dense
+# numpy.std order, and compares the printed outputs. The tie order changes the Squeaky Wheel start, so a few of the
+# bundled results differ; they are listed in expected_changes with both costs. Any other difference, a listed one
+# with other costs, or a listed one that no longer differs fails the check.
+#
+
+import argparse
+import os
+import sys
+
+import numpy
+
+from assign import Solver
+
+bundled_inputs = ('input', 'input_100', 'input_large_200')   # Inputs next to this script, checked by default
+default_weights = ((1, 1, 1), (10, 1, 1), (5, 20, 1), (10, 5, 2), (100, 2, 3), (160, 31, 10))   # K M N checked
+
+# Bundled outputs the exact tie order changes: (file name, K, M, N) -> (dense cost, sparse cost)
+expected_changes = {
+    ('input_100', 1, 1, 1): (189, 189),   # Same teams, printed in another order
+    ('input_100', 5, 20, 1): (490, 497),
+    ('input_100', 10, 1, 1): (827, 837),
+    ('input_100', 10, 5, 2): (872, 873),
+    ('input_100', 100, 2, 3): (6017, 5908),
+    ('input_100', 160, 31, 10): (9964, 9946),
+    ('input_large_200', 1, 1, 1): (399, 433),
+    ('input_large_200', 100, 2, 3): (12543, 12553),
+}
+
+
+def find_compatibility_value(students, student_id, other_id):
+    """ Calculates the compatibility value of one student towards another, as the dense path did
+    :param students:   StudentTable object
+    :param student_id: ID of the student
+    :param other_id:   ID of the other student
+    :return:           1 for a friend, -1 for a foe, 0 otherwise
+    """
+    if students.is_friend(student_id, other_id):
+        return 1
+    elif students.is_foe(student_id, other_id):
+        return -1
+    else:
+        return 0
+
+
+def dense_compatibility_matrix(students):
+    """ Builds the N*N compatibility matrix of the dense path
+    :param students: StudentTable object
+    :return:         N*N array of the compatibility values of every pair of students
+    """
+    student_count = len(students)
+    compatibility_matrix = numpy.zeros((student_count, student_count), dtype=numpy.int64)
+    for i in range(student_count):
+        for j in range(i + 1, student_count):
+            compatibility_matrix[i, j] = compatibility_matrix[j, i] = \
+                find_compatibility_value(students, i, j) + find_compatibility_value(students, j, i)
+    return compatibility_matrix
+
+
+class DenseOrderSolver(Solver):
+    """ Solver that orders the Squeaky Wheel start by numpy.std of the dense rows, as the dense path did
+    """
+    def __init__(self, students, assn_grading, foe_complaint, friend_complaint, compatibility_matrix):
+        """ Constructor
+        :param students:             StudentTable object of the students
+        :param assn_grading:         Time spent in grading assignment for one team
+        :param foe_complaint:        Time spent by a student to complain about being grouped with a foe
+        :param friend_complaint:     Time spent by a student to complain about not being grouped with a friend
+        :param compatibility_matrix: N*N array of the dense compatibility values
+        """
+        Solver.__init__(self, students, assn_grading, foe_complaint, friend_complaint)
+        self.dense_matrix = compatibility_matrix
+
+    def make_sd_list(self, compatibility_matrix):
+        """ Finds the standard deviation of every dense row, ties ordered by the rounding noise of numpy.std
+        :param compatibility_matrix: CompatibilityMatrix object, unused
+        :return:                     List of tuples (std dev, student id) sorted by std dev
+        """
+        return sorted((numpy.std(list(self.dense_matrix[i])), i) for i in range(len(self.dense_matrix)))
+
+
+def check_outputs(file_path, weight_sets):
+    """ Compares the printed outputs of the sparse and the dense orders of a file
+    :param file_path:   Path of the preference file
+    :param weight_sets: List of tuples (k, m, n) to solve the file with
+    :return:            List of the messages of the unexpected differences, empty if there is none
+    """
+    file_name = os.path.basename(file_path)
+    compatibility_matrix = None
+    messages = list()
+    for k, m, n in weight_sets:
+        sparse_solver = Solver.from_file(file_path, k, m, n)
+        if compatibility_matrix is None:
+            compatibility_matrix = dense_compatibility_matrix(sparse_solver.students)
+        sparse_state = sparse_solver.solve()
+        dense_state = DenseOrderSolver(sparse_solver.students, k, m, n, compatibility_matrix).solve()
+        costs = (dense_state.total_cost, sparse_state.total_cost)
+        expected_costs = expected_changes.get((file_name, k, m, n))
+        if str(sparse_state) == str(dense_state):
+            if expected_costs is not None:
+                messages.append('%s %d %d %d: listed as %d -> %d, but the outputs are the same' %
+                                ((file_path, k, m, n) + expected_costs))
+        elif expected_costs is None:
+            messages.append('%s %d %d %d: output differs, cost %d in the dense order, %d in the sparse one' %
+                            ((file_path, k, m, n) + costs))
+        elif expected_costs != costs:
+            messages.append('%s %d %d %d: listed as %d -> %d, but the costs are %d -> %d' %
+                            ((file_path, k, m, n) + expected_costs + costs))
+    return messages
+
+
+def check_file(file_path):
+    """ Compares the sparse order of the students of a file with the dense one
+    :param file_path: Path of the preference file
+    :return:          List of the messages of the differences, empty if the orders agree
+    """
+    solver = Solver.from_file(file_path, 1, 1, 1)
+    compatibility_matrix = dense_compatibility_matrix(solver.students)
+    student_count = len(compatibility_matrix)
+    sd_values = [numpy.std(compatibility_matrix[i]) for i in range(student_count)]
+    # Exact variance times N^2, to tell real ties from rounding noise
+    variance_keys = [student_count * int((row ** 2).sum()) - int(row.sum()) ** 2 for row in compatibility_matrix]
+    dense_order = [i for sd_value, i in sorted((sd_values[i], i) for i in range(student_count))]
+    expected_order = sorted(range(student_count), key=lambda i: (variance_keys[i], i))
+    sparse_list = solver.make_sd_list(solver.build_compatibility_matrix())
+    messages = list()
+    for position, (dense_id, expected_id, (sd_value, sparse_id)) in enumerate(zip(dense_order, expected_order,
+                                                                                  sparse_list)):
+        if variance_keys[dense_id] != variance_keys[sparse_id]:
+            messages.append('%s: position %d is student %d in the dense order, %d in the sparse one' %
+                            (file_path, position, dense_id, sparse_id))
+        elif expected_id != sparse_id:
+            messages.append('%s: position %d is student %d among the exact ties, %d in the sparse order' %
+                            (file_path, position, expected_id, sparse_id))
+        elif abs(sd_value - sd_values[sparse_id]) > 1e-12:
+            messages.append('%s: standard deviation of student %d is %r, %r in the dense path' %
+                            (file_path, sparse_id, sd_value, sd_values[sparse_id]))
+    return messages
+
+
+def parse_arguments():
+    """ Parses the command line arguments
+    :return: Namespace with the parsed arguments
+    """
+    parser = argparse.ArgumentParser(description='Checks the Squeaky Wheel order against the dense path')
+    parser.add_argument('file_paths', nargs='*', metavar='FILE',
+                        help='Preference files (default: the bundled inputs)')
+    parser.add_argument('--weights', action='append', metavar='"K M N"',
+                        type=lambda text: tuple(int(value) for value in text.split()),
+                        help='Weight set of the solved outputs, repeatable (default: %s)' %
+                             ', '.join(' '.join(str(value) for value in weights) for weights in default_weights))
+    return parser.parse_args()
+
+
+def main():
+    """ Main function
+    """
+    arguments = parse_arguments()
+    file_paths = arguments.file_paths or [os.path.join(os.path.dirname(os.path.abspath(__file__)), file_name)
+                                          for file_name in bundled_inputs]
+    failed = False
+    for file_path in file_paths:
+        messages = check_file(file_path)
+        for message in messages:
+            print message
+        print '%s: %s' % (file_path, 'differs' if messages else 'same order')
+        failed = failed or bool(messages)
+        messages = check_outputs(file_path, arguments.weights or default_weights)
+        for message in messages:
+            print message
+        print '%s: %s' % (file_path, 'unexpected outputs' if messages else 'expected outputs')
+        failed = failed or bool(messages)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+#
+# cost_engine.py : Vectorized cost model for assign.py
+#
+# Prerequisites  : Install the package 'numpy'
+#                  Execute the command `sudo pip install numpy`
+#
+# The friend and foe relations are stored as integer adjacency arrays in compressed sparse row (CSR) form,
+# and the team membership of the students as an index array. With these arrays the cost of placing a student
+# in every team, or the cost of placing every candidate in a team, is computed in one batched NumPy operation
+# instead of a Python loop over set intersections and list membership tests.
+#
+
+from collections import defaultdict
+
+import numpy
+
+
+def reverse_csr(offsets, targets):
+    """ Builds the CSR representation of the reversed edges
+    :param offsets: Offsets array of the CSR representation
+    :param targets: Targets array of the CSR representation
+    :return:        Offsets array, Targets array of the reversed edges
+    """
+    node_count = len(offsets) - 1
+    sources = numpy.repeat(numpy.arange(node_count), numpy.diff(offsets))
+    order = numpy.argsort(targets, kind='mergesort')
+    reversed_offsets = numpy.zeros(node_count + 1, dtype=numpy.int64)
+    reversed_offsets[1:] = numpy.cumsum(numpy.bincount(targets, minlength=node_count))
+    return reversed_offsets, sources[order]
+
+
+class PreferenceGraph:
+    """ Read-only integer array representation of the preferences of all the students
+    """
+    def __init__(self, students, max_team_size):
+        """ Constructor
+        :param students:      StudentTable object, the friend and foe arrays are shared with it
+        :param max_team_size: The maximum team size allowed
+        """
+        self.student_count = len(students)
+        self.max_team_size = max_team_size
+        self.pref_team_size = students.pref_team_size
+        # Number of friend requests that can be honoured, as used by StudentTable.calculate_total_cost
+        self.wanted_friend_count = numpy.minimum(students.friend_request_count, max_team_size)
+        self.friend_offsets, self.friend_targets = students.friend_offsets, students.friend_targets
+        self.foe_offsets, self.foe_targets = students.foe_offsets, students.foe_targets
+        self.friend_in_offsets, self.friend_in_targets = reverse_csr(self.friend_offsets, self.friend_targets)
+        self.foe_in_offsets, self.foe_in_targets = reverse_csr(self.foe_offsets, self.foe_targets)
+
+    def friends_of(self, student_id):
+        """ Returns the friends of a student
+        :param student_id: ID of the student
+        :return:           Array of the ids of the students that the student wants to work with
+        """
+        return self.friend_targets[self.friend_offsets[student_id]:self.friend_offsets[student_id + 1]]
+
+    def foes_of(self, student_id):
+        """ Returns the foes of a student
+        :param student_id: ID of the student
+        :return:           Array of the ids of the students that the student does not want to work with
+        """
+        return self.foe_targets[self.foe_offsets[student_id]:self.foe_offsets[student_id + 1]]
+
+    def friended_by(self, student_id):
+        """ Returns the students who want to work with a student
+        :param student_id: ID of the student
+        :return:           Array of the ids of the students that have the student in their friend list
+        """
+        return self.friend_in_targets[self.friend_in_offsets[student_id]:self.friend_in_offsets[student_id + 1]]
+
+    def foed_by(self, student_id):
+        """ Returns the students who do not want to work with a student
+        :param student_id: ID of the student
+        :return:           Array of the ids of the students that have the student in their foe list
+        """
+        return self.foe_in_targets[self.foe_in_offsets[student_id]:self.foe_in_offsets[student_id + 1]]
+
+    def count_relations(self, student_ids):
+        """ Counts the friend and foe edges between a group of students and every other student, in either direction
+            Meant for small groups like a team, so the counting is done on Python lists
+        :param student_ids: Iterable of student ids
+        :return:            Dictionary that maps student id to friend edge count,
+                            Dictionary that maps student id to foe edge count
+        """
+        friend_count = defaultdict(int)
+        foe_count = defaultdict(int)
+        for student_id in student_ids:
+            for other_id in self.friends_of(student_id).tolist() + self.friended_by(student_id).tolist():
+                friend_count[other_id] += 1
+            for other_id in self.foes_of(student_id).tolist() + self.foed_by(student_id).tolist():
+                foe_count[other_id] += 1
+        return friend_count, foe_count
+
+    def gather(self, offsets, targets, student_ids):
+        """ Concatenates the adjacency lists of several students
+        :param offsets:     Offsets array of the CSR representation
+        :param targets:     Targets array of the CSR representation
+        :param student_ids: Array of student ids
+        :return:            Array with the neighbours of all the given students
+        """
+        starts = offsets[student_ids]
+        lengths = offsets[student_ids + 1] - starts
+        total = lengths.sum()
+        if total == 0:
+            return numpy.zeros(0, dtype=numpy.int64)
+        # Index of every gathered element = start of its list + position inside its list
+        positions = numpy.arange(total) - numpy.repeat(numpy.cumsum(lengths) - lengths, lengths)
+        return targets[numpy.repeat(starts, lengths) + positions]
+
+
+class CostEngine:
+    """ Batched cost evaluation over the team membership of one state
+    """
+    def __init__(self, preference_graph, assn_grading, size_complaint, friend_complaint, foe_complaint):
+        """ Constructor
+        :param preference_graph: PreferenceGraph object with the preferences of all the students
+        :param assn_grading:     Time spent in grading assignment for one team
+        :param size_complaint:   Time spent by a student to complain about their team size
+        :param friend_complaint: Time spent by a student to complain about not being grouped with a friend
+        :param foe_complaint:    Time spent by a student to complain about being grouped with a foe
+        """
+        self.graph = preference_graph
+        self.assn_grading = assn_grading
+        self.size_complaint = size_complaint
+        self.friend_complaint = friend_complaint
+        self.foe_complaint = foe_complaint
+        student_count = preference_graph.student_count
+        self.team_of = numpy.full(student_count, -1, dtype=numpy.int64)
+        self.team_size = numpy.zeros(max(student_count, 1), dtype=numpy.int64)
+        # Number of members of every team per preferred team size
+        self.team_pref_count = numpy.zeros((len(self.team_size), preference_graph.max_team_size + 2),
+                                           dtype=numpy.int64)
+
+    def ensure_team_capacity(self, team_num):
+        """ Grows the team arrays so that the team number can be indexed
+        :param team_num: Team number that must fit in the team arrays
+        """
+        if team_num < len(self.team_size):
+            return
+        extra = max(team_num + 1, 2 * len(self.team_size)) - len(self.team_size)
+        self.team_size = numpy.concatenate((self.team_size, numpy.zeros(extra, dtype=numpy.int64)))
+        self.team_pref_count = numpy.vstack((self.team_pref_count,
+                                             numpy.zeros((extra, self.team_pref_count.shape[1]),
+                                                         dtype=numpy.int64)))
+
+    def assign_student_to_team(self, student_id, team_num):
+        """ Moves a student to a team in the membership arrays
+        :param student_id: ID of the student
+        :param team_num:   Team number of the team where the student is to be assigned
+        """
+        pref_team_size = self.graph.pref_team_size[student_id]
+        curr_team_num = self.team_of[student_id]
+        if curr_team_num >= 0:
+            self.team_size[curr_team_num] -= 1
+            self.team_pref_count[curr_team_num, pref_team_size] -= 1
+        self.ensure_team_capacity(team_num)
+        self.team_of[student_id] = team_num
+        self.team_size[team_num] += 1
+        self.team_pref_count[team_num, pref_team_size] += 1
+
+    def team_size_mismatches(self, team_nums, new_size):
+        """ Counts the members of teams whose preferred size differs from a new team size
+        :param team_nums: Array of team numbers
+        :param new_size:  Array of team sizes, one per team number
+        :return:          Array with the number of unhappy members for every team
+        """
+        matching_members = self.team_pref_count[team_nums, numpy.minimum(new_size, self.team_pref_count.shape[1] - 1)]
+        return self.team_size[team_nums] - matching_members
+
+    def costs_of_placing_student(self, student_id):
+        """ Calculates the cost of placing a student in every team: the complaints the student adds to the team, in the
+            cost model of StudentTable.calculate_total_cost, minus the grading time saved by joining a team
+        :param student_id: ID of the student to be placed
+        :return:           Array of costs indexed by team number
+        """
+        graph = self.graph
+        team_count = len(self.team_size)
+        friend_teams = self.team_of[numpy.concatenate((graph.friends_of(student_id), graph.friended_by(student_id)))]
+        foe_teams = self.team_of[numpy.concatenate((graph.foes_of(student_id), graph.foed_by(student_id)))]
+        friend_count = numpy.bincount(friend_teams[friend_teams >= 0], minlength=team_count)
+        foe_count = numpy.bincount(foe_teams[foe_teams >= 0], minlength=team_count)
+        new_size = self.team_size + 1
+        team_size_complaints = (new_size != graph.pref_team_size[student_id]) + \
+            self.team_size_mismatches(numpy.arange(team_count), new_size)
+        curr_assn_grading = numpy.where(self.team_size > 1, 0, self.assn_grading)
+        return team_size_complaints * self.size_complaint + foe_count * self.foe_complaint - \
+            friend_count * self.friend_complaint - curr_assn_grading
+
+    def costs_of_placing_shortlist(self, candidates, team_num, friend_count, foe_count):
+        """ Calculates the cost of placing every candidate in a team, as in costs_of_placing_student
+            The friend and foe edges of the team members are counted by the caller, so a short list of candidates
+            is scored in plain Python without any array operation
+        :param candidates:   List of the ids of the candidates
+        :param team_num:     Team number of the team where a candidate is to be placed
+        :param friend_count: Dictionary that maps student id to the number of friend edges between the student
+                             and the team members, in either direction
+        :param foe_count:    Dictionary that maps student id to the number of foe edges between the student
+                             and the team members, in either direction
+        :return:             List of costs, one per candidate
+        """
+        curr_team_size = int(self.team_size[team_num])
+        new_size = curr_team_size + 1
+        matching_members = int(self.team_pref_count[team_num, min(new_size, self.team_pref_count.shape[1] - 1)])
+        # Cost shared by every candidate: complaints of the current members and the saved grading time
+        base_cost = (curr_team_size - matching_members) * self.size_complaint - \
+            (0 if curr_team_size > 1 else self.assn_grading)
+        pref_team_size = self.graph.pref_team_size
+        return [base_cost + (self.size_complaint if pref_team_size[candidate] != new_size else 0) +
+                foe_count.get(candidate, 0) * self.foe_complaint -
+                friend_count.get(candidate, 0) * self.friend_complaint for candidate in candidates]
+
+
+class CompatibilityMatrix:
+    """ Sparse symmetric N*N compatibility matrix in CSR form
+        Entry (i, j) is the sum of the compatibility values of i towards j and of j towards i,
+        where a friend counts as 1, a foe as -1 and anybody else as 0
+    """
+    def __init__(self, preference_graph):
+        """ Constructor, builds the matrix from the friend and foe edge lists
+        :param preference_graph: PreferenceGraph object with the preferences of all the students
+        """
+        graph = preference_graph
+        self.size = graph.student_count
+        friend_sources = numpy.repeat(numpy.arange(self.size), numpy.diff(graph.friend_offsets))
+        foe_sources = numpy.repeat(numpy.arange(self.size), numpy.diff(graph.foe_offsets))
+        rows = numpy.concatenate((friend_sources, graph.friend_targets, foe_sources, graph.foe_targets))
+        columns = numpy.concatenate((graph.friend_targets, friend_sources, graph.foe_targets, foe_sources))
+        values = numpy.concatenate((numpy.ones(2 * len(friend_sources), dtype=numpy.int64),
+                                    -1 * numpy.ones(2 * len(foe_sources), dtype=numpy.int64)))
+        # Summing up the duplicate entries, i.e. the relations that exist in both directions
+        keys, inverse = numpy.unique(rows * self.size + columns, return_inverse=True)
+        values = numpy.bincount(inverse, weights=values, minlength=len(keys)).astype(numpy.int64)
+        non_zero = values != 0
+        keys, values = keys[non_zero], values[non_zero]
+        rows = keys // self.size if self.size else keys
+        self.offsets = numpy.zeros(self.size + 1, dtype=numpy.int64)
+        self.offsets[1:] = numpy.cumsum(numpy.bincount(rows, minlength=self.size))
+        self.columns = keys - rows * self.size
+        self.values = values
+
+    def __len__(self):
+        """ Returns the number of rows of the matrix
+        :return: Number of rows of the matrix
+        """
+        return self.size
+
+    def row_variance_keys(self):
+        """ Calculates N^2 times the variance of every row, as an exact integer
+            Var(row) = (N * sum(x^2) - sum(x)^2) / N^2, where the zero entries contribute nothing to the sums
+        :return: Array with the scaled variance of every row
+        """
+        rows = numpy.repeat(numpy.arange(self.size), numpy.diff(self.offsets))
+        row_sums = numpy.bincount(rows, weights=self.values, minlength=self.size).astype(numpy.int64)
+        row_square_sums = numpy.bincount(rows, weights=self.values ** 2, minlength=self.size).astype(numpy.int64)
+        return self.size * row_square_sums - row_sums ** 2
+
+    def row_standard_deviations(self):
+        """ Calculates the population standard deviation of every row, zero entries included
+        :return: Array with the standard deviation of every row
+        """
+        if not self.size:
+            return numpy.zeros(0)
+        return numpy.sqrt(self.row_variance_keys()) / self.size
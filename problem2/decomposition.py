@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+#
+# decomposition.py : Splits the students of assign.py into independent groups
+#
+# Prerequisites    : Install the package 'numpy'
+#                    Execute the command `sudo pip install numpy`
+#
+# Students in different connected components of the friend and foe graph only interact through the team size
+# and grading costs. A component larger than a batch is split into loosely coupled clusters by label propagation.
+# The components and clusters are packed into batches of a bounded number of students, and every batch is solved
+# on its own. Only the teams that can still gain from students of other batches are repaired afterwards: the
+# teams that are not full, and the teams with a friend in another batch.
+#
+
+import numpy
+
+max_batch_size = 500   # Components are packed into batches of at most this many students
+cluster_rounds = 20    # Rounds of label propagation that split a component larger than a batch into clusters
+
+
+def relation_edges(graph, include_foes=True):
+    """ Lists the friend and foe edges of the graph
+    :param graph:        PreferenceGraph object
+    :param include_foes: Whether the foe edges are listed after the friend edges
+    :return:             Array of the source student of every edge, Array of the target student of every edge
+    """
+    student_ids = numpy.arange(graph.student_count)
+    if not include_foes:
+        return numpy.repeat(student_ids, numpy.diff(graph.friend_offsets)), graph.friend_targets
+    return (numpy.concatenate((numpy.repeat(student_ids, numpy.diff(graph.friend_offsets)),
+                               numpy.repeat(student_ids, numpy.diff(graph.foe_offsets)))),
+            numpy.concatenate((graph.friend_targets, graph.foe_targets)))
+
+
+def connected_components(graph):
+    """ Labels the connected components of the friend and foe graph, edges taken in either direction
+        Roots are hooked to the smaller root of every edge and the labels are compressed by pointer jumping,
+        until no edge connects two components
+    :param graph: PreferenceGraph object
+    :return:      Array with the component label of every student, the smallest student id in the component
+    """
+    sources, targets = relation_edges(graph)
+    labels = numpy.arange(graph.student_count)
+    while True:
+        source_labels = labels[sources]
+        target_labels = labels[targets]
+        crossing = source_labels != target_labels
+        if not crossing.any():
+            return labels
+        source_labels = source_labels[crossing]
+        target_labels = target_labels[crossing]
+        lower_labels = numpy.minimum(source_labels, target_labels)
+        numpy.minimum.at(labels, source_labels, lower_labels)
+        numpy.minimum.at(labels, target_labels, lower_labels)
+        while True:
+            jumped_labels = labels[labels]
+            if numpy.array_equal(jumped_labels, labels):
+                break
+            labels = jumped_labels
+
+
+def split_components(graph, labels, batch_size=None):
+    """ Splits the components larger than a batch into loosely coupled clusters
+        Every student of a large component takes the label that is most common among themselves and their friends,
+        in either direction, ties broken at random, for a few rounds, so the labels settle on the groups of friends.
+        Foes are left out: a foe in another batch costs nothing, as the batches never share a team.
+        A cluster that is still larger than a batch is cut into batch sized runs of student ids.
+    :param graph:      PreferenceGraph object
+    :param labels:     Array with the component label of every student, see connected_components
+    :param batch_size: Maximum number of students in a cluster, max_batch_size if not given
+    :return:           Array with the cluster label of every student, the smallest student id in the cluster
+    """
+    batch_size = batch_size or max_batch_size
+    student_count = graph.student_count
+    large = numpy.bincount(labels, minlength=student_count)[labels] > batch_size
+    if not large.any():
+        return labels
+    sources, targets = relation_edges(graph, include_foes=False)
+    student_ids = numpy.flatnonzero(large)
+    # Every student votes for their own label and the labels of their friends in either direction
+    voters = numpy.concatenate((sources, targets, student_ids))
+    votes = numpy.concatenate((targets, sources, student_ids))
+    in_large = large[voters]
+    voters, votes = voters[in_large], votes[in_large]
+    rng = numpy.random.RandomState(0)
+    labels = labels.copy()
+    labels[student_ids] = student_ids
+    for round_number in range(cluster_rounds):
+        keys, counts = numpy.unique(voters * student_count + labels[votes], return_counts=True)
+        key_voters, key_labels = keys // student_count, keys % student_count
+        tie_breaks = rng.permutation(student_count)[key_labels]
+        order = numpy.lexsort((tie_breaks, -counts, key_voters))
+        first = order[numpy.concatenate(([True], key_voters[order][1:] != key_voters[order][:-1]))]
+        new_labels = labels.copy()
+        new_labels[key_voters[first]] = key_labels[first]
+        if numpy.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+    # Cut the clusters that are still too large, then label every cluster by its smallest student id
+    order = numpy.lexsort((numpy.arange(student_count), labels))
+    starts = numpy.concatenate(([0], numpy.flatnonzero(numpy.diff(labels[order])) + 1))
+    positions = numpy.arange(student_count) - numpy.repeat(starts, numpy.diff(numpy.append(starts, student_count)))
+    new_cluster = numpy.zeros(student_count, dtype=bool)
+    new_cluster[starts] = True
+    new_cluster[positions % batch_size == 0] = True
+    cluster_numbers = numpy.cumsum(new_cluster) - 1
+    smallest_ids = numpy.full(cluster_numbers[-1] + 1, student_count, dtype=numpy.int64)
+    numpy.minimum.at(smallest_ids, cluster_numbers, order)
+    cluster_labels = numpy.empty(student_count, dtype=numpy.int64)
+    cluster_labels[order] = smallest_ids[cluster_numbers]
+    return cluster_labels
+
+
+def pack_components(labels, batch_size=None):
+    """ Packs the components into batches, in order of their smallest student id
+    :param labels:     Array with the component or cluster label of every student
+    :param batch_size: Maximum number of students in a batch, unless a single component is larger,
+                       max_batch_size if not given
+    :return:           List of batches, every batch a sorted list of student ids
+    """
+    batch_size = batch_size or max_batch_size
+    order = numpy.argsort(labels, kind='mergesort')
+    boundaries = numpy.flatnonzero(numpy.diff(labels[order])) + 1
+    batches = list()
+    batch = list()
+    for component in numpy.split(order, boundaries):
+        if batch and len(batch) + len(component) > batch_size:
+            batches.append(sorted(batch))
+            batch = list()
+        batch.extend(component.tolist())
+    if batch:
+        batches.append(sorted(batch))
+    return batches
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+#
+# exact.py : Exact branch and bound mode of assign.py for small inputs
+#
+# The students are placed one at a time, either in a team that already has a member and spare capacity, or
+# in a new team. New teams are numbered in the order they are opened, so every partition of the students is
+# enumerated once, whatever the labels of its teams (symmetry breaking).
+#
+# Every node of the search is bounded by the sum of the complaints that can no longer be avoided:
+#   grading     -> The teams opened so far, plus the teams needed for the students that do not fit in them
+#   team size   -> A student whose team already has more members than they prefer
+#   friends     -> Friend requests that can not be honoured any more, because the friend is placed in another
+#                  team, or because the team has no room left for them. A student can have at most
+#                  max_team_size - 1 friends in their team, while min(friends, max_team_size) are counted.
+#   foes        -> Foes already placed in the team of the student
+# A subtree is pruned if its bound is not lower than the best cost found so far. The search stops once the best
+# cost meets the bound of the root, or the lower bound of the solver (see bounds.py) if that one is higher.
+#
+
+import sys
+
+
+class BranchAndBound:
+    """ Branch and bound search over the partitions of the students into teams
+    """
+    def __init__(self, solver, budget=None):
+        """ Constructor
+        :param solver: Solver object of the problem
+        :param budget: SearchBudget object limiting the number of nodes and the time, None for no limit
+        """
+        self.solver = solver
+        self.budget = budget
+        students = solver.students
+        self.student_count = len(students)
+        self.max_team_size = solver.max_team_size
+        self.pref_team_size = students.pref_team_size.tolist()
+        self.friend_sets = [set(students.friends_of(student_id).tolist()) for student_id in range(self.student_count)]
+        self.foe_sets = [set(students.foes_of(student_id).tolist()) for student_id in range(self.student_count)]
+        self.wanted_friend_counts = solver.preference_graph.wanted_friend_count.tolist()
+        self.friended_by = [list() for student_id in range(self.student_count)]
+        for student_id, friend_set in enumerate(self.friend_sets):
+            for friend_id in friend_set:
+                self.friended_by[friend_id].append(student_id)
+        self.order = self.make_order()
+        self.team_of = [-1] * self.student_count
+        self.teams = list()                       # Members of every opened team, indexed by team number
+        self.spare_capacity = 0                   # Free places in the opened teams
+        self.student_bounds = [self.student_bound(student_id) for student_id in range(self.student_count)]
+        self.student_bound_sum = sum(self.student_bounds)
+        self.nodes = 0
+        self.root_bound = self.lower_bound(0)
+        if solver.lower_bound is not None:
+            self.root_bound = max(self.root_bound, solver.lower_bound)
+        self.best_cost = sys.maxint
+        self.best_student_to_team_map = None
+
+    def make_order(self):
+        """ Orders the students for branching, the students with the most relations first, so that the
+            complaints that can not be avoided show up early in the search
+        :return: List of student ids
+        """
+        degrees = [0] * self.student_count
+        for student_id in range(self.student_count):
+            degrees[student_id] += len(self.friend_sets[student_id]) + len(self.foe_sets[student_id])
+            for other_id in self.friend_sets[student_id] | self.foe_sets[student_id]:
+                degrees[other_id] += 1
+        return sorted(range(self.student_count), key=lambda student_id: (-degrees[student_id], student_id))
+
+    def student_bound(self, student_id):
+        """ Calculates the complaints of a student that can not be avoided any more
+        :param student_id: ID of the student
+        :return:           Lower bound of the individual cost of the student
+        """
+        solver = self.solver
+        team_of = self.team_of
+        friend_set = self.friend_sets[student_id]
+        team_num = team_of[student_id]
+        if team_num < 0:
+            # Friends that are placed in a full team can not be joined any more
+            available = 0
+            for friend_id in friend_set:
+                if team_of[friend_id] < 0 or len(self.teams[team_of[friend_id]]) < self.max_team_size:
+                    available += 1
+            missing = self.wanted_friend_counts[student_id] - min(self.max_team_size - 1, available)
+            return max(0, missing) * solver.friend_complaint
+        team = self.teams[team_num]
+        friends_in_team = 0
+        foes_in_team = 0
+        for member_id in team:
+            if member_id in friend_set:
+                friends_in_team += 1
+            elif member_id in self.foe_sets[student_id]:
+                foes_in_team += 1
+        unplaced_friends = 0
+        for friend_id in friend_set:
+            if team_of[friend_id] < 0:
+                unplaced_friends += 1
+        missing = self.wanted_friend_counts[student_id] - friends_in_team - \
+                  min(unplaced_friends, self.max_team_size - len(team))
+        bound = max(0, missing) * solver.friend_complaint + foes_in_team * solver.foe_complaint
+        if len(team) > self.pref_team_size[student_id]:
+            bound += solver.size_complaint
+        return bound
+
+    def lower_bound(self, depth):
+        """ Calculates the lower bound of the total cost of every completion of the current node
+        :param depth: Number of students placed so far
+        :return:      Lower bound of the total cost
+        """
+        unplaced = self.student_count - depth
+        extra_teams = -(-max(0, unplaced - self.spare_capacity) // self.max_team_size)
+        return self.solver.assn_grading * (len(self.teams) + extra_teams) + self.student_bound_sum
+
+    def place(self, student_id, team_num):
+        """ Places a student in a team and updates the bounds of the students affected by it
+        :param student_id: ID of the student
+        :param team_num:   Team number, the number of opened teams to open a new team
+        :return:           List of tuples (student id, previous bound) to undo the placement
+        """
+        if team_num == len(self.teams):
+            self.teams.append(set())
+            self.spare_capacity += self.max_team_size
+        team = self.teams[team_num]
+        team.add(student_id)
+        self.team_of[student_id] = team_num
+        self.spare_capacity -= 1
+        affected = set(team)
+        affected.update(self.friended_by[student_id])
+        if len(team) == self.max_team_size:
+            for member_id in team:
+                affected.update(self.friended_by[member_id])
+        undo_list = list()
+        for affected_id in affected:
+            bound = self.student_bound(affected_id)
+            if bound != self.student_bounds[affected_id]:
+                undo_list.append((affected_id, self.student_bounds[affected_id]))
+                self.student_bound_sum += bound - self.student_bounds[affected_id]
+                self.student_bounds[affected_id] = bound
+        return undo_list
+
+    def unplace(self, student_id, undo_list):
+        """ Takes back the placement of a student
+        :param student_id: ID of the student
+        :param undo_list:  List returned by place
+        """
+        team_num = self.team_of[student_id]
+        team = self.teams[team_num]
+        team.remove(student_id)
+        self.team_of[student_id] = -1
+        self.spare_capacity += 1
+        if not team and team_num == len(self.teams) - 1:
+            self.teams.pop()
+            self.spare_capacity -= self.max_team_size
+        for affected_id, bound in undo_list:
+            self.student_bound_sum += bound - self.student_bounds[affected_id]
+            self.student_bounds[affected_id] = bound
+
+    def leaf_cost(self):
+        """ Calculates the exact total cost of a complete placement
+        :return: Total cost
+        """
+        solver = self.solver
+        total_cost = solver.assn_grading * len(self.teams)
+        for team in self.teams:
+            for student_id in team:
+                total_cost += solver.students.calculate_total_cost(student_id, team, solver)
+        return total_cost
+
+    def stopped(self):
+        """ Checks whether the search has to stop, because the best cost meets the root bound or the budget is
+            used up
+        :return: True if the search has to stop
+        """
+        if self.best_cost <= self.root_bound:
+            return True
+        return self.budget is not None and self.budget.exhausted()
+
+    def branch(self, depth):
+        """ Searches all the completions of the current node
+        :param depth: Number of students placed so far
+        :return:      Lowest bound of the nodes left unexplored when the search stops, sys.maxint if none
+        """
+        if depth == self.student_count:
+            cost = self.leaf_cost()
+            if cost < self.best_cost:
+                self.best_cost = cost
+                self.best_student_to_team_map = dict(enumerate(self.team_of))
+            return sys.maxint
+        student_id = self.order[depth]
+        children = list()
+        for team_num in range(len(self.teams) + 1):
+            if team_num < len(self.teams) and len(self.teams[team_num]) >= self.max_team_size:
+                continue
+            undo_list = self.place(student_id, team_num)
+            bound = self.lower_bound(depth + 1)
+            self.unplace(student_id, undo_list)
+            if bound < self.best_cost:
+                children.append((bound, team_num))
+        children.sort()
+        for i, (bound, team_num) in enumerate(children):
+            if bound >= self.best_cost:
+                break
+            if self.stopped():
+                return bound
+            self.nodes += 1
+            if self.budget is not None:
+                self.budget.count_evaluation()
+            undo_list = self.place(student_id, team_num)
+            unexplored_bound = self.branch(depth + 1)
+            self.unplace(student_id, undo_list)
+            if unexplored_bound != sys.maxint:
+                return min([unexplored_bound] + [child[0] for child in children[i + 1:i + 2]])
+        return sys.maxint
+
+    def search(self, best_cost=sys.maxint, student_to_team_map=None):
+        """ Runs the branch and bound search
+        :param best_cost:           Cost of a known solution, used as the first upper bound
+        :param student_to_team_map: Dictionary mapping student id to team id of the known solution
+        :return:                    Tuple (best cost, lower bound of the optimal cost, dictionary mapping student
+                                    id to team id of the best solution)
+        """
+        self.best_cost = best_cost
+        self.best_student_to_team_map = student_to_team_map
+        unexplored_bound = self.branch(0)
+        lower_bound = max(self.root_bound, min(self.best_cost, unexplored_bound))
+        return self.best_cost, lower_bound, self.best_student_to_team_map
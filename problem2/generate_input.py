@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+#
+# generate_input.py : Generates synthetic student preferences in the input format of assign.py
+#
+# Usage             : python generate_input.py [students] [output file]
+#                      Options: --friends F, --foes E -> Longest friend and foe lists, the lengths are uniform
+#                               --clustering C        -> Fraction of the friends and foes drawn from the own cluster
+#                               --cluster-size S      -> Number of students in a cluster
+#                               --team-sizes 1:0.2,2:0.3,3:0.5 -> Mix of the preferred team sizes
+#                               --seed S              -> Seed of the random numbers
+#
+# Every line is 'name preferred_team_size friends foes', with comma separated names and '_' for an empty list.
+# Students are named user0 to userN-1 and split into consecutive clusters, like sections of a course, so that
+# the preferences can be made as local or as global as needed.
+#
+
+import argparse
+import random
+import sys
+
+
+def parse_team_sizes(text):
+    """ Parses a mix of preferred team sizes
+    :param text: Comma separated 'size:weight' pairs, for example '1:0.2,2:0.3,3:0.5'
+    :return:     List of team sizes, List of cumulative weights
+    """
+    team_sizes = list()
+    cumulative_weights = list()
+    total_weight = 0.0
+    for pair in text.split(','):
+        team_size, weight = pair.split(':')
+        total_weight += float(weight)
+        team_sizes.append(int(team_size))
+        cumulative_weights.append(total_weight)
+    return team_sizes, [weight / total_weight for weight in cumulative_weights]
+
+
+def pick_students(rng, student_id, student_count, count, clustering, cluster_size, excluded):
+    """ Picks distinct other students, each from the own cluster with probability clustering
+    :param rng:           random.Random object
+    :param student_id:    ID of the student whose preferences are generated
+    :param student_count: Number of students
+    :param count:         Number of students to be picked
+    :param clustering:    Probability of picking from the own cluster
+    :param cluster_size:  Number of students in a cluster
+    :param excluded:      Set of student ids that must not be picked, extended with the picked ids
+    :return:              List of the picked student ids
+    """
+    cluster_start = student_id - student_id % cluster_size
+    cluster_end = min(cluster_start + cluster_size, student_count)
+    cluster_room = cluster_end - cluster_start - sum(1 for other_id in excluded
+                                                     if cluster_start <= other_id < cluster_end)
+    count = min(count, student_count - len(excluded))
+    picked = list()
+    while len(picked) < count:
+        if cluster_room > 0 and rng.random() < clustering:
+            other_id = rng.randrange(cluster_start, cluster_end)
+        else:
+            other_id = rng.randrange(student_count)
+        if other_id not in excluded:
+            excluded.add(other_id)
+            picked.append(other_id)
+            if cluster_start <= other_id < cluster_end:
+                cluster_room -= 1
+    return picked
+
+
+def generate(fh, student_count, max_friends=3, max_foes=3, clustering=0.8, cluster_size=30,
+             team_sizes='1:0.2,2:0.3,3:0.5', seed=0):
+    """ Writes synthetic preferences, one student per line
+    :param fh:            File object where the preferences are written
+    :param student_count: Number of students
+    :param max_friends:   Longest friend list
+    :param max_foes:      Longest foe list
+    :param clustering:    Fraction of the friends and foes drawn from the own cluster
+    :param cluster_size:  Number of students in a cluster
+    :param team_sizes:    Mix of the preferred team sizes, comma separated 'size:weight' pairs
+    :param seed:          Seed of the random numbers
+    """
+    rng = random.Random(seed)
+    sizes, cumulative_weights = parse_team_sizes(team_sizes)
+    for student_id in range(student_count):
+        draw = rng.random()
+        pref_team_size = next((size for size, weight in zip(sizes, cumulative_weights) if draw < weight), sizes[-1])
+        excluded = {student_id}
+        friends = pick_students(rng, student_id, student_count, rng.randint(0, max_friends), clustering,
+                                cluster_size, excluded)
+        foes = pick_students(rng, student_id, student_count, rng.randint(0, max_foes), clustering, cluster_size,
+                             excluded)
+        fh.write('user%d %d %s %s\n' % (student_id, pref_team_size,
+                                        ','.join('user%d' % friend_id for friend_id in friends) or '_',
+                                        ','.join('user%d' % foe_id for foe_id in foes) or '_'))
+
+
+def parse_arguments():
+    """ Parses the command line arguments
+    :return: Namespace with the parsed arguments
+    """
+    parser = argparse.ArgumentParser(description='Generates synthetic student preferences for assign.py')
+    parser.add_argument('students', type=int, help='Number of students')
+    parser.add_argument('output', nargs='?', default='-', help="Output file, '-' for stdout (default: -)")
+    parser.add_argument('--friends', type=int, default=3, help='Longest friend list (default: 3)')
+    parser.add_argument('--foes', type=int, default=3, help='Longest foe list (default: 3)')
+    parser.add_argument('--clustering', type=float, default=0.8,
+                        help='Fraction of the friends and foes drawn from the own cluster (default: 0.8)')
+    parser.add_argument('--cluster-size', type=int, default=30,
+                        help='Number of students in a cluster (default: 30)')
+    parser.add_argument('--team-sizes', default='1:0.2,2:0.3,3:0.5',
+                        help="Mix of the preferred team sizes as 'size:weight' pairs (default: 1:0.2,2:0.3,3:0.5)")
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random numbers (default: 0)')
+    return parser.parse_args()
+
+
+def main():
+    """ Main function
+    """
+    arguments = parse_arguments()
+    fh = sys.stdout if arguments.output == '-' else open(arguments.output, 'w')
+    try:
+        generate(fh, arguments.students, arguments.friends, arguments.foes, arguments.clustering,
+                 arguments.cluster_size, arguments.team_sizes, arguments.seed)
+    finally:
+        if fh is not sys.stdout:
+            fh.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+#
+# indexed_heap.py : Indexed binary min heap with one live entry per item
+#
+# The position of every item in the heap array is kept in a dictionary, so the key of an item can be changed,
+# or the item removed, in O(log N) without leaving outdated entries behind.
+#
+
+import heapq
+
+
+class IndexedHeap:
+    """ Binary min heap of items with changeable keys
+    """
+    def __init__(self):
+        """ Constructor
+        """
+        self.keys = list()        # Heap array of the keys
+        self.items = list()       # Item of every key in the heap array
+        self.position = dict()    # Item -> index in the heap array
+
+    def __len__(self):
+        """ Returns the number of items
+        :return: Number of items in the heap
+        """
+        return len(self.items)
+
+    def __contains__(self, item):
+        """ Checks whether an item is in the heap
+        :param item: Item
+        :return:     True if the item is in the heap
+        """
+        return item in self.position
+
+    def set(self, item, key):
+        """ Inserts an item, or changes its key if it is already in the heap
+        :param item: Item
+        :param key:  Key of the item, the item with the smallest key is on top
+        """
+        index = self.position.get(item)
+        if index is None:
+            index = len(self.items)
+            self.keys.append(key)
+            self.items.append(item)
+            self.position[item] = index
+            self.sift_up(index)
+            return
+        old_key = self.keys[index]
+        self.keys[index] = key
+        if key < old_key:
+            self.sift_up(index)
+        else:
+            self.sift_down(index)
+
+    def discard(self, item):
+        """ Removes an item if it is in the heap
+        :param item: Item
+        """
+        index = self.position.pop(item, None)
+        if index is None:
+            return
+        last_key = self.keys.pop()
+        last_item = self.items.pop()
+        if index == len(self.items):
+            return
+        old_key = self.keys[index]
+        self.keys[index] = last_key
+        self.items[index] = last_item
+        self.position[last_item] = index
+        if last_key < old_key:
+            self.sift_up(index)
+        else:
+            self.sift_down(index)
+
+    def peek(self, excluded=()):
+        """ Finds the item with the smallest key that is not excluded, without removing it
+            Only the subtrees below excluded items are explored, best first
+        :param excluded: Collection of items that must not be returned
+        :return:         Item, None if there is no such item
+        """
+        if not self.items:
+            return None
+        keys = self.keys
+        candidates = [(keys[0], 0)]
+        while candidates:
+            key, index = heapq.heappop(candidates)
+            item = self.items[index]
+            if item not in excluded:
+                return item
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(keys):
+                    heapq.heappush(candidates, (keys[child], child))
+        return None
+
+    def sift_up(self, index):
+        """ Moves an entry up until its parent has a smaller key
+        :param index: Index of the entry in the heap array
+        """
+        keys, items, position = self.keys, self.items, self.position
+        key, item = keys[index], items[index]
+        while index > 0:
+            parent = (index - 1) >> 1
+            if not key < keys[parent]:
+                break
+            keys[index], items[index] = keys[parent], items[parent]
+            position[items[index]] = index
+            index = parent
+        keys[index], items[index] = key, item
+        position[item] = index
+
+    def sift_down(self, index):
+        """ Moves an entry down until its children have larger keys
+        :param index: Index of the entry in the heap array
+        """
+        keys, items, position = self.keys, self.items, self.position
+        key, item = keys[index], items[index]
+        size = len(keys)
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and keys[child + 1] < keys[child]:
+                child += 1
+            if not keys[child] < key:
+                break
+            keys[index], items[index] = keys[child], items[child]
+            position[items[index]] = index
+            index = child
+        keys[index], items[index] = key, item
+        position[item] = index
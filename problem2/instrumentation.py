@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+#
+# instrumentation.py : Optional instrumentation of the search of assign.py
+#
+# Records the wall time of every phase, counters of the hot functions and of the moves, and the best cost
+# over time, and writes them as a JSON or CSV trace. Function calls are counted by wrapping the functions
+# only while the instrumentation is active, so a run without instrumentation executes the original code.
+#
+
+import csv
+import json
+import time
+from collections import OrderedDict
+
+
+class NullPhase:
+    """ Phase timer that does nothing, used when the instrumentation is disabled
+    """
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+null_phase = NullPhase()
+
+
+class PhaseTimer:
+    """ Adds the wall time of a block to a phase
+    """
+    def __init__(self, instrumentation, name):
+        """ Constructor
+        :param instrumentation: Instrumentation object
+        :param name:            Name of the phase
+        """
+        self.instrumentation = instrumentation
+        self.name = name
+        self.start_time = None
+
+    def __enter__(self):
+        self.start_time = time.time()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        phase_seconds = self.instrumentation.phase_seconds
+        phase_seconds[self.name] = phase_seconds.get(self.name, 0.0) + time.time() - self.start_time
+        return False
+
+
+class Instrumentation:
+    """ Phase timers, counters and best cost trace of a run
+    """
+    def __init__(self):
+        """ Constructor
+        """
+        self.start_time = time.time()
+        self.phase_seconds = OrderedDict()
+        self.counters = OrderedDict()
+        self.best_cost_trace = list()   # Tuples (seconds since start, iteration, best cost)
+        self.wrapped_functions = list()
+
+    def phase(self, name):
+        """ Times a phase, to be used in a with statement
+        :param name: Name of the phase
+        :return:     Context manager
+        """
+        return PhaseTimer(self, name)
+
+    def count(self, name, amount=1):
+        """ Increments a counter
+        :param name:   Name of the counter
+        :param amount: Amount to be added
+        """
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def count_calls(self, owner, function_name):
+        """ Counts the calls of a function of a class, until restore is called
+        :param owner:         Class that defines the function
+        :param function_name: Name of the function
+        """
+        function = owner.__dict__[function_name]
+        counters = self.counters
+        counter_name = '%s.%s calls' % (owner.__name__, function_name)
+        counters.setdefault(counter_name, 0)
+
+        def counting_function(*args, **kwargs):
+            counters[counter_name] += 1
+            return function(*args, **kwargs)
+
+        setattr(owner, function_name, counting_function)
+        self.wrapped_functions.append((owner, function_name, function))
+
+    def restore(self):
+        """ Puts the original functions back
+        """
+        for owner, function_name, function in reversed(self.wrapped_functions):
+            setattr(owner, function_name, function)
+        self.wrapped_functions = list()
+
+    def record_best_cost(self, iteration, best_cost):
+        """ Records an improvement of the best cost
+        :param iteration: Iteration of the search
+        :param best_cost: New best cost
+        """
+        self.best_cost_trace.append((time.time() - self.start_time, iteration, best_cost))
+
+    def as_dict(self):
+        """ Builds the trace
+        :return: Dictionary with the phase times, the counters and the best cost trace
+        """
+        return OrderedDict([
+            ('phase_seconds', self.phase_seconds),
+            ('counters', self.counters),
+            ('best_cost_trace', [OrderedDict([('seconds', seconds), ('iteration', iteration), ('best_cost', cost)])
+                                 for seconds, iteration, cost in self.best_cost_trace]),
+        ])
+
+    def write(self, path):
+        """ Writes the trace, as CSV if the path ends with '.csv' and as JSON otherwise
+            The CSV trace has one row per phase, counter and best cost improvement
+        :param path: Path of the trace file
+        """
+        with open(path, 'wb' if path.endswith('.csv') else 'w') as fh:
+            if not path.endswith('.csv'):
+                json.dump(self.as_dict(), fh, indent=2)
+                fh.write('\n')
+                return
+            writer = csv.writer(fh)
+            writer.writerow(['kind', 'name', 'seconds', 'iteration', 'value'])
+            for name, seconds in self.phase_seconds.iteritems():
+                writer.writerow(['phase', name, seconds, '', ''])
+            for name, value in self.counters.iteritems():
+                writer.writerow(['counter', name, '', '', value])
+            for seconds, iteration, cost in self.best_cost_trace:
+                writer.writerow(['best_cost', '', seconds, iteration, cost])
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+#
+# metaheuristics.py : Pluggable search strategies of assign.py
+#
+# Every strategy decides which move the local search tries next and whether the move is taken. The moves
+# are generated by the Solver and scored by State.cost_delta, so all the strategies share the same move
+# and cost evaluator:
+#   tabu            -> Pacify the unhappiest student that did not move recently (fixed tenure)
+#   adaptive-tabu   -> Same, but the tenure grows while the search cycles and shrinks while it improves
+#   annealing       -> Random moves, a worse move is taken with probability exp(-delta / temperature)
+#   late-acceptance -> Random moves, a move is taken if it is not worse than the cost some iterations ago
+#
+# Reference: Burke, E. K., & Bykov, Y. (2017). The late acceptance hill-climbing heuristic.
+#            European Journal of Operational Research, 258(1), 70-78.
+#
+
+import math
+
+tabu_tenure = 5               # Number of iterations a moved student stays tabu
+max_tabu_tenure = 50          # Upper limit of the adaptive tabu tenure
+cooling_rate = 0.999          # Temperature of the simulated annealing is multiplied by this every iteration
+calibration_moves = 100       # Random moves sampled to calibrate the initial temperature
+late_acceptance_length = 100  # Number of iterations the late acceptance hill climbing looks back
+
+
+class TabuList:
+    """ Students that are not allowed to move, stored as the iteration number at which they are allowed again
+        Nothing has to be aged per iteration, a membership test compares the expiry with the current iteration
+    """
+    def __init__(self):
+        """ Constructor
+        """
+        self.expiry_map = dict()   # Student id -> first iteration at which the student may move again
+        self.iteration = 0
+        self.block_count = 0       # Number of times a student was found to be tabu
+
+    def __contains__(self, student_id):
+        """ Checks whether a student is tabu in the current iteration
+        :param student_id: ID of the student
+        :return:           True if the student is tabu
+        """
+        if self.expiry_map.get(student_id, 0) > self.iteration:
+            self.block_count += 1
+            return True
+        return False
+
+    def add(self, student_id, tenure):
+        """ Makes a student tabu for the next iterations
+        :param student_id: ID of the student
+        :param tenure:     Number of iterations, including the current one, the student stays tabu
+        """
+        self.expiry_map[student_id] = self.iteration + tenure
+
+
+class Metaheuristic:
+    """ Interface of the search strategies
+    """
+    patience_factor = 1   # The search stops after patience_factor * threshold_iterations iterations without improvement
+
+    def __init__(self, solver, rng):
+        """ Constructor
+        :param solver: Solver object that generates the moves
+        :param rng:    random.Random object of the search
+        """
+        self.solver = solver
+        self.rng = rng
+
+    def start(self, state):
+        """ Prepares the strategy for a search, or for a restart of the search from another state
+        :param state: State object the search starts from
+        """
+        pass
+
+    def next_moves(self, state, iteration):
+        """ Proposes the next move
+        :param state:     State object that contains the current configuration of the teams
+        :param iteration: Number of the current iteration
+        :return:          List of tuples (student id, team number), empty if there is no move
+        """
+        raise NotImplementedError
+
+    def accept(self, state, moves, iteration):
+        """ Decides whether a proposed move is taken
+        :param state:     State object that contains the current configuration of the teams
+        :param moves:     List of tuples (student id, team number) of the move
+        :param iteration: Number of the current iteration
+        :return:          True if the move is to be taken
+        """
+        return True
+
+    def moved(self, state, moves, iteration):
+        """ Called after a proposed move has been considered
+        :param state:     State object after the move
+        :param moves:     List of tuples (student id, team number) of the move, empty if the move was rejected
+        :param iteration: Number of the current iteration
+        """
+        pass
+
+
+class TabuSearch(Metaheuristic):
+    """ Moves the unhappiest student that is not tabu to their best team, and makes the moved students tabu
+    """
+    def __init__(self, solver, rng):
+        """ Constructor
+        :param solver: Solver object that generates the moves
+        :param rng:    random.Random object of the search
+        """
+        Metaheuristic.__init__(self, solver, rng)
+        self.tabu_list = TabuList()
+        self.tenure = tabu_tenure
+
+    def next_moves(self, state, iteration):
+        """ Proposes to pacify the unhappiest student that is not tabu
+        :param state:     State object that contains the current configuration of the teams
+        :param iteration: Number of the current iteration
+        :return:          List of tuples (student id, team number), empty if every unhappy student is tabu
+        """
+        self.tabu_list.iteration = iteration
+        student_id = state.get_unhappiest_student(self.tabu_list)
+        if student_id is None:
+            return []
+        return self.solver.find_best_moves_for_student(student_id, state)
+
+    def moved(self, state, moves, iteration):
+        """ Makes the moved students tabu
+        :param state:     State object after the move
+        :param moves:     List of tuples (student id, team number) of the move
+        :param iteration: Number of the current iteration
+        """
+        for student_id, team_num in moves:
+            self.tabu_list.add(student_id, self.tenure)
+
+
+class AdaptiveTabuSearch(TabuSearch):
+    """ Tabu search whose tenure grows when the search returns to a recently seen cost, a sign of cycling,
+        and shrinks when the search reaches a new best cost
+    """
+    def start(self, state):
+        """ Prepares the strategy for a search
+        :param state: State object the search starts from
+        """
+        self.best_cost = state.total_cost
+        self.last_seen_map = dict()   # Total cost -> last iteration at which the search had that cost
+
+    def moved(self, state, moves, iteration):
+        """ Makes the moved students tabu and adapts the tenure
+        :param state:     State object after the move
+        :param moves:     List of tuples (student id, team number) of the move
+        :param iteration: Number of the current iteration
+        """
+        cost = state.total_cost
+        if cost < self.best_cost:
+            self.best_cost = cost
+            self.tenure = max(tabu_tenure, self.tenure - 1)
+        elif iteration - self.last_seen_map.get(cost, -max_tabu_tenure - 1) <= 2 * self.tenure:
+            self.tenure = min(max_tabu_tenure, self.tenure + 1)
+        self.last_seen_map[cost] = iteration
+        TabuSearch.moved(self, state, moves, iteration)
+
+
+class RandomMoveSearch(Metaheuristic):
+    """ Base class of the strategies that try random moves and decide on their exact change in total cost
+    """
+    patience_factor = 10
+
+    def next_moves(self, state, iteration):
+        """ Proposes a random move
+        :param state:     State object that contains the current configuration of the teams
+        :param iteration: Number of the current iteration
+        :return:          List of tuples (student id, team number)
+        """
+        moves = self.solver.random_moves(state, self.rng)
+        self.delta = state.cost_delta(moves)
+        return moves
+
+
+class SimulatedAnnealing(RandomMoveSearch):
+    """ Takes every improving random move, and a worse move with probability exp(-delta / temperature)
+        The temperature cools down geometrically and is calibrated on the start state
+    """
+    def start(self, state):
+        """ Calibrates the initial temperature so that an average worse move is taken half of the time
+        :param state: State object the search starts from
+        """
+        deltas = [state.cost_delta(self.solver.random_moves(state, self.rng)) for i in range(calibration_moves)]
+        worse_deltas = [delta for delta in deltas if delta > 0]
+        average_delta = float(sum(worse_deltas)) / len(worse_deltas) if worse_deltas else 1.0
+        self.temperature = average_delta / math.log(2)
+
+    def accept(self, state, moves, iteration):
+        """ Applies the Metropolis criterion
+        :param state:     State object that contains the current configuration of the teams
+        :param moves:     List of tuples (student id, team number) of the move
+        :param iteration: Number of the current iteration
+        :return:          True if the move is to be taken
+        """
+        self.temperature *= cooling_rate
+        if self.delta <= 0:
+            return True
+        return self.temperature > 0 and self.rng.random() < math.exp(-self.delta / self.temperature)
+
+
+class LateAcceptance(RandomMoveSearch):
+    """ Late acceptance hill climbing: takes a random move if the new cost is not worse than the current cost,
+        or than the cost the search had late_acceptance_length iterations ago
+    """
+    def start(self, state):
+        """ Fills the history with the cost of the start state
+        :param state: State object the search starts from
+        """
+        self.history = [state.total_cost] * late_acceptance_length
+
+    def accept(self, state, moves, iteration):
+        """ Compares the new cost with the current cost and with the cost in the history
+        :param state:     State object that contains the current configuration of the teams
+        :param moves:     List of tuples (student id, team number) of the move
+        :param iteration: Number of the current iteration
+        :return:          True if the move is to be taken
+        """
+        new_cost = state.total_cost + self.delta
+        return new_cost <= state.total_cost or new_cost <= self.history[iteration % len(self.history)]
+
+    def moved(self, state, moves, iteration):
+        """ Records the current cost in the history
+        :param state:     State object after the move
+        :param moves:     List of tuples (student id, team number) of the move
+        :param iteration: Number of the current iteration
+        """
+        self.history[iteration % len(self.history)] = state.total_cost
+
+
+metaheuristic_map = {
+    'tabu': TabuSearch,
+    'adaptive-tabu': AdaptiveTabuSearch,
+    'annealing': SimulatedAnnealing,
+    'late-acceptance': LateAcceptance,
+}
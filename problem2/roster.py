@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+#
+# roster.py : Streaming parser and binary cache of the student preferences of assign.py
+#
+# Prerequisites : Install the package 'numpy'
+#                 Execute the command `sudo pip install numpy`
+#
+# The input file is read line by line. Student names are interned to integer ids as soon as they are seen,
+# so the friend and foe lists are stored as integer edge arrays in compressed sparse row (CSR) form right
+# away, and no second pass over name strings is needed. A student is given the id of the line that
+# defines them, so the ids are 0 to N - 1 in file order. Every row is sorted and free of repeats, the form
+# the StudentTable of assign.py uses as it is.
+#
+# The arrays can be saved in a cache directory next to the input, one raw .npy file per array. Re-runs on
+# an unchanged input memory-map the arrays instead of parsing the text, and the StudentTable keeps them as
+# memory-mapped views.
+#
+
+import array
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy
+
+cache_version = 2   # Bumped whenever the layout of the cached arrays changes
+cached_arrays = ('names', 'pref_team_size', 'friend_request_count', 'friend_offsets', 'friend_targets',
+                 'foe_offsets', 'foe_targets')
+
+
+class InternTable(dict):
+    """ Dictionary that gives every new name the next integer id on first lookup
+    """
+    def __missing__(self, name):
+        """ Interns a new name
+        :param name: Name that is looked up for the first time
+        :return:     ID of the name
+        """
+        interned_id = self[name] = len(self)
+        return interned_id
+
+
+class Roster:
+    """ Integer array representation of an input file
+    """
+    def __init__(self, names, pref_team_size, friend_request_count, friend_offsets, friend_targets, foe_offsets,
+                 foe_targets):
+        """ Constructor
+        :param names:                Array of the student names, indexed by student id
+        :param pref_team_size:       Array of the preferred team sizes as written in the file
+        :param friend_request_count: Array of the lengths of the friend lists as written, repeated names included
+        :param friend_offsets:       Offsets array of the friend lists, every row sorted and without repeats
+        :param friend_targets:       Targets array of the friend lists
+        :param foe_offsets:          Offsets array of the foe lists, every row sorted and without repeats
+        :param foe_targets:          Targets array of the foe lists
+        """
+        self.names = names
+        self.pref_team_size = pref_team_size
+        self.friend_request_count = friend_request_count
+        self.friend_offsets = friend_offsets
+        self.friend_targets = friend_targets
+        self.foe_offsets = foe_offsets
+        self.foe_targets = foe_targets
+
+    def __len__(self):
+        """ Returns the number of students
+        :return: Number of students
+        """
+        return len(self.names)
+
+    def friends_of(self, student_id):
+        """ Returns the friend list of a student
+        :param student_id: ID of the student
+        :return:           Sorted array of student ids
+        """
+        return self.friend_targets[self.friend_offsets[student_id]:self.friend_offsets[student_id + 1]]
+
+    def foes_of(self, student_id):
+        """ Returns the foe list of a student
+        :param student_id: ID of the student
+        :return:           Sorted array of student ids
+        """
+        return self.foe_targets[self.foe_offsets[student_id]:self.foe_offsets[student_id + 1]]
+
+
+def remap_edges(offsets, targets, id_map):
+    """ Replaces the interned ids of the edges by student ids and drops the edges to unknown students
+    :param offsets: Offsets array of the edges
+    :param targets: Targets array of the edges, with interned ids
+    :param id_map:  Array mapping interned id to student id, -1 for unknown students
+    :return:        Offsets array, Targets array
+    """
+    row_count = len(offsets) - 1
+    sources = numpy.repeat(numpy.arange(row_count), numpy.diff(offsets))
+    targets = id_map[targets]
+    kept = targets >= 0
+    kept_counts = numpy.bincount(sources[kept], minlength=row_count)
+    new_offsets = numpy.zeros(len(offsets), dtype=numpy.int64)
+    new_offsets[1:] = numpy.cumsum(kept_counts)
+    return new_offsets, targets[kept]
+
+
+def sorted_unique_rows(offsets, targets):
+    """ Sorts every row of a CSR representation and drops the repeated targets of a row
+    :param offsets: Offsets array of the CSR representation
+    :param targets: Targets array of the CSR representation
+    :return:        Offsets array, Targets array
+    """
+    row_count = len(offsets) - 1
+    rows = numpy.repeat(numpy.arange(row_count), numpy.diff(offsets))
+    order = numpy.lexsort((targets, rows))
+    rows = rows[order]
+    targets = numpy.asarray(targets)[order]
+    kept = numpy.ones(len(targets), dtype=bool)
+    kept[1:] = (rows[1:] != rows[:-1]) | (targets[1:] != targets[:-1])
+    new_offsets = numpy.zeros(row_count + 1, dtype=numpy.int64)
+    new_offsets[1:] = numpy.cumsum(numpy.bincount(rows[kept], minlength=row_count))
+    return new_offsets, targets[kept]
+
+
+def parse_roster(file_path):
+    """ Parses an input file in one streaming pass
+        Friends and foes named in both lists, and the student themselves, are dropped from both lists
+        Names that are not defined by a line of their own are reported and dropped
+    :param file_path: Path of the file to be parsed
+    :return:          Roster object
+    """
+    interned_ids = InternTable()           # Name -> interned id, in order of first appearance
+    names = list()
+    line_ids = array.array('l')            # Interned id of the student defined by every line
+    pref_team_size = array.array('l')
+    friend_offsets, friend_targets = array.array('l', [0]), array.array('l')
+    foe_offsets, foe_targets = array.array('l', [0]), array.array('l')
+    with open(file_path, 'r') as fh:
+        for line in fh:
+            fields = line.rstrip('\r\n').split(' ')
+            student_name = fields[0]
+            friends = fields[2].split(',') if fields[2] != '_' else []
+            foes = fields[3].split(',') if fields[3] != '_' else []
+            redundant_set = set(friends).intersection(foes)
+            redundant_set.add(student_name)
+            names.append(student_name)
+            line_ids.append(interned_ids[student_name])
+            pref_team_size.append(int(fields[1]))
+            friend_targets.extend([interned_ids[name] for name in friends if name not in redundant_set])
+            friend_offsets.append(len(friend_targets))
+            foe_targets.extend([interned_ids[name] for name in foes if name not in redundant_set])
+            foe_offsets.append(len(foe_targets))
+    id_map = numpy.full(len(interned_ids), -1, dtype=numpy.int64)
+    # A name defined by several lines refers to the last of them
+    id_map[numpy.frombuffer(line_ids, dtype=line_ids.typecode)] = numpy.arange(len(line_ids))
+    unknown_names = sorted(name for name, interned_id in interned_ids.iteritems() if id_map[interned_id] < 0)
+    if unknown_names:
+        shown_names = ', '.join(unknown_names[:10]) + (', ...' if len(unknown_names) > 10 else '')
+        sys.stderr.write('Ignoring preferences for %d unknown students: %s\n' % (len(unknown_names), shown_names))
+    arrays = list()
+    for offsets, targets in ((friend_offsets, friend_targets), (foe_offsets, foe_targets)):
+        arrays.append(remap_edges(numpy.frombuffer(offsets, dtype=offsets.typecode).astype(numpy.int64),
+                                  numpy.frombuffer(targets, dtype=targets.typecode).astype(numpy.int64), id_map))
+    friend_request_count = numpy.diff(arrays[0][0])
+    pref_team_size = numpy.frombuffer(pref_team_size, dtype=pref_team_size.typecode).astype(numpy.int64)
+    return Roster(numpy.array(names, dtype=str), pref_team_size, friend_request_count,
+                  *(sorted_unique_rows(*arrays[0]) + sorted_unique_rows(*arrays[1])))
+
+
+def source_signature(file_path):
+    """ Identifies the contents of an input file by its size and modification time
+    :param file_path: Path of the input file
+    :return:          Array (cache version, size, modification time)
+    """
+    stat = os.stat(file_path)
+    return numpy.array([cache_version, stat.st_size, stat.st_mtime], dtype=numpy.float64)
+
+
+def cache_directory(file_path):
+    """ Returns the cache directory of an input file
+    :param file_path: Path of the input file
+    :return:          Path of the cache directory
+    """
+    return file_path + '.cache'
+
+
+def load_cached_roster(file_path):
+    """ Memory-maps the cached arrays of an input file
+    :param file_path: Path of the input file
+    :return:          Roster object, None if there is no cache or the input has changed since
+    """
+    directory = cache_directory(file_path)
+    try:
+        if not numpy.array_equal(numpy.load(os.path.join(directory, 'source.npy')), source_signature(file_path)):
+            return None
+        return Roster(*[numpy.load(os.path.join(directory, name + '.npy'), mmap_mode='r') for name in cached_arrays])
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def save_cached_roster(file_path, roster):
+    """ Saves the arrays of an input file in its cache directory, the directory is replaced atomically
+        The cache is skipped silently if the directory can not be written
+    :param file_path: Path of the input file
+    :param roster:    Roster object
+    """
+    directory = cache_directory(file_path)
+    try:
+        temp_directory = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(file_path)), prefix='.roster-')
+    except (IOError, OSError):
+        return
+    try:
+        for name in cached_arrays:
+            numpy.save(os.path.join(temp_directory, name + '.npy'), getattr(roster, name))
+        numpy.save(os.path.join(temp_directory, 'source.npy'), source_signature(file_path))
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.rename(temp_directory, directory)
+    except (IOError, OSError):
+        shutil.rmtree(temp_directory, ignore_errors=True)
+
+
+def load_roster(file_path, use_cache=False):
+    """ Loads the preferences of an input file
+    :param file_path: Path of the input file
+    :param use_cache: Whether the binary cache is read, and written when it is missing or outdated
+    :return:          Roster object
+    """
+    if use_cache:
+        roster = load_cached_roster(file_path)
+        if roster is not None:
+            return roster
+    roster = parse_roster(file_path)
+    if use_cache:
+        save_cached_roster(file_path, roster)
+    return roster
@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+#
+# student_table.py : Compact storage of the students of assign.py
+#
+# Prerequisites    : Install the package 'numpy'
+#                    Execute the command `sudo pip install numpy`
+#
+# The students are stored as a structure of arrays instead of one Python object per student: the names in a
+# fixed width string array, the preferred team sizes and the friend request counts in integer arrays, and the
+# friend and foe lists in compressed sparse row (CSR) form with every row sorted and free of duplicates.
+#
+# The friend and foe arrays are NumPy arrays, memory-mapped from the cache of roster.py when there is one, and are
+# never copied. Whether one student lists another is a binary search in the row of the student, straight on the
+# CSR arrays, so nothing is stored per student besides the arrays themselves. The per student integers are kept
+# in array.array objects, which are fast to index one element at a time from Python, and exposed as NumPy views of
+# the same memory for the vectorized code.
+#
+
+import array
+from bisect import bisect_left
+
+import numpy
+
+from roster import remap_edges
+
+
+def int64_typecode():
+    """ Finds the typecode of array.array for 64 bit integers
+    :return: 'l' where a C long has 64 bits, 'q' elsewhere if array.array supports it, None otherwise
+    """
+    for typecode in ('l', 'q'):
+        try:
+            if array.array(typecode).itemsize == 8:
+                return typecode
+        except ValueError:
+            pass   # Python 2 has no 'q'
+    return None
+
+
+item_typecode = int64_typecode()   # Typecode of the array.array objects, None if there is no 64 bit one
+
+
+def shared_array(values):
+    """ Copies integer values into an array.array and makes a NumPy view of its memory
+        Without a 64 bit typecode the values are copied into a list instead, next to a NumPy copy
+    :param values: Array of integers
+    :return:       array.array object or list, NumPy array with the same values
+    """
+    values = numpy.ascontiguousarray(values, dtype=numpy.int64)
+    if item_typecode is None:
+        return values.tolist(), values
+    items = array.array(item_typecode)
+    items.fromstring(values.tostring())
+    if not items:
+        return items, numpy.zeros(0, dtype=numpy.int64)
+    return items, numpy.frombuffer(items, dtype=numpy.int64)
+
+
+def count_in_row(offsets, targets, row, values):
+    """ Counts the values that occur in a sorted row of a CSR representation, by binary search in the row
+    :param offsets: Offsets array of the CSR representation
+    :param targets: Targets array of the CSR representation, every row sorted and without repeats
+    :param row:     Number of the row
+    :param values:  Iterable of distinct values
+    :return:        Number of the values that occur in the row
+    """
+    start, end = offsets[row], offsets[row + 1]
+    if start == end:
+        return 0
+    count = 0
+    for value in values:
+        position = bisect_left(targets, value, start, end)
+        if position < end and targets[position] == value:
+            count += 1
+    return count
+
+
+class Student:
+    """ Object representation of the student, built from the StudentTable on request
+    """
+    def __init__(self, student_id, student_name, pref_team_size, friend_list, foe_list):
+        """ Constructor
+        :param student_id:     ID of the student
+        :param student_name:   Name of the student
+        :param pref_team_size: Preferred team size of the student
+        :param friend_list:    List of people with whom the student wants to work with
+        :param foe_list:       List of people with whom the student does not want to work
+        """
+        self.student_id = student_id
+        self.student_name = student_name
+        self.pref_team_size = pref_team_size
+        self.friend_list = friend_list
+        self.foe_list = foe_list
+
+    def __str__(self):
+        """ Returns a string representation of the Student object to be printed
+        :return: String representation of the Student object
+        """
+        return 'Student ID = %s\nStudent name = %s\nPref team size = %s\nFriends = %s\nFoes = %s\n' \
+               % (str(self.student_id), self.student_name, str(self.pref_team_size),
+                  str(self.friend_list), str(self.foe_list))
+
+
+class StudentTable:
+    """ Structure of arrays representation of all the students, indexed by student id 0 to N - 1
+    """
+    def __init__(self, names, pref_team_size, friend_request_count, friend_offsets, friend_targets, foe_offsets,
+                 foe_targets):
+        """ Constructor
+        :param names:                Array of the student names
+        :param pref_team_size:       Array of the preferred team sizes
+        :param friend_request_count: Array of the lengths of the friend lists as written, repeated names included
+        :param friend_offsets:       Offsets array of the friend lists, every row sorted and without repeats
+        :param friend_targets:       Targets array of the friend lists
+        :param foe_offsets:          Offsets array of the foe lists, every row sorted and without repeats
+        :param foe_targets:          Targets array of the foe lists
+        """
+        self.names = names
+        self.pref_team_size_items, self.pref_team_size = shared_array(pref_team_size)
+        self.friend_request_count_items, self.friend_request_count = shared_array(friend_request_count)
+        # Plain views of memory-mapped arrays, which are faster to index one element at a time than the memmaps
+        self.friend_offsets, self.friend_targets = numpy.asarray(friend_offsets), numpy.asarray(friend_targets)
+        self.foe_offsets, self.foe_targets = numpy.asarray(foe_offsets), numpy.asarray(foe_targets)
+
+    @classmethod
+    def from_roster(cls, roster, max_team_size):
+        """ Builds the table of a parsed input file
+        :param roster:        Roster object, see roster.load_roster
+        :param max_team_size: The maximum team size allowed, preferred team sizes are clipped to 1 to max_team_size
+        :return:              StudentTable object, sharing the friend and foe arrays of the roster
+        """
+        return cls(roster.names, numpy.clip(roster.pref_team_size, 1, max_team_size), roster.friend_request_count,
+                   roster.friend_offsets, roster.friend_targets, roster.foe_offsets, roster.foe_targets)
+
+    def __len__(self):
+        """ Returns the number of students
+        :return: Number of students
+        """
+        return len(self.names)
+
+    def student_name(self, student_id):
+        """ Returns the name of a student
+        :param student_id: ID of the student
+        :return:           Name of the student
+        """
+        return self.names[student_id]
+
+    def friends_of(self, student_id):
+        """ Returns the friends of a student
+        :param student_id: ID of the student
+        :return:           Sorted array of student ids
+        """
+        return self.friend_targets[self.friend_offsets[student_id]:self.friend_offsets[student_id + 1]]
+
+    def foes_of(self, student_id):
+        """ Returns the foes of a student
+        :param student_id: ID of the student
+        :return:           Sorted array of student ids
+        """
+        return self.foe_targets[self.foe_offsets[student_id]:self.foe_offsets[student_id + 1]]
+
+    def student(self, student_id):
+        """ Builds the object representation of a student
+        :param student_id: ID of the student
+        :return:           Student object
+        """
+        return Student(student_id, self.student_name(student_id), self.pref_team_size_items[student_id],
+                       self.friends_of(student_id).tolist(), self.foes_of(student_id).tolist())
+
+    def is_friend(self, student_id, other_id):
+        """ Checks whether a student wants to work with another student
+        :param student_id: ID of the student
+        :param other_id:   ID of the other student
+        :return:           True if the other student is in the friend list of the student
+        """
+        return count_in_row(self.friend_offsets, self.friend_targets, student_id, (other_id,)) > 0
+
+    def is_foe(self, student_id, other_id):
+        """ Checks whether a student does not want to work with another student
+        :param student_id: ID of the student
+        :param other_id:   ID of the other student
+        :return:           True if the other student is in the foe list of the student
+        """
+        return count_in_row(self.foe_offsets, self.foe_targets, student_id, (other_id,)) > 0
+
+    def calculate_total_cost(self, student_id, team, solver):
+        """ Calculates the total time taken by a student for complaining
+        :param student_id: ID of the student
+        :param team:       Set of the team members
+        :param solver:     Solver object with the complaint times
+        :return:           Total time taken by the student for complaining
+        """
+        curr_size_complaint = solver.size_complaint if self.pref_team_size_items[student_id] != len(team) else 0
+        friend_count_in_team = count_in_row(self.friend_offsets, self.friend_targets, student_id, team)
+        foe_count_in_team = count_in_row(self.foe_offsets, self.foe_targets, student_id, team)
+        friend_count_not_in_team = min(self.friend_request_count_items[student_id], solver.max_team_size) - \
+                                   friend_count_in_team
+        total_cost = curr_size_complaint + friend_count_not_in_team * solver.friend_complaint + \
+                     foe_count_in_team * solver.foe_complaint
+        return total_cost
+
+    def subset(self, student_ids):
+        """ Builds the table of a subset of the students, with local ids 0 to len(student_ids) - 1
+            Friends and foes outside of the subset are left out, repeated friend requests are still counted
+        :param student_ids: Sorted list of the student ids of the subset
+        :return:            StudentTable object, the local id of a student is its index in student_ids
+        """
+        student_ids = numpy.asarray(student_ids, dtype=numpy.int64)
+        id_map = numpy.full(len(self), -1, dtype=numpy.int64)
+        id_map[student_ids] = numpy.arange(len(student_ids))
+        friend_counts = numpy.diff(self.friend_offsets)[student_ids]
+        arrays = list()
+        for offsets, targets in ((self.friend_offsets, self.friend_targets), (self.foe_offsets, self.foe_targets)):
+            starts = offsets[student_ids]
+            lengths = offsets[student_ids + 1] - starts
+            sub_offsets = numpy.zeros(len(student_ids) + 1, dtype=numpy.int64)
+            sub_offsets[1:] = numpy.cumsum(lengths)
+            rows = numpy.repeat(numpy.arange(len(student_ids)), lengths)
+            sub_targets = targets[starts[rows] + numpy.arange(sub_offsets[-1]) - sub_offsets[rows]]
+            # The local ids keep the order of the global ids, so the rows stay sorted
+            arrays.extend(remap_edges(sub_offsets, sub_targets, id_map))
+        repeated_requests = self.friend_request_count[student_ids] - friend_counts
+        return StudentTable(self.names[student_ids], self.pref_team_size[student_ids],
+                            numpy.diff(arrays[0]) + repeated_requests, *arrays)
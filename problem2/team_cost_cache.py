@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+#
+# team_cost_cache.py : Bounded cache of the member costs of the teams of assign.py
+#
+# The local search scores the same small teams over and over, when a student is moved back and forth or a state
+# is revisited after a tabu cycle. The individual costs of the members of a team only depend on who is in the
+# team and on the complaint times, so they are cached under the sorted tuple of the member ids.
+#
+# Least recently used entries are evicted with two generations of dictionaries: new entries go to the recent
+# generation, a hit in the old generation moves the entry back to the recent one, and when the recent generation
+# is full, the old generation is dropped and the recent one takes its place. This keeps every lookup a plain
+# dictionary access.
+#
+
+default_capacity = 1 << 16   # Number of teams kept by default
+
+
+class TeamCostCache:
+    """ Least recently used cache that maps the sorted member ids of a team to the costs of its members
+    """
+    def __init__(self, capacity=default_capacity):
+        """ Constructor
+        :param capacity: Maximum number of teams kept
+        """
+        self.generation_size = max(1, capacity // 2)
+        self.recent_map = dict()
+        self.old_map = dict()
+        self.weights = None   # Complaint times of the cached costs
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        """ Returns the number of cached teams
+        :return: Number of cached teams
+        """
+        return len(self.recent_map) + len(self.old_map)
+
+    def validate(self, weights):
+        """ Drops all the entries if the complaint times have changed since they were cached
+        :param weights: Tuple of the complaint times and the other parameters the costs depend on
+        """
+        if weights != self.weights:
+            self.clear()
+            self.weights = weights
+
+    def clear(self):
+        """ Drops all the entries, the counters are kept
+        """
+        self.recent_map = dict()
+        self.old_map = dict()
+
+    def get(self, members):
+        """ Looks up the costs of a team
+        :param members: Sorted tuple of the member ids
+        :return:        Tuple of the costs of the members in the same order, None if the team is not cached
+        """
+        costs = self.recent_map.get(members)
+        if costs is None:
+            costs = self.old_map.pop(members, None)
+            if costs is None:
+                self.misses += 1
+                return None
+            self.put(members, costs)
+        self.hits += 1
+        return costs
+
+    def put(self, members, costs):
+        """ Caches the costs of a team
+        :param members: Sorted tuple of the member ids
+        :param costs:   Tuple of the costs of the members in the same order
+        """
+        if len(self.recent_map) >= self.generation_size:
+            self.old_map = self.recent_map
+            self.recent_map = dict()
+        self.recent_map[members] = costs
+
+    def hit_ratio(self):
+        """ Calculates the fraction of the lookups that were hits
+        :return: Hit ratio, None before the first lookup
+        """
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else None